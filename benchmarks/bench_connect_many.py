@@ -0,0 +1,119 @@
+"""
+Measures how long joining the voice channels of many guilds takes, one after another and at once.
+
+The main gateway is simulated: every ``VOICE_STATE`` packet is answered with a
+``VOICE_STATE_UPDATE`` and a ``VOICE_SERVER_UPDATE`` after ``latency`` milliseconds, and the voice
+connections run against the stand-in gateway of ``fake_gateway.py`` in a child process. The rate
+limit of the ``VOICE_STATE`` packets runs 60 times faster than the real one, so that its budget of
+110 packets per minute becomes 110 per second. With several ``shards``, the guilds are spread
+across them and every shard has its own budget. ``sent/s`` is the peak amount of packets one
+shard sent in any second, which has to stay below the budget.
+
+Usage: ``python benchmarks/bench_connect_many.py [guilds] [latency] [shards]``
+"""
+import asyncio
+import bisect
+import multiprocessing
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+from fake_gateway import serve
+
+
+def _peak(sent: List[float], window: float = 1.0) -> int:
+    return max(
+        (bisect.bisect_right(sent, start + window) - index for index, start in enumerate(sent)),
+        default=0,
+    )
+
+
+async def main(count: int, latency: float, shard_count: int) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.api.models.flags import Intents
+    from interactions.ext.voice import manager
+    from interactions.ext.voice.manager import VoiceManager
+    from interactions.ext.voice.ratelimit import TokenBucket
+    from interactions.ext.voice.websocket import VoiceWebSocketClient
+
+    class LocalConnection(manager.VoiceConnectionWebSocketClient):
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, **kwargs)
+            self.endpoint = self.endpoint.replace("wss://", "ws://", 1)
+
+    manager.VoiceConnectionWebSocketClient = LocalConnection  # the stand-in has no TLS
+
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    server = context.Process(target=serve, args=(sender,), daemon=True)
+    server.start()
+    port, _ = receiver.recv()
+
+    voice = VoiceManager()
+    loop = asyncio.get_running_loop()
+    sent: List[List[float]] = []
+
+    def start_shard(shard_id: int) -> VoiceWebSocketClient:
+        shard = VoiceWebSocketClient(
+            "token", Intents.DEFAULT, me=SimpleNamespace(id="1"), manager=voice
+        )
+        shard._dispatch = SimpleNamespace(dispatch=lambda *_: None)
+        shard_sent: List[float] = []
+
+        async def answer(guild: str) -> None:
+            await asyncio.sleep(latency)
+            state = {"guild_id": guild, "user_id": "1", "session_id": f"session-{guild}"}
+            await shard._handle_connection({"op": 0, "t": "VOICE_STATE_UPDATE", "d": state})
+            server_data = {"guild_id": guild, "token": "token", "endpoint": f"127.0.0.1:{port}/"}
+            await shard._handle_connection({"op": 0, "t": "VOICE_SERVER_UPDATE", "d": server_data})
+
+        async def send_packet(data: dict) -> None:
+            shard_sent.append(loop.time())
+            if data["d"]["channel_id"] is not None:
+                loop.create_task(answer(data["d"]["guild_id"]))
+
+        shard._send_packet = send_packet
+        voice.add_shard(shard, shard_id, shard_count)
+        sent.append(shard_sent)
+        return shard
+
+    shards = [start_shard(shard_id) for shard_id in range(shard_count)]
+
+    print(f"{'joins':<12}{'shards':>8}{'guilds':>8}{'seconds':>10}{'failed':>8}{'sent/s':>8}")
+    for kind in ("serial", "concurrent"):
+        for shard, shard_sent in zip(shards, sent):
+            shard._voice_state_bucket = TokenBucket(per=1.0)
+            shard_sent.clear()
+        # snowflakes hold their creation time from bit 22 on, which spreads them across shards
+        channels = {guild_id << 22: guild_id for guild_id in range(1, count + 1)}
+        failed = 0
+        start = time.perf_counter()
+        if kind == "serial":
+            for guild_id, channel_id in channels.items():
+                try:
+                    await voice.connect(guild_id, channel_id, timeout=10)
+                except Exception:
+                    failed += 1
+        else:
+            results = await voice.connect_many(channels, timeout=10)
+            failed = sum(result is not None for result in results.values())
+        seconds = time.perf_counter() - start
+        peak = max(_peak(shard_sent) for shard_sent in sent)
+        print(f"{kind:<12}{shard_count:>8}{count:>8}{seconds:>10.2f}{failed:>8}{peak:>8}")
+
+        for shard in shards:
+            shard._voice_state_bucket = TokenBucket(capacity=count)
+        await voice.disconnect_all()
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+            float(sys.argv[2]) / 1e3 if len(sys.argv) > 2 else 0.1,
+            int(sys.argv[3]) if len(sys.argv) > 3 else 1,
+        )
+    )
@@ -0,0 +1,113 @@
+"""
+Measures the event dispatch latency of the main gateway while voice connections are open.
+
+A :class:`VoiceWebSocketClient` receives a ``VOICE_SERVER_UPDATE`` for every guild, which starts
+its voice connection against the stand-in gateway of ``fake_gateway.py``, running in a child
+process. ``server update`` is how long dispatching those events takes. Then a main gateway event
+is dispatched every 10 ms; ``dispatch`` is the time from when it is due until it was handled, so
+it includes any stall of the event loop. This is repeated while every connection plays audio.
+
+Usage: ``python benchmarks/bench_dispatch.py [connections]``
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+from fake_gateway import serve
+
+EVENTS = 500
+FRAME = os.urandom(120)
+
+
+def _percentiles(seconds: List[float]) -> str:
+    seconds = sorted(seconds)
+    p50, p99 = seconds[len(seconds) // 2], seconds[int(len(seconds) * 0.99)]
+    return f"{p50 * 1e3:>10.2f}{p99 * 1e3:>10.2f}{seconds[-1] * 1e3:>10.2f}"
+
+
+async def main(count: int) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    import aiohttp
+
+    from interactions.api.models.flags import Intents
+    from interactions.ext.voice import websocket
+    from interactions.ext.voice.player import PacingPolicy
+    from interactions.ext.voice.sources import AudioSource
+
+    class EndlessSource(AudioSource):
+        def read(self) -> bytes:
+            return FRAME
+
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    server = context.Process(target=serve, args=(sender,), daemon=True)
+    server.start()
+    port, _ = receiver.recv()
+    endpoint = f"ws://127.0.0.1:{port}/"  # the stand-in has no TLS
+
+    client = websocket.VoiceWebSocketClient("token", Intents.DEFAULT, me=SimpleNamespace(id="1"))
+    client._http._req._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    loop = asyncio.get_running_loop()
+
+    async def dispatch_latency() -> List[float]:
+        latencies = []
+        due = loop.time()
+        for _ in range(EVENTS):
+            due += 0.01
+            await asyncio.sleep(due - loop.time())
+            await client._handle_connection({"op": 0, "t": "RESUMED", "s": 1, "d": {}})
+            latencies.append(loop.time() - due)
+        return latencies
+
+    print(f"{'connections':<24}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    print(f"{'dispatch, none':<24}{_percentiles(await dispatch_latency())}")
+
+    updates = []
+    for guild_id in range(1, count + 1):
+        guild = str(guild_id)
+        client._voice._connect_data[guild_id] = {
+            "can_return": asyncio.Event(),
+            "session_id": f"session-{guild}",
+            "user_id": 1,
+        }
+        start = time.perf_counter()
+        await asyncio.wait_for(
+            client._handle_connection(
+                {
+                    "op": 0,
+                    "t": "VOICE_SERVER_UPDATE",
+                    "s": 1,
+                    "d": {"guild_id": guild, "token": "token", "endpoint": endpoint},
+                }
+            ),
+            10,
+        )
+        updates.append(time.perf_counter() - start)
+    print(f"{'server update':<24}{_percentiles(updates)}")
+
+    connections = list(client._voice._connections.values())
+    await asyncio.gather(*(connection.media_ready.wait() for connection in connections))
+    print(f"{f'dispatch, {count} idle':<24}{_percentiles(await dispatch_latency())}")
+
+    players = [
+        asyncio.ensure_future(connection._play(EndlessSource(), PacingPolicy.CATCH_UP, dtx=False))
+        for connection in connections
+    ]
+    await asyncio.sleep(0.5)
+    print(f"{f'dispatch, {count} playing':<24}{_percentiles(await dispatch_latency())}")
+
+    for connection in connections:
+        connection._player.stop()
+    await asyncio.gather(*players)
+    for guild in tuple(client._voice._connections):
+        await client._voice._supervisor.stop(client._voice._connections.pop(guild))
+    await client._http._req._session.close()
+    server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
@@ -0,0 +1,168 @@
+"""
+Runs voice connections end to end against the local stand-in gateway of ``fake_gateway.py``.
+
+The gateway runs in a child process, so the CPU time measured is the client's alone. Measured are:
+
+- ``connect``: the time from starting a connection until its media is ready, i.e. ``HELLO``,
+  ``IDENTIFY``, ``READY``, IP discovery, ``SELECT_PROTOCOL`` and ``SESSION_DESCRIPTION``. The
+  connections are opened one after another.
+- ``reconnect``: the time from the gateway closing every connection until its session is resumed
+  (close code 4000) or described again after a new ``IDENTIFY`` (close code 4006).
+- ``streams``: the client CPU time while every connection plays an endless source, the streams
+  one core would sustain at that cost, and how far the arrivals of the packets at the voice server
+  deviate from the 20 ms frame length.
+
+The results are printed as JSON, to be compared between releases.
+
+Usage: ``python benchmarks/bench_e2e.py [seconds] > results.json``
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from fake_gateway import serve
+
+STREAM_COUNTS = (10, 50, 200)
+FRAME = os.urandom(120)
+
+
+def _summary(seconds: List[float]) -> Dict[str, Any]:
+    if not seconds:
+        return {"samples": 0}
+    seconds = sorted(seconds)
+    return {
+        "samples": len(seconds),
+        "mean_ms": statistics.mean(seconds) * 1e3,
+        "p50_ms": seconds[len(seconds) // 2] * 1e3,
+        "p95_ms": seconds[min(int(len(seconds) * 0.95), len(seconds) - 1)] * 1e3,
+        "max_ms": seconds[-1] * 1e3,
+    }
+
+
+async def main(duration: float) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    import aiohttp
+
+    from interactions.ext.voice.heartbeat import HeartbeatScheduler
+    from interactions.ext.voice.player import PacingPolicy
+    from interactions.ext.voice.scheduler import MediaScheduler
+    from interactions.ext.voice.sources import AudioSource
+    from interactions.ext.voice.voice import VoiceConnectionWebSocketClient
+
+    class EndlessSource(AudioSource):
+        def read(self) -> bytes:
+            return FRAME
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, 8 * max(STREAM_COUNTS))), hard))
+
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    server = context.Process(target=serve, args=(sender,), daemon=True)
+    server.start()
+    port, _ = receiver.recv()
+    control = f"http://127.0.0.1:{port}"
+
+    # every gateway connection holds a connection of the pool, the default limit is 100
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    http = SimpleNamespace(_req=SimpleNamespace(_session=session))
+    scheduler, heartbeat = MediaScheduler(), HeartbeatScheduler()
+    connections: List[VoiceConnectionWebSocketClient] = []
+    tasks: List[asyncio.Future] = []
+    results: Dict[str, Any] = {"python": platform.python_version(), "seconds": duration}
+
+    async def request(method: str, path: str) -> Dict[str, Any]:
+        async with session.request(method, control + path) as response:
+            return await response.json()
+
+    try:
+        connect: List[float] = []
+        for index in range(max(STREAM_COUNTS)):
+            connection = VoiceConnectionWebSocketClient(
+                index + 1,
+                {"session_id": f"session-{index}", "token": "token", "user_id": "1"},
+                http,
+                scheduler=scheduler,
+                heartbeat=heartbeat,
+            )
+            connection.endpoint = f"ws://127.0.0.1:{port}/?v=4"
+            start = time.perf_counter()
+            tasks.append(asyncio.ensure_future(connection._connect()))
+            await asyncio.wait_for(connection.media_ready.wait(), 10)
+            connect.append(time.perf_counter() - start)
+            connections.append(connection)
+        results["connect"] = _summary(connect)
+
+        results["streams"] = []
+        for count in STREAM_COUNTS:
+            await request("POST", "/reset")
+            players = [
+                asyncio.ensure_future(
+                    connection._play(EndlessSource(), PacingPolicy.CATCH_UP, dtx=False)
+                )
+                for connection in connections[:count]
+            ]
+            await asyncio.sleep(0.5)  # let every stream start before measuring
+
+            await request("POST", "/reset")
+            wall, cpu = time.perf_counter(), time.process_time()
+            await asyncio.sleep(duration)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            stats = await request("GET", "/stats")
+
+            for connection in connections[:count]:
+                connection._player.stop()
+            await asyncio.gather(*players)
+
+            frames = count * wall / 0.02
+            results["streams"].append(
+                {
+                    "streams": count,
+                    "cpu_percent": cpu / wall * 100,
+                    "us_per_frame": cpu / frames * 1e6,
+                    "streams_per_core": count * wall / cpu if cpu else None,
+                    "packets_expected": round(frames),
+                    "packets_received": stats["packets"],
+                    "jitter_mean_ms": stats["jitter_mean"] * 1e3,
+                    "jitter_max_ms": stats["jitter_max"] * 1e3,
+                }
+            )
+
+        results["reconnect"] = {}
+        for kind, code in (("resume", 4000), ("identify", 4006)):
+            await request("POST", "/reset")
+            await request("POST", f"/close?code={code}")
+            for _ in range(1000):
+                stats = await request("GET", "/stats")
+                if len(stats["reconnects"]) >= len(connections):
+                    break
+                await asyncio.sleep(0.01)
+            results["reconnect"][kind] = _summary(
+                [seconds for _kind, seconds in stats["reconnects"] if _kind == kind]
+            )
+    finally:
+        for connection in connections:
+            connection._close = True
+            if connection._client is not None:
+                await connection._client.close()
+        await asyncio.wait(tasks, timeout=5)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await session.close()
+        server.terminate()
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0))
@@ -0,0 +1,67 @@
+"""
+Compares one socket and one ``send`` per packet against the batched ``sendmmsg`` egress.
+
+Every stream sends one 150-byte packet per tick to its own receiving socket on the loopback
+interface, as fast as possible, so ``us/tick`` is the CPU time one frame of every stream costs.
+``syscalls/tick`` counts the send system calls made.
+
+Usage: ``python benchmarks/bench_egress.py [ticks]``
+"""
+import asyncio
+import os
+import resource
+import socket
+import sys
+import time
+
+STREAM_COUNTS = (100, 1000)
+PACKET = os.urandom(150)
+
+
+async def main(ticks: int) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.ext.voice.udp import UDPEgress, VoiceUDPProtocol
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, 4 * max(STREAM_COUNTS))), hard))
+    if not UDPEgress().batching:
+        print("sendmmsg is not available, the egress sends one packet per call.")
+
+    print(f"{'egress':<10}{'streams':>8}{'us/tick':>10}{'syscalls/tick':>15}{'packets/s':>12}")
+    for count in STREAM_COUNTS:
+        servers = []
+        for _ in range(count):
+            server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            server.bind(("127.0.0.1", 0))
+            servers.append(server)
+        addresses = [server.getsockname() for server in servers]
+
+        for name in ("socket", "sendmmsg"):
+            egress = UDPEgress()
+            if name == "socket":
+                connections = [await VoiceUDPProtocol.connect(*address) for address in addresses]
+            else:
+                connections = [await egress.connect(*address) for address in addresses]
+
+            wall, cpu = time.perf_counter(), time.process_time()
+            for _ in range(ticks):
+                for connection in connections:
+                    connection.sendto(PACKET)
+                egress.flush()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+            syscalls = egress.syscalls / ticks if name == "sendmmsg" else count
+            print(
+                f"{name:<10}{count:>8}{cpu / ticks * 1e6:>10.0f}{syscalls:>15.0f}"
+                f"{count * ticks / wall:>12.0f}"
+            )
+            for connection in connections:
+                connection.close()
+            await asyncio.sleep(0)
+
+        for server in servers:
+            server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
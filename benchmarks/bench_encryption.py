@@ -0,0 +1,70 @@
+"""
+Compares inline encryption against encrypting the packets of each tick in a thread or process pool.
+
+For every mode, the packets of one tick are built for all streams as fast as possible, without
+pacing, so the result is the throughput ceiling in packets per second. ``loop ms/tick`` is the CPU
+time the event loop thread spends per tick, which is what is left for everything else.
+
+Usage: ``python benchmarks/bench_encryption.py [ticks]``
+"""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+STREAM_COUNTS = (100, 1000)
+FRAME = os.urandom(120)
+
+
+async def main(ticks: int) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.ext.voice.rtp import RTPPacketizer
+    from interactions.ext.voice.scheduler import MediaScheduler
+
+    class NullTarget:
+        def sendto(self, data: bytes) -> None:
+            pass
+
+    workers = os.cpu_count() or 1
+    target = NullTarget()
+    modes = (
+        ("inline", None),
+        (f"thread x{workers}", ThreadPoolExecutor(workers)),
+        (f"process x{workers}", ProcessPoolExecutor(workers)),
+    )
+
+    print(f"{'mode':<14}{'streams':>8}{'packets/s':>12}{'loop ms/tick':>14}")
+    for count in STREAM_COUNTS:
+        packetizers = [RTPPacketizer(ssrc) for ssrc in range(count)]
+        for packetizer in packetizers:
+            packetizer.set_secret_key(os.urandom(32))
+
+        for name, executor in modes:
+            scheduler = MediaScheduler(executor, parallelism=workers)
+            if executor is not None:  # spawn the workers before measuring
+                for packetizer in packetizers:
+                    scheduler.submit(target, packetizer.prepare(FRAME))
+                await scheduler._flush()
+
+            wall, cpu = time.perf_counter(), time.thread_time()
+            for _ in range(ticks):
+                if executor is None:
+                    for packetizer in packetizers:
+                        target.sendto(packetizer.packetize(FRAME))
+                else:
+                    for packetizer in packetizers:
+                        scheduler._jobs.append(packetizer.prepare(FRAME))
+                        scheduler._targets.append(target)
+                    await scheduler._flush()
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+
+            print(f"{name:<14}{count:>8}{count * ticks / wall:>12.0f}{cpu / ticks * 1e3:>14.2f}")
+
+    for _, executor in modes:
+        if executor is not None:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
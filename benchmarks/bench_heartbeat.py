@@ -0,0 +1,71 @@
+"""
+Compares one heartbeat task per connection against the shared :class:`HeartbeatScheduler`.
+
+Every connection beats every ``interval`` seconds for ``duration`` seconds. ``KiB`` is the memory
+the idle heartbeats of all connections hold, ``cpu ms`` the CPU time spent while they run.
+
+Usage: ``python benchmarks/bench_heartbeat.py [connections]``
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+
+INTERVAL = 0.25
+DURATION = 2.0
+
+
+class Connection:
+    __slots__ = ("beats",)
+
+    def __init__(self) -> None:
+        self.beats = 0
+
+    def _beat(self, now: float) -> bool:
+        self.beats += 1
+        return True
+
+
+async def _loop(connection: Connection) -> None:
+    while True:
+        connection._beat(0.0)
+        await asyncio.sleep(INTERVAL)
+
+
+async def main(count: int) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.ext.voice.heartbeat import HeartbeatScheduler
+
+    print(f"{'heartbeats':<12}{'connections':>12}{'tasks':>7}{'KiB':>9}{'cpu ms':>9}{'beats':>8}")
+    for name in ("tasks", "scheduler"):
+        connections = [Connection() for _ in range(count)]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        if name == "tasks":
+            tasks = [asyncio.ensure_future(_loop(connection)) for connection in connections]
+        else:
+            scheduler = HeartbeatScheduler()
+            for connection in connections:
+                scheduler.add(connection, INTERVAL)
+        await asyncio.sleep(0)
+        memory = (tracemalloc.get_traced_memory()[0] - before) / 1024
+        tracemalloc.stop()
+        running = len(asyncio.all_tasks()) - 1
+
+        cpu = time.process_time()
+        await asyncio.sleep(DURATION)
+        cpu = time.process_time() - cpu
+
+        if name == "tasks":
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        else:
+            for connection in connections:
+                scheduler.remove(connection)
+        beats = sum(connection.beats for connection in connections)
+        print(f"{name:<12}{count:>12}{running:>7}{memory:>9.0f}{cpu * 1e3:>9.1f}{beats:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
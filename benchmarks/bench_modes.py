@@ -0,0 +1,40 @@
+"""
+Measures how many packets per second each encryption mode can build on a single core.
+
+``inline`` is :meth:`RTPPacketizer.packetize` as used on the event loop, ``prepared`` is
+:meth:`RTPPacketizer.prepare` followed by :func:`encrypt_batch` as used with an executor.
+
+Usage: ``python benchmarks/bench_modes.py [packets]``
+"""
+import asyncio
+import os
+import sys
+import time
+
+FRAME = os.urandom(120)
+
+
+async def main(packets: int) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.ext.voice.rtp import EncryptionMode, RTPPacketizer, encrypt_batch
+
+    print(f"{'mode':<28}{'inline packets/s':>18}{'prepared packets/s':>20}{'bytes':>7}")
+    for mode in EncryptionMode:
+        packetizer = RTPPacketizer(1, mode)
+        packetizer.set_secret_key(os.urandom(32))
+
+        start = time.perf_counter()
+        for _ in range(packets):
+            packetizer.packetize(FRAME)
+        inline = packets / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        encrypt_batch([packetizer.prepare(FRAME) for _ in range(packets)])
+        prepared = packets / (time.perf_counter() - start)
+
+        size = len(packetizer.packetize(FRAME))
+        print(f"{mode.value:<28}{inline:>18.0f}{prepared:>20.0f}{size:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
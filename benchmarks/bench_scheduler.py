@@ -0,0 +1,99 @@
+"""
+Measures the CPU time spent per active stream by the shared media scheduler.
+
+Every stream plays an endless source through a real :class:`RTPPacketizer`, so the numbers include
+header updates and encryption. Packets are discarded instead of being sent. For comparison, the
+same work is done with one sleeping task per stream.
+
+Usage: ``python benchmarks/bench_scheduler.py [seconds]``
+"""
+import asyncio
+import os
+import sys
+import time
+
+STREAM_COUNTS = (10, 100, 1000)
+FRAME = os.urandom(120)
+
+
+async def main(duration: float) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.ext.voice.metrics import VoiceMetrics
+    from interactions.ext.voice.player import AudioPlayer
+    from interactions.ext.voice.rtp import FRAME_LENGTH, RTPPacketizer
+    from interactions.ext.voice.scheduler import MediaScheduler
+    from interactions.ext.voice.sources import AudioSource
+
+    class EndlessSource(AudioSource):
+        def read(self) -> bytes:
+            return FRAME
+
+    class NullConnection:
+        def __init__(self, scheduler: MediaScheduler, ssrc: int) -> None:
+            self.guild_id = ssrc
+            self.media_ready = asyncio.Event()
+            self.media_ready.set()
+            self._scheduler = scheduler
+            self.metrics = VoiceMetrics()
+            self._packetizer = RTPPacketizer(ssrc)
+            self._packetizer.set_secret_key(os.urandom(32))
+
+        def _send_audio_frame(self, frame: bytes) -> None:
+            self._packetizer.packetize(frame)
+
+        async def _start_speaking(self) -> None:
+            pass
+
+        async def _stop_speaking(self) -> None:
+            pass
+
+    async def shared(count: int) -> int:
+        scheduler = MediaScheduler()
+        players = [
+            AudioPlayer(NullConnection(scheduler, ssrc), EndlessSource()) for ssrc in range(count)
+        ]
+        tasks = [asyncio.ensure_future(player.play()) for player in players]
+        await asyncio.sleep(duration)
+        for player in players:
+            player.stop()
+        await asyncio.gather(*tasks)
+        return scheduler.ticks
+
+    async def per_stream(count: int) -> int:
+        wakeups = 0
+
+        async def stream(connection: NullConnection) -> None:
+            nonlocal wakeups
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            index = 0
+            while True:
+                index += 1
+                await asyncio.sleep(start + index * FRAME_LENGTH - loop.time())
+                wakeups += 1
+                connection._send_audio_frame(FRAME)
+
+        scheduler = MediaScheduler()
+        tasks = [
+            asyncio.ensure_future(stream(NullConnection(scheduler, ssrc))) for ssrc in range(count)
+        ]
+        await asyncio.sleep(duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return wakeups
+
+    print(f"{'mode':<12}{'streams':>8}{'wakeups':>10}{'cpu %':>8}{'us/stream/s':>13}")
+    for count in STREAM_COUNTS:
+        for name, run in (("shared", shared), ("per-stream", per_stream)):
+            cpu = time.process_time()
+            wakeups = await run(count)
+            cpu = time.process_time() - cpu
+            print(
+                f"{name:<12}{count:>8}{wakeups:>10}{cpu / duration * 100:>8.1f}"
+                f"{cpu / duration / count * 1e6:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0))
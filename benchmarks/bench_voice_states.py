@@ -0,0 +1,86 @@
+"""
+Measures keeping track of voice states, with :class:`VoiceStateIndex` and with the per-user list in
+the HTTP cache it replaced.
+
+``guilds`` guilds with 4 channels of 5 members each receive one ``VOICE_STATE_UPDATE`` per
+member, then every member moves to another channel. ``update`` is the time to record one state,
+``members`` the time to find the members of one channel, which the list had to scan for.
+
+Usage: ``python benchmarks/bench_voice_states.py [guilds]``
+"""
+import asyncio
+import random
+import sys
+import time
+from typing import Callable, List
+
+
+def _timed(function: Callable[[], None], count: int) -> float:
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) / count
+
+
+async def main(guilds: int) -> None:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.api.cache import Storage
+    from interactions.api.models.misc import Snowflake
+    from interactions.ext.voice.index import VoiceStateIndex
+    from interactions.ext.voice.state import VoiceState
+
+    def states(offset: int) -> List[VoiceState]:
+        return [
+            VoiceState(
+                guild_id=str(guild),
+                channel_id=str(guild * 4 + (member + offset) % 4),
+                user_id=str(guild * 100 + member),
+                session_id="session",
+            )
+            for guild in range(1, guilds + 1)
+            for member in range(20)
+        ]
+
+    joins, moves = states(0), states(1)
+    queries = [
+        (guild, guild * 4 + channel) for guild in range(1, guilds + 1) for channel in range(4)
+    ]
+    random.shuffle(queries)
+
+    storage: Storage = Storage()
+
+    def cache_update(state: VoiceState) -> None:  # the removed code of _dispatch_voice_event
+        _id = Snowflake(str(state.user_id))
+        if _id in storage.values.keys():
+            if len(storage.get(_id, [])) >= 2:
+                storage.values[_id].pop(0)
+            storage.values[_id].extend([state])
+        else:
+            storage.add([state], _id)
+
+    def cache_members(guild_id: int, channel_id: int) -> list:
+        return [
+            history[-1]
+            for history in storage.values.values()
+            if int(history[-1].guild_id) == guild_id and int(history[-1].channel_id) == channel_id
+        ]
+
+    index = VoiceStateIndex()
+    results = {}
+    for name, update, members in (
+        ("cache list", cache_update, cache_members),
+        ("index", index.update, index.members),
+    ):
+        seconds = _timed(lambda: [update(state) for state in joins + moves], 2 * len(joins))
+        found = sum(len(members(*query)) for query in queries)
+        assert found == len(moves), found
+        lookups = _timed(lambda: [members(*query) for query in queries[:1000]], 1000)
+        results[name] = seconds, lookups
+
+    print(f"{guilds} guilds, {len(joins)} members")
+    print(f"{'':<12}{'update us':>12}{'members us':>12}")
+    for name, (update, lookup) in results.items():
+        print(f"{name:<12}{update * 1e6:>12.2f}{lookup * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
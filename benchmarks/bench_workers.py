@@ -0,0 +1,138 @@
+"""
+Compares running the voice connections in the bot process with running them in worker processes.
+
+Every connection plays an endless source against the stand-in gateway of ``fake_gateway.py``,
+which runs in a child process of its own. Measured are the CPU time of the bot process, how late a
+main gateway event dispatched every 10 ms is handled in it, and how many of the expected packets
+reach the voice server. With workers, the bot process only keeps the (simulated) main gateway.
+
+Usage: ``python benchmarks/bench_workers.py [streams] [workers] [seconds]``
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+from fake_gateway import serve
+
+from interactions.ext.voice.sources import AudioSource
+
+FRAME = os.urandom(120)
+
+
+class EndlessSource(AudioSource):
+    def read(self) -> bytes:
+        return FRAME
+
+
+def _percentiles(seconds: List[float]) -> str:
+    seconds = sorted(seconds)
+    p50, p99 = seconds[len(seconds) // 2], seconds[int(len(seconds) * 0.99)]
+    return f"{p50 * 1e3:>8.2f}{p99 * 1e3:>8.2f}"
+
+
+async def main(count: int, processes: int, duration: float) -> None:
+    import aiohttp
+
+    from interactions.api.models.flags import Intents
+    from interactions.ext.voice.manager import VoiceManager
+    from interactions.ext.voice.player import PacingPolicy
+    from interactions.ext.voice.ratelimit import TokenBucket
+    from interactions.ext.voice.websocket import VoiceWebSocketClient
+    from interactions.ext.voice.worker import VoiceWorkerPool
+
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    server = context.Process(target=serve, args=(sender,), daemon=True)
+    server.start()
+    port, _ = receiver.recv()
+    endpoint = f"ws://127.0.0.1:{port}/"  # the stand-in has no TLS
+    session = aiohttp.ClientSession()
+    loop = asyncio.get_running_loop()
+
+    async def request(method: str, path: str) -> Dict:
+        async with session.request(method, f"http://127.0.0.1:{port}{path}") as response:
+            return await response.json()
+
+    async def dispatch_latency(shard: VoiceWebSocketClient) -> List[float]:
+        latencies = []
+        due = loop.time()
+        while len(latencies) < duration / 0.01:
+            due += 0.01
+            await asyncio.sleep(due - loop.time())
+            await shard._handle_connection({"op": 0, "t": "RESUMED", "s": 1, "d": {}})
+            latencies.append(loop.time() - due)
+        return latencies
+
+    print(
+        f"{'connections':<16}{'streams':>8}{'bot cpu %':>10}{'p50 ms':>8}{'p99 ms':>8}"
+        f"{'received %':>11}"
+    )
+    for workers in (None, VoiceWorkerPool(processes)):
+        voice = VoiceManager(workers=workers)
+        shard = VoiceWebSocketClient(
+            "token", Intents.DEFAULT, me=SimpleNamespace(id="1"), manager=voice
+        )
+        shard._dispatch = SimpleNamespace(dispatch=lambda *_: None)
+        shard._voice_state_bucket = TokenBucket(capacity=count)
+
+        async def send_packet(data: dict) -> None:
+            guild = data["d"]["guild_id"]
+            if data["d"]["channel_id"] is not None:
+                state = {"guild_id": guild, "user_id": "1", "session_id": f"session-{guild}"}
+                await shard._handle_connection({"op": 0, "t": "VOICE_STATE_UPDATE", "d": state})
+                server_data = {"guild_id": guild, "token": "token", "endpoint": endpoint}
+                await shard._handle_connection(
+                    {"op": 0, "t": "VOICE_SERVER_UPDATE", "d": server_data}
+                )
+
+        shard._send_packet = send_packet
+        voice.add_shard(shard)
+
+        results = await voice.connect_many({guild_id: 1 for guild_id in range(1, count + 1)})
+        failed = [error for error in results.values() if error is not None]
+        if failed:
+            print(f"{len(failed)} connections failed, the first with {failed[0]!r}")
+
+        players = [
+            asyncio.ensure_future(connection._play(EndlessSource(), PacingPolicy.CATCH_UP, False))
+            for connection in voice._connections.values()
+        ]
+        await asyncio.sleep(1.0)  # let every stream start before measuring
+
+        await request("POST", "/reset")
+        wall, cpu = time.perf_counter(), time.process_time()
+        latencies = await dispatch_latency(shard)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        stats = await request("GET", "/stats")
+
+        for player in players:
+            player.cancel()
+        for connection in voice._connections.values():
+            if workers is None and connection._player is not None:
+                connection._player.stop()
+        await asyncio.gather(*players, return_exceptions=True)
+        shard._voice_state_bucket = TokenBucket(capacity=count)
+        await voice.disconnect_all()
+
+        kind = "in process" if workers is None else f"{processes} workers"
+        print(
+            f"{kind:<16}{count:>8}{cpu / wall * 100:>10.1f}{_percentiles(latencies)}"
+            f"{stats['packets'] / (count * wall / 0.02) * 100:>11.1f}"
+        )
+
+    await session.close()
+    server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+            int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1,
+            float(sys.argv[3]) if len(sys.argv) > 3 else 5.0,
+        )
+    )
@@ -0,0 +1,244 @@
+"""
+A local stand-in for the Discord voice gateway and voice server, for offline benchmarks.
+
+The gateway is an aiohttp websocket server speaking ``HELLO``, ``READY``, ``SESSION_DESCRIPTION``,
+``HEARTBEAT_ACK`` and ``RESUMED``. The UDP endpoint answers IP discovery and counts the RTP packets
+of every SSRC together with how far their inter-arrival times deviate from 20 ms.
+
+Three HTTP routes drive and inspect it: ``POST /close?code=4000`` closes every gateway connection
+with a close code, ``GET /stats`` returns the counters as JSON and ``POST /reset`` zeroes them.
+
+Usage: ``python benchmarks/fake_gateway.py [port]``
+"""
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import WSMsgType, web
+
+FRAME_LENGTH = 0.02
+MODES = ("xsalsa20_poly1305_lite", "xsalsa20_poly1305_suffix", "xsalsa20_poly1305")
+_DISCOVERY_LENGTH = 74
+
+
+class _Stream:
+    __slots__ = ("packets", "bytes", "last", "jitter", "max_jitter")
+
+    def __init__(self) -> None:
+        self.packets = 0
+        self.bytes = 0
+        self.last: Optional[float] = None
+        self.jitter = 0.0  # the summed deviation of the inter-arrival times from FRAME_LENGTH
+        self.max_jitter = 0.0
+
+
+class FakeVoiceServer(asyncio.DatagramProtocol):
+    """Answers IP discovery and counts the RTP packets it receives."""
+
+    def __init__(self) -> None:
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.streams: Dict[int, _Stream] = {}
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if len(data) == _DISCOVERY_LENGTH and data[1] == 1:
+            response = bytearray(_DISCOVERY_LENGTH)
+            struct.pack_into(
+                ">HHI", response, 0, 2, _DISCOVERY_LENGTH - 4, *struct.unpack_from(">I", data, 4)
+            )
+            response[8 : 8 + len(addr[0])] = addr[0].encode("ascii")
+            struct.pack_into(">H", response, _DISCOVERY_LENGTH - 2, addr[1])
+            self.transport.sendto(bytes(response), addr)
+            return
+        if len(data) < 12 or data[0] != 0x80:
+            return
+
+        now = time.perf_counter()
+        (ssrc,) = struct.unpack_from(">I", data, 8)
+        stream = self.streams.get(ssrc)
+        if stream is None:
+            stream = self.streams[ssrc] = _Stream()
+        stream.packets += 1
+        stream.bytes += len(data)
+        if stream.last is not None:
+            jitter = abs(now - stream.last - FRAME_LENGTH)
+            stream.jitter += jitter
+            if jitter > stream.max_jitter:
+                stream.max_jitter = jitter
+        stream.last = now
+
+
+class FakeVoiceGateway:
+    """
+    The websocket gateway, with the UDP endpoint it points clients to.
+
+    Every ``IDENTIFY`` is assigned a new SSRC. The time from closing a connection until its session
+    is ``RESUMED``, or described again after a new ``IDENTIFY``, is recorded per session.
+    """
+
+    def __init__(self, heartbeat_interval: int = 13750, modes: Tuple[str, ...] = MODES) -> None:
+        self.heartbeat_interval = heartbeat_interval
+        self.modes = modes
+        self.udp = FakeVoiceServer()
+        self.udp_port = 0
+        self.port = 0
+        self.heartbeats = 0
+        self.identifies = 0
+        self.resumes = 0
+        self.reconnects: List[Tuple[str, float]] = []  # (kind, seconds)
+        self._sockets: List[web.WebSocketResponse] = []
+        self._closed: Dict[str, float] = {}  # session_id -> time its connection was closed
+        self._ssrc = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self, port: int = 0) -> None:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: self.udp, local_addr=("127.0.0.1", 0)
+        )
+        self.udp_port = transport.get_extra_info("sockname")[1]
+
+        app = web.Application()
+        app.router.add_get("/", self._gateway)
+        app.router.add_post("/close", self._close)
+        app.router.add_get("/stats", self._stats)
+        app.router.add_post("/reset", self._reset)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.udp.transport is not None:
+            self.udp.transport.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def stats(self) -> Dict[str, Any]:
+        streams = self.udp.streams.values()
+        packets = sum(stream.packets for stream in streams)
+        intervals = packets - sum(1 for stream in streams if stream.packets)
+        return {
+            "connections": len(self._sockets),
+            "identifies": self.identifies,
+            "resumes": self.resumes,
+            "heartbeats": self.heartbeats,
+            "reconnects": self.reconnects,
+            "streams": len(self.udp.streams),
+            "packets": packets,
+            "bytes": sum(stream.bytes for stream in streams),
+            "jitter_mean": sum(stream.jitter for stream in streams) / intervals
+            if intervals
+            else 0.0,
+            "jitter_max": max((stream.max_jitter for stream in streams), default=0.0),
+        }
+
+    async def _close(self, request: web.Request) -> web.Response:
+        code = int(request.query.get("code", 4000))
+        sockets = tuple(self._sockets)
+        now = time.perf_counter()
+        for socket in sockets:
+            self._closed[socket["session_id"]] = now
+            socket["close_code"] = code  # sent by the handler once its receive loop is broken
+        await asyncio.gather(*(socket.close(code=code) for socket in sockets))
+        return web.json_response({"closed": len(sockets)})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def _reset(self, request: web.Request) -> web.Response:
+        self.udp.streams.clear()
+        self.reconnects.clear()
+        self.heartbeats = self.identifies = self.resumes = 0
+        return web.json_response({})
+
+    def _reconnected(self, session_id: str, kind: str) -> None:
+        closed = self._closed.pop(session_id, None)
+        if closed is not None:
+            self.reconnects.append((kind, time.perf_counter() - closed))
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        socket["session_id"] = None
+        socket["close_code"] = 1000
+        self._sockets.append(socket)
+        await socket.send_json({"op": 8, "d": {"heartbeat_interval": self.heartbeat_interval}})
+
+        try:
+            async for message in socket:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                op, data = payload["op"], payload["d"]
+
+                if op == 0:  # IDENTIFY
+                    self.identifies += 1
+                    self._ssrc += 1
+                    socket["session_id"] = data["session_id"]
+                    await socket.send_json(
+                        {
+                            "op": 2,
+                            "d": {
+                                "ssrc": self._ssrc,
+                                "ip": "127.0.0.1",
+                                "port": self.udp_port,
+                                "modes": list(self.modes),
+                            },
+                        }
+                    )
+                elif op == 1:  # SELECT_PROTOCOL
+                    await socket.send_json(
+                        {
+                            "op": 4,
+                            "d": {
+                                "mode": data["data"]["mode"],
+                                "secret_key": list(os.urandom(32)),
+                                "media_session_id": "benchmark",
+                            },
+                        }
+                    )
+                    self._reconnected(socket["session_id"], "identify")
+                elif op == 3:  # HEARTBEAT
+                    self.heartbeats += 1
+                    await socket.send_json({"op": 6, "d": data})
+                elif op == 7:  # RESUME
+                    self.resumes += 1
+                    socket["session_id"] = data["session_id"]
+                    await socket.send_json({"op": 9, "d": None})
+                    self._reconnected(data["session_id"], "resume")
+            await socket.close(code=socket["close_code"])
+        finally:
+            self._sockets.remove(socket)
+
+        return socket
+
+
+def serve(pipe: Any, heartbeat_interval: int = 13750) -> None:
+    """Runs a gateway until the process is terminated, sending its ports through ``pipe``."""
+
+    async def main() -> None:
+        gateway = FakeVoiceGateway(heartbeat_interval)
+        await gateway.start()
+        pipe.send((gateway.port, gateway.udp_port))
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+
+    async def main(port: int) -> None:
+        gateway = FakeVoiceGateway()
+        await gateway.start(port)
+        print(f"Voice gateway on ws://127.0.0.1:{gateway.port}/, UDP on port {gateway.udp_port}")
+        await asyncio.Event().wait()
+
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 0))
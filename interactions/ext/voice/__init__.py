@@ -1,3 +1,26 @@
+from .cache import CachedOpusSource, FrameCache  # noqa: F401 F403
 from .client import VoiceClient  # noqa: F401 F403
+from .heartbeat import HeartbeatScheduler  # noqa: F401 F403
+from .index import VoiceStateIndex, VoiceStateRecord  # noqa: F401 F403
+from .manager import VoiceManager  # noqa: F401 F403
+from .metrics import Histogram, MetricsRegistry, VoiceMetrics  # noqa: F401 F403
+from .mixer import PCMMixer  # noqa: F401 F403
+from .opus import Encoder, OpusError, load_opus  # noqa: F401 F403
+from .pcm import PCMFileSource  # noqa: F401 F403
+from .player import AudioPlayer, PacerStats, PacingPolicy  # noqa: F401 F403
+from .receive import JitterBuffer, VoiceReceiver  # noqa: F401 F403
+from .recording import OggOpusWriter, RecordingSink  # noqa: F401 F403
+from .rtp import EncryptionMode  # noqa: F401 F403
+from .scheduler import MediaScheduler  # noqa: F401 F403
 from .setup import setup  # noqa: F401 F403
+from .sources import (  # noqa: F401 F403
+    AudioSource,
+    BroadcastSource,
+    BroadcastSubscriber,
+    OggOpusSource,
+    PCMSource,
+    is_silence,
+)
 from .state import VoiceState  # noqa: F401 F403
+from .udp import UDPEgress  # noqa: F401 F403
+from .worker import VoiceWorkerPool  # noqa: F401 F403
@@ -1,5 +1,12 @@
+from typing import Callable, Dict, Iterable, Mapping, Optional, Union
+
 from interactions.base import get_logger
 
+from .player import AudioPlayer, PacerStats, PacingPolicy
+from .receive import VoiceReceiver
+from .sources import AudioSource
+from .state import VoiceState
+
 __all__ = "_VoiceClient"
 
 log = get_logger("client")
@@ -12,6 +19,7 @@ class _VoiceClient:
         guild_id: int,
         self_deaf: bool = False,
         self_mute: bool = False,
+        timeout: Optional[float] = 30.0,
     ) -> None:
         """
         Connects the bot to a voice channel.
@@ -23,11 +31,14 @@ class _VoiceClient:
         :type self_deaf: bool
         :param self_mute: whether the bot is self-muted
         :type self_mute: bool
+        :param timeout: The time to wait for the connection at most, in seconds, or ``None`` to wait indefinitely. A connection that is not ready in time is closed and ``asyncio.TimeoutError`` is raised.
+        :type timeout: Optional[float]
         """
 
-        if guild_id in self._websocket._voice_connections.keys():
-            if self._websocket._voice_connections[guild_id]._closed is True:
-                del self._websocket._voice_connections[guild_id]
+        voice_client = self._voice.connection(guild_id)
+        if voice_client is not None:
+            if voice_client._closed is True:
+                del self._voice._connections[voice_client.guild_id]
 
             else:
                 log.warning(
@@ -35,25 +46,98 @@ class _VoiceClient:
                 )
                 return
 
-        await self._websocket._connect_vc(
+        await self._voice.connect(
             guild_id=guild_id,
             channel_id=channel_id,
             self_mute=self_mute,
             self_deaf=self_deaf,
+            timeout=timeout,
+        )
+
+    async def connect_many(
+        self,
+        channels: Dict[int, int],
+        self_deaf: bool = False,
+        self_mute: bool = False,
+        timeout: Optional[float] = 30.0,
+    ) -> Dict[int, Optional[BaseException]]:
+        """
+        Connects the bot to a voice channel in several guilds at once.
+
+        The joins run concurrently, but are paced to stay within the rate limit of the gateway. Guilds already connected to are skipped.
+        :param channels: The id of the channel to connect to for the id of every guild
+        :type channels: Dict[int, int]
+        :param self_deaf: whether the bot is self-deafened
+        :type self_deaf: bool
+        :param self_mute: whether the bot is self-muted
+        :type self_mute: bool
+        :param timeout: The time to wait for every connection at most, in seconds, once its join is sent, or ``None`` to wait indefinitely
+        :type timeout: Optional[float]
+        :return: The error connecting failed with for every guild, ``None`` if it succeeded
+        :rtype: Dict[int, Optional[BaseException]]
+        """
+
+        results: Dict[int, Optional[BaseException]] = {}
+        pending: Dict[int, int] = {}
+        for guild_id, channel_id in channels.items():
+            voice_client = self._voice.connection(guild_id)
+            if voice_client is not None and voice_client._closed is not True:
+                results[guild_id] = None
+            else:
+                pending[guild_id] = channel_id
+
+        results.update(
+            await self._voice.connect_many(
+                pending, self_mute=self_mute, self_deaf=self_deaf, timeout=timeout
+            )
         )
+        return results
 
-    async def play(self, guild_id: int) -> None:
+    async def play(
+        self,
+        guild_id: int,
+        source: Union[AudioSource, Callable[[], AudioSource]],
+        policy: PacingPolicy = PacingPolicy.CATCH_UP,
+        dtx: bool = True,
+    ) -> Optional[Union[AudioPlayer, PacerStats]]:
         """
-        Plays the audio stream.
+        Plays an audio source until it is exhausted.
         :param guild_id: The id of the guild to play the audio stream in
         :type guild_id: int
+        :param source: The source to play. With voice workers, it is sent to the worker process and has to be picklable, or be a picklable callable creating the source there, such as ``functools.partial(OggOpusSource, path)``.
+        :type source: Union[AudioSource, Callable[[], AudioSource]]
+        :param policy: How frames are handled that could not be sent in time
+        :type policy: PacingPolicy
+        :param dtx: Whether no packets are sent while the source is silent
+        :type dtx: bool
+        :return: The player of the finished playback, holding its late-frame accounting. With voice workers, only its late-frame accounting.
+        :rtype: Optional[Union[AudioPlayer, PacerStats]]
         """
 
-        if guild_id not in self._websocket._voice_connections.keys():
+        voice_client = self._voice.connection(guild_id)
+        if voice_client is None:
             log.warning("Not connected to a voice channel!")
             return
 
-        return await self._websocket._voice_connections[guild_id]._start_speaking()
+        return await voice_client._play(source, policy, dtx)
+
+    async def listen(self, guild_id: int) -> Optional[VoiceReceiver]:
+        """
+        Starts receiving the audio of the other users in the voice channel.
+
+        Iterating the returned receiver asynchronously yields ``(user_id, opus_frame, timestamp)`` tuples. Receiving is not available with voice workers, for which ``None`` is returned.
+        :param guild_id: The id of the guild to receive the audio of
+        :type guild_id: int
+        :return: The receiver of the connection
+        :rtype: Optional[VoiceReceiver]
+        """
+
+        voice_client = self._voice.connection(guild_id)
+        if voice_client is None:
+            log.warning("Not connected to a voice channel!")
+            return
+
+        return voice_client._listen()
 
     async def disconnect_vc(
         self,
@@ -65,15 +149,61 @@ class _VoiceClient:
         :type guild_id: int
         """
 
-        if guild_id not in self._websocket._voice_connections.keys():
+        if self._voice.connection(guild_id) is None:
             log.warning("Not connected to a voice channel!")
             return
 
-        return await self._websocket._disconnect_vc(guild_id=guild_id)
+        return await self._voice.disconnect(guild_id)
 
     async def disconnect_all_vc(self) -> None:
         """
         Disconnects all voice connections.
         """
 
-        return await self._websocket._disconnect_all_vc()
+        return await self._voice.disconnect_all()
+
+    async def disconnect_many(self, guild_ids: Iterable[int]) -> Dict[int, Optional[BaseException]]:
+        """
+        Disconnects the bot from the voice channels of several guilds at once.
+        :param guild_ids: The ids of the guilds to disconnect the bot from
+        :type guild_ids: Iterable[int]
+        :return: The error disconnecting failed with for every guild, ``None`` if it succeeded
+        :rtype: Dict[int, Optional[BaseException]]
+        """
+
+        results: Dict[int, Optional[BaseException]] = {}
+        connected = []
+        for guild_id in guild_ids:
+            if self._voice.connection(guild_id) is not None:
+                connected.append(guild_id)
+            else:
+                results[guild_id] = None
+
+        results.update(await self._voice.disconnect_many(connected))
+        return results
+
+    async def channel_members(self, guild_id: int, channel_id: int) -> Mapping[int, VoiceState]:
+        """
+        Gets the members in a voice channel, including the bot, from the voice states seen so far.
+
+        This is a lookup in an index, so it is cheap enough to run on every voice state update, such as to leave empty channels.
+        :param guild_id: The id of the guild the channel belongs to
+        :type guild_id: int
+        :param channel_id: The id of the channel
+        :type channel_id: int
+        :return: The voice state of every member in the channel, by user id
+        :rtype: Mapping[int, VoiceState]
+        """
+
+        return self._voice._states.members(guild_id, channel_id)
+
+    async def export_metrics(self) -> str:
+        """
+        Exports the metrics of every voice connection in the Prometheus text format.
+
+        The returned text can be served as is on a ``/metrics`` endpoint.
+        :return: The packet, frame, heartbeat, reconnect and event handling metrics of every guild
+        :rtype: str
+        """
+
+        return self._voice._metrics.export()
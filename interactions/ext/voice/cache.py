@@ -0,0 +1,270 @@
+from array import array
+from asyncio import get_running_loop
+from collections import OrderedDict
+from hashlib import sha256
+from mmap import ACCESS_READ, mmap
+from os import PathLike, replace, stat, unlink, utime
+from pathlib import Path
+from struct import Struct
+from sys import byteorder
+from tempfile import mkstemp
+from threading import Lock
+from typing import BinaryIO, Iterable, Optional, Union
+
+from interactions.base import get_logger
+
+from .rtp import FRAME_LENGTH
+from .sources import AudioSource, OggOpusSource
+
+__all__ = ("CachedOpusSource", "FrameCache")
+
+log = get_logger("voice")
+
+_MAGIC = b"IVFC"
+_HEADER = Struct("<4sII")  # magic, frame count, offset of the index
+_LENGTH = Struct("<H")
+_SUFFIX = ".frames"
+
+
+def _index_to_bytes(index: array) -> bytes:
+    if byteorder == "big":
+        index = array(index.typecode, index)
+        index.byteswap()
+    return index.tobytes()
+
+
+class CachedOpusSource(AudioSource):
+    """
+    Plays a source stored by a :class:`FrameCache`.
+
+    The container is mapped into memory; each frame is served as a slice of the mapping and the
+    array-backed offset index allows seeking to any frame in constant time.
+
+    :param path: The path of the container
+    :type path: Union[str, PathLike]
+    """
+
+    __slots__ = ("_map", "_index", "position")
+
+    def __init__(self, path: Union[str, PathLike]) -> None:
+        with open(path, "rb") as file:
+            self._map = mmap(file.fileno(), 0, access=ACCESS_READ)
+
+        magic, count, index = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a frame cache container.")
+
+        self._index = array("I")
+        self._index.frombytes(self._map[index : index + count * self._index.itemsize])
+        if byteorder == "big":
+            self._index.byteswap()
+        self.position: int = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def duration(self) -> float:
+        """
+        The duration of the source in seconds.
+        :rtype: float
+        """
+        return len(self._index) * FRAME_LENGTH
+
+    def seek(self, seconds: float) -> None:
+        """
+        Moves the playback to a point in time.
+        :param seconds: The time to continue playing from, in seconds
+        :type seconds: float
+        """
+        self.position = min(max(int(seconds / FRAME_LENGTH), 0), len(self._index))
+
+    def read(self) -> bytes:
+        if self.position >= len(self._index):
+            return b""
+
+        offset = self._index[self.position]
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        self.position += 1
+        offset += _LENGTH.size
+        return self._map[offset : offset + length]
+
+    def cleanup(self) -> None:
+        self._map.close()
+
+
+class FrameCache:
+    """
+    An on-disk cache of sources as ready-to-send Opus frames.
+
+    Every source is stored once, keyed by the SHA-256 hash of its content, in a compact container
+    of length-prefixed frames followed by an offset index. The total size on disk is bounded; when
+    it is exceeded, the least recently used containers are evicted. Recency is kept in the
+    modification time of the files, so it survives restarts.
+
+    :ivar int hits: The amount of lookups that found their source.
+    :ivar int misses: The amount of lookups that did not find their source.
+    :ivar int evictions: The amount of containers evicted to stay within ``max_size``.
+    """
+
+    __slots__ = (
+        "directory",
+        "max_size",
+        "size",
+        "hits",
+        "misses",
+        "evictions",
+        "_entries",
+        "_lock",
+    )
+
+    def __init__(self, directory: Union[str, PathLike], max_size: int = 512 * 1024**2) -> None:
+        """
+        :param directory: The directory to store the containers in
+        :type directory: Union[str, PathLike]
+        :param max_size: The maximum total size of the containers, in bytes
+        :type max_size: int
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = Lock()
+
+        files = [(path.stat(), path) for path in self.directory.glob(f"*{_SUFFIX}")]
+        for _stat, path in sorted(files, key=lambda file: file[0].st_mtime):
+            self._entries[path.stem] = _stat.st_size
+            self.size += _stat.st_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @staticmethod
+    def key(file: Union[str, PathLike, BinaryIO]) -> str:
+        """
+        Computes the cache key of a file from its content.
+        :param file: The path to the file, or an opened binary file object
+        :type file: Union[str, PathLike, BinaryIO]
+        :return: The key of the file
+        :rtype: str
+        """
+        digest = sha256()
+        if isinstance(file, (str, PathLike)):
+            with open(file, "rb") as _file:
+                for chunk in iter(lambda: _file.read(1 << 16), b""):
+                    digest.update(chunk)
+        else:
+            for chunk in iter(lambda: file.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    def get(self, key: str) -> Optional[CachedOpusSource]:
+        """
+        Looks a source up.
+        :param key: The key of the source
+        :type key: str
+        :return: The cached source, or ``None`` if it is not cached
+        :rtype: Optional[CachedOpusSource]
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            utime(path)
+            return CachedOpusSource(path)
+        except FileNotFoundError:  # removed behind our back
+            with self._lock:
+                self.size -= self._entries.pop(key, 0)
+            return None
+
+    def put(self, key: str, frames: Iterable[bytes]) -> CachedOpusSource:
+        """
+        Stores a source, evicting the least recently used ones if the cache grows too large.
+        :param key: The key of the source
+        :type key: str
+        :param frames: The Opus frames of the source
+        :type frames: Iterable[bytes]
+        :return: The cached source
+        :rtype: CachedOpusSource
+        """
+        path = self._path(key)
+        # concurrent loads of the same file each write a temporary file of their own
+        descriptor, temporary = mkstemp(prefix=f"{key}.", suffix=".tmp", dir=self.directory)
+        index = array("I")
+
+        try:
+            with open(descriptor, "wb") as file:
+                file.write(_HEADER.pack(_MAGIC, 0, 0))
+                offset = _HEADER.size
+                for frame in frames:
+                    index.append(offset)
+                    file.write(_LENGTH.pack(len(frame)))
+                    file.write(frame)
+                    offset += _LENGTH.size + len(frame)
+                file.write(_index_to_bytes(index))
+                file.seek(0)
+                file.write(_HEADER.pack(_MAGIC, len(index), offset))
+
+            replace(temporary, path)
+        except BaseException:
+            unlink(temporary)
+            raise
+        size = stat(path).st_size
+
+        with self._lock:
+            self.size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+        return CachedOpusSource(path)
+
+    def _evict(self) -> None:
+        while self.size > self.max_size and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+            try:
+                unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+            log.debug(f"Evicted {key} from the frame cache.")
+
+    def _load(self, file: Union[str, PathLike]) -> CachedOpusSource:
+        key = self.key(file)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        source = OggOpusSource(file)
+        try:
+            return self.put(key, iter(source.read, b""))
+        finally:
+            source.cleanup()
+
+    async def load(self, file: Union[str, PathLike]) -> CachedOpusSource:
+        """
+        Returns the cached source of an Ogg Opus file, demuxing and storing it on a miss.
+
+        Hashing and demuxing run in the default executor, so the event loop is not blocked.
+        :param file: The path to the Ogg Opus file
+        :type file: Union[str, PathLike]
+        :return: The cached source
+        :rtype: CachedOpusSource
+        """
+        return await get_running_loop().run_in_executor(None, self._load, file)
@@ -1,21 +1,58 @@
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, Mapping, Optional, Union
+
 from interactions.client.bot import Client
 
+from .manager import VoiceManager
+from .player import AudioPlayer, PacerStats, PacingPolicy
+from .receive import VoiceReceiver
+from .sources import AudioSource
+from .state import VoiceState
 from .websocket import VoiceWebSocketClient
 
-
 class VoiceClient(Client):
     _websocket: VoiceWebSocketClient
-    def __init__(self, token: str, **kwargs) -> None: ...
+    _voice: VoiceManager
+    def __init__(
+        self,
+        token: str,
+        *,
+        media_executor: Optional[Executor] = None,
+        media_parallelism: int = 1,
+        media_batching: bool = False,
+        voice_workers: int = 0,
+        **kwargs,
+    ) -> None: ...
     async def connect_vc(
         self,
         channel_id: int,
         guild_id: int,
         self_deaf: bool = False,
         self_mute: bool = False,
+        timeout: Optional[float] = 30.0,
     ) -> None: ...
-    async def play(self, guild_id: int) -> None: ...
+    async def connect_many(
+        self,
+        channels: Dict[int, int],
+        self_deaf: bool = False,
+        self_mute: bool = False,
+        timeout: Optional[float] = 30.0,
+    ) -> Dict[int, Optional[BaseException]]: ...
+    async def play(
+        self,
+        guild_id: int,
+        source: Union[AudioSource, Callable[[], AudioSource]],
+        policy: PacingPolicy = PacingPolicy.CATCH_UP,
+        dtx: bool = True,
+    ) -> Optional[Union[AudioPlayer, PacerStats]]: ...
+    async def listen(self, guild_id: int) -> Optional[VoiceReceiver]: ...
     async def disconnect_vc(
         self,
         guild_id: int,
     ) -> None: ...
     async def disconnect_all_vc(self) -> None: ...
+    async def disconnect_many(
+        self, guild_ids: Iterable[int]
+    ) -> Dict[int, Optional[BaseException]]: ...
+    async def channel_members(self, guild_id: int, channel_id: int) -> Mapping[int, VoiceState]: ...
+    async def export_metrics(self) -> str: ...
@@ -0,0 +1,79 @@
+from typing import Any, Union
+
+from aiohttp import ClientWebSocketResponse, WSMsgType
+
+try:
+    from orjson import dumps, loads
+except ImportError:
+    from json import dumps as _dumps
+    from json import loads
+
+    def dumps(obj: Any) -> bytes:
+        return _dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+__all__ = ("encode", "decode", "heartbeat", "speaking", "send_text")
+
+_HEARTBEAT = b'{"op":3,"d":%d}'
+_SPEAKING = b'{"op":5,"d":{"speaking":%d,"delay":0,"ssrc":%d}}'
+_SEND_FRAME = hasattr(ClientWebSocketResponse, "send_frame")  # aiohttp 3.11+
+
+
+def encode(payload: Any) -> bytes:
+    """
+    Serializes a payload of the voice gateway to UTF-8 encoded JSON.
+    :param payload: The payload to serialize
+    :type payload: Any
+    :return: The JSON of the payload
+    :rtype: bytes
+    """
+    return dumps(payload)
+
+
+def decode(data: Union[str, bytes]) -> Any:
+    """
+    Parses a payload of the voice gateway.
+    :param data: The JSON of the payload
+    :type data: Union[str, bytes]
+    :return: The payload
+    :rtype: Any
+    """
+    return loads(data)
+
+
+def heartbeat(nonce: int) -> bytes:
+    """
+    Fills the ``HEARTBEAT`` template.
+    :param nonce: The nonce the gateway echoes in its ``HEARTBEAT_ACK``
+    :type nonce: int
+    :return: The JSON of the payload
+    :rtype: bytes
+    """
+    return _HEARTBEAT % nonce
+
+
+def speaking(flags: int, ssrc: int) -> bytes:
+    """
+    Fills the ``SPEAKING`` template.
+    :param flags: The speaking flags, ``0`` to stop speaking
+    :type flags: int
+    :param ssrc: The SSRC of the connection
+    :type ssrc: int
+    :return: The JSON of the payload
+    :rtype: bytes
+    """
+    return _SPEAKING % (flags, ssrc)
+
+
+async def send_text(socket: ClientWebSocketResponse, data: bytes) -> None:
+    """
+    Sends UTF-8 encoded JSON as a text message, without decoding it first where aiohttp allows it.
+    :param socket: The websocket to send over
+    :type socket: ClientWebSocketResponse
+    :param data: The JSON to send
+    :type data: bytes
+    """
+    if _SEND_FRAME:
+        await socket.send_frame(data, WSMsgType.TEXT)
+    else:
+        await socket.send_str(data.decode("utf-8"))
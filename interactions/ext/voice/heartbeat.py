@@ -0,0 +1,80 @@
+from asyncio import TimerHandle, get_running_loop
+from heapq import heappop, heappush
+from itertools import count
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .voice import VoiceConnectionWebSocketClient
+
+__all__ = ("HeartbeatScheduler",)
+
+
+class HeartbeatScheduler:
+    """
+    Runs the heartbeats of every voice gateway connection of the process.
+
+    The due times of all connections are kept in a heap that is served by a single timer of the
+    event loop, so an idle connection costs a heap entry instead of a task with its own sleep loop.
+    A connection whose previous heartbeat was not acknowledged by the time the next one is due is
+    told to reconnect.
+    """
+
+    __slots__ = ("_heap", "_entries", "_handle", "_generation")
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, "VoiceConnectionWebSocketClient"]] = []
+        self._entries: Dict["VoiceConnectionWebSocketClient", Tuple[int, float]] = {}
+        self._handle: Optional[TimerHandle] = None
+        self._generation = count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, connection: "VoiceConnectionWebSocketClient", interval: float) -> None:
+        """
+        Starts the heartbeats of a connection, beginning with one right away.
+        :param connection: The connection to send heartbeats for
+        :type connection: VoiceConnectionWebSocketClient
+        :param interval: The time between two heartbeats, in seconds
+        :type interval: float
+        """
+        generation = next(self._generation)
+        self._entries[connection] = generation, interval
+        self._push(get_running_loop().time(), generation, connection)
+
+    def remove(self, connection: "VoiceConnectionWebSocketClient") -> None:
+        """
+        Stops the heartbeats of a connection.
+        :param connection: The connection to stop sending heartbeats for
+        :type connection: VoiceConnectionWebSocketClient
+        """
+        self._entries.pop(connection, None)  # its heap entry is skipped once it is due
+
+    def _push(
+        self, deadline: float, generation: int, connection: "VoiceConnectionWebSocketClient"
+    ) -> None:
+        heappush(self._heap, (deadline, generation, connection))
+        if self._handle is None or deadline < self._handle.when():
+            if self._handle is not None:
+                self._handle.cancel()
+            self._handle = get_running_loop().call_at(deadline, self._run)
+
+    def _run(self) -> None:
+        self._handle = None
+        heap = self._heap
+        loop = get_running_loop()
+        now = loop.time()
+
+        while heap and heap[0][0] <= now:
+            deadline, generation, connection = heappop(heap)
+            entry = self._entries.get(connection)
+            if entry is None or entry[0] != generation:
+                continue  # removed or added again since
+
+            if connection._beat(now):
+                heappush(heap, (max(deadline + entry[1], now), generation, connection))
+            else:
+                del self._entries[connection]
+
+        if heap:
+            self._handle = loop.call_at(heap[0][0], self._run)
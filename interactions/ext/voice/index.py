@@ -0,0 +1,143 @@
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Optional, Tuple, Union
+
+from .state import VoiceState
+
+__all__ = ("VoiceStateIndex", "VoiceStateRecord")
+
+_EMPTY: Mapping[int, VoiceState] = MappingProxyType({})
+
+
+class VoiceStateRecord:
+    """
+    The voice state of a member, with the one before it.
+
+    :ivar VoiceState state: The current voice state.
+    :ivar Optional[VoiceState] before: The previous voice state, if one was seen.
+    """
+
+    __slots__ = ("state", "before")
+
+    def __init__(self, state: VoiceState) -> None:
+        self.state = state
+        self.before: Optional[VoiceState] = None
+
+
+class VoiceStateIndex:
+    """
+    Indexes the voice states of the members in voice channels, by guild and user.
+
+    Next to the records by ``(guild_id, user_id)``, the members of every channel are kept by guild,
+    so the occupants of a channel are a lookup instead of a scan over every voice state. Members
+    are dropped once they leave voice, so the index only grows with the members currently in a
+    channel, including the bot itself.
+
+    Every state remembers only the state directly before it, see :attr:`VoiceState.before`.
+    """
+
+    __slots__ = ("_records", "_channels")
+
+    def __init__(self) -> None:
+        self._records: Dict[Tuple[int, int], VoiceStateRecord] = {}
+        self._channels: Dict[int, Dict[int, Dict[int, VoiceState]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[VoiceState]:
+        return iter(tuple(record.state for record in self._records.values()))
+
+    def update(self, state: VoiceState) -> VoiceStateRecord:
+        """
+        Records the new voice state of a member.
+        :param state: The state of a ``VOICE_STATE_UPDATE`` event
+        :type state: VoiceState
+        :return: The record of the member, holding the state before this one
+        :rtype: VoiceStateRecord
+        """
+        if state.guild_id is None:
+            return VoiceStateRecord(state)
+
+        guild_id, user_id = int(state.guild_id), int(state.user_id)
+        key = guild_id, user_id
+        record = self._records.get(key)
+        if record is None:
+            record = VoiceStateRecord(state)
+        else:
+            previous = record.state
+            self._leave(guild_id, user_id, previous.channel_id)
+            previous._before = None  # keeps the history at one state
+            record.before, record.state = previous, state
+            state._before = previous
+
+        if state.channel_id is None:
+            self._records.pop(key, None)
+        else:
+            self._records[key] = record
+            channels = self._channels.setdefault(guild_id, {})
+            channels.setdefault(int(state.channel_id), {})[user_id] = state
+        return record
+
+    def _leave(self, guild_id: int, user_id: int, channel_id: Optional[int]) -> None:
+        channels = self._channels.get(guild_id)
+        if channels is None or channel_id is None:
+            return
+        members = channels.get(int(channel_id))
+        if members is None:
+            return
+        members.pop(user_id, None)
+        if not members:
+            del channels[int(channel_id)]
+            if not channels:
+                del self._channels[guild_id]
+
+    def get(self, guild_id: Union[int, str], user_id: Union[int, str]) -> Optional[VoiceState]:
+        """
+        Gets the voice state of a member in voice.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        :param user_id: The id of the member
+        :type user_id: Union[int, str]
+        :return: The voice state, or ``None`` if the member is not in a voice channel of the guild
+        :rtype: Optional[VoiceState]
+        """
+        record = self._records.get((int(guild_id), int(user_id)))
+        return record.state if record is not None else None
+
+    def members(
+        self, guild_id: Union[int, str], channel_id: Union[int, str]
+    ) -> Mapping[int, VoiceState]:
+        """
+        Gets the members in a voice channel, as a read-only view that follows later updates until the channel empties.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        :param channel_id: The id of the channel
+        :type channel_id: Union[int, str]
+        :return: The voice state of every member in the channel, by user id
+        :rtype: Mapping[int, VoiceState]
+        """
+        members = self._channels.get(int(guild_id), {}).get(int(channel_id))
+        return MappingProxyType(members) if members is not None else _EMPTY
+
+    def occupancy(self, guild_id: Union[int, str], channel_id: Union[int, str]) -> int:
+        """
+        Counts the members in a voice channel.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        :param channel_id: The id of the channel
+        :type channel_id: Union[int, str]
+        :return: The amount of members in the channel
+        :rtype: int
+        """
+        return len(self._channels.get(int(guild_id), {}).get(int(channel_id), ()))
+
+    def remove_guild(self, guild_id: Union[int, str]) -> None:
+        """
+        Forgets the voice states of a guild, such as after leaving it or losing its shard.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        """
+        guild_id = int(guild_id)
+        self._channels.pop(guild_id, None)
+        for key in [key for key in self._records if key[0] == guild_id]:
+            del self._records[key]
@@ -0,0 +1,400 @@
+from asyncio import Event, TimeoutError, gather, wait_for
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Union
+
+from aiohttp import ClientSession, TCPConnector
+
+from interactions.api.enums import OpCodeType
+from interactions.base import get_logger
+
+from .heartbeat import HeartbeatScheduler
+from .index import VoiceStateIndex
+from .metrics import MetricsRegistry
+from .scheduler import MediaScheduler
+from .state import VoiceState
+from .supervisor import VoiceSupervisor
+from .voice import VoiceConnectionWebSocketClient
+from .worker import RemoteVoiceConnection, VoiceWorkerPool
+
+if TYPE_CHECKING:
+    from .websocket import VoiceWebSocketClient
+
+__all__ = ("VoiceManager",)
+
+log = get_logger("voice")
+
+
+class VoiceManager:
+    """
+    Owns the voice connections of a client and routes them across its gateway shards.
+
+    Discord only accepts the ``VOICE_STATE`` packet of a guild on the shard that receives the events
+    of that guild, shard ``(guild_id >> 22) % shard_count``. Every :class:`VoiceWebSocketClient`
+    sharing a manager registers itself under its shard when it connects, and each packet is sent
+    over the shard owning the guild, within the rate limit of that shard. The voice events are
+    handled whichever shard they arrive on, so the connections, their scheduler and their metrics
+    are shared by all shards of the process.
+
+    To run several shards in one process, pass the manager of the first one to the others::
+
+        shard = VoiceWebSocketClient(token, intents, me=me, manager=client._voice)
+
+    With ``workers``, the connections run in worker processes instead, see
+    :class:`VoiceWorkerPool`.
+
+    The connections are kept by the id of their guild as ``int``; every method accepts it as
+    ``int`` or ``str``.
+
+    :ivar int shard_count: The total amount of shards of the application.
+    """
+
+    __slots__ = (
+        "_shards",
+        "shard_count",
+        "_connect_data",
+        "_connections",
+        "_scheduler",
+        "_heartbeat",
+        "_metrics",
+        "_supervisor",
+        "_session",
+        "_workers",
+        "_states",
+    )
+
+    def __init__(
+        self,
+        scheduler: Optional[MediaScheduler] = None,
+        workers: Optional[VoiceWorkerPool] = None,
+    ) -> None:
+        self._shards: Dict[int, "VoiceWebSocketClient"] = {}
+        self.shard_count = 1
+        self._connect_data: Dict[int, dict] = {}
+        self._connections: Dict[
+            int, Union[VoiceConnectionWebSocketClient, RemoteVoiceConnection]
+        ] = {}
+        self._scheduler = scheduler if scheduler is not None else MediaScheduler()
+        self._heartbeat = HeartbeatScheduler()
+        self._session: Optional[ClientSession] = None
+        self._workers = workers
+        self._states = VoiceStateIndex()
+        self._metrics: MetricsRegistry
+        self._supervisor: Union[VoiceSupervisor, VoiceWorkerPool]
+        if workers is not None:
+            workers.on_error = self._error
+            self._metrics = workers.metrics
+            self._supervisor = workers
+        else:
+            self._metrics = MetricsRegistry()
+            self._supervisor = VoiceSupervisor(on_error=self._error)
+
+    def add_shard(
+        self, websocket: "VoiceWebSocketClient", shard_id: int = 0, shard_count: int = 1
+    ) -> None:
+        """
+        Registers the gateway connection of a shard, replacing the previous one of the shard.
+        :param websocket: The gateway connection of the shard
+        :type websocket: VoiceWebSocketClient
+        :param shard_id: The id of the shard
+        :type shard_id: int
+        :param shard_count: The total amount of shards of the application
+        :type shard_count: int
+        """
+        if self._shards and shard_count != self.shard_count:
+            log.warning(
+                f"Shard {shard_id} connects with {shard_count} shards, the others with {self.shard_count}."
+            )
+        self._shards[shard_id] = websocket
+        self.shard_count = shard_count
+
+    def remove_shard(self, websocket: "VoiceWebSocketClient") -> None:
+        """
+        Unregisters the gateway connection of a shard.
+
+        The voice states of its guilds are forgotten, as their updates stop arriving.
+        :param websocket: The gateway connection of the shard
+        :type websocket: VoiceWebSocketClient
+        """
+        for shard_id, shard in tuple(self._shards.items()):
+            if shard is websocket:
+                del self._shards[shard_id]
+                for guild_id in {int(state.guild_id) for state in self._states}:
+                    if self.shard_id(guild_id) == shard_id:
+                        self._states.remove_guild(guild_id)
+
+    def shard_id(self, guild_id: Union[int, str]) -> int:
+        """
+        Computes the shard that receives the events of a guild.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        :return: The id of the shard
+        :rtype: int
+        """
+        return (int(guild_id) >> 22) % self.shard_count
+
+    def shard(self, guild_id: Union[int, str]) -> "VoiceWebSocketClient":
+        """
+        Gets the gateway connection of the shard that receives the events of a guild.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        :return: The gateway connection of the shard
+        :rtype: VoiceWebSocketClient
+        """
+        shard_id = self.shard_id(guild_id)
+        if shard_id not in self._shards:
+            raise KeyError(f"Shard {shard_id} of guild {guild_id} is not connected.")
+        return self._shards[shard_id]
+
+    def connection(
+        self, guild_id: Union[int, str]
+    ) -> Optional[Union[VoiceConnectionWebSocketClient, RemoteVoiceConnection]]:
+        """
+        Gets the voice connection of a guild.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        :return: The connection, or ``None`` if there is none
+        :rtype: Optional[Union[VoiceConnectionWebSocketClient, RemoteVoiceConnection]]
+        """
+        return self._connections.get(int(guild_id))
+
+    async def _dispatch_voice_event(
+        self, event: str, data: dict, websocket: "VoiceWebSocketClient"
+    ) -> None:
+        """
+        Handles a ``VOICE_STATE_UPDATE`` or ``VOICE_SERVER_UPDATE`` event.
+        :param event: The name of the event
+        :type event: str
+        :param data: The data of the event
+        :type data: dict
+        :param websocket: The gateway connection of the shard the event arrived on
+        :type websocket: VoiceWebSocketClient
+        """
+        guild_id = int(data["guild_id"]) if data.get("guild_id") is not None else None
+        if event == "VOICE_STATE_UPDATE":
+            if (
+                guild_id is not None and data["user_id"] == websocket.user.id
+            ):  # TODO: check if user joined.
+                if guild_id not in self._connect_data:
+                    self._connect_data[guild_id] = {}
+
+                self._connect_data[guild_id].update(
+                    session_id=data["session_id"],
+                    user_id=int(data["user_id"]),
+                )
+
+            data["_client"] = websocket._http
+            state = VoiceState(**data)
+            self._states.update(state)
+
+            name: str = event.lower()
+            websocket._dispatch.dispatch(f"on_{name}", state)  # noqa
+        elif "can_return" not in self._connect_data.get(guild_id, ()):
+            log.debug(f"Ignoring the voice server of guild {guild_id}, not joining there.")
+        else:
+            self._connect_data[guild_id].update(token=data["token"], endpoint=data["endpoint"])
+            self._connect_data[guild_id]["can_return"].set()
+            self._start(guild_id, websocket)
+
+        websocket._dispatch.dispatch("raw_socket_create", data)
+
+    async def _remove_guild(self, guild_id: Union[int, str]) -> None:
+        """
+        Forgets a guild the bot left, closing its voice connection.
+        :param guild_id: The id of the guild
+        :type guild_id: Union[int, str]
+        """
+        guild_id = int(guild_id)
+        self._states.remove_guild(guild_id)
+        self._connect_data.pop(guild_id, None)
+        voice_client = self._connections.pop(guild_id, None)
+        if voice_client is not None:  # no need to leave, the bot is not in the guild anymore
+            voice_client._close = True
+            self._metrics.remove(guild_id)
+            await self._supervisor.stop(voice_client)
+
+    async def connect(
+        self,
+        guild_id: Union[int, str],
+        channel_id: Union[int, str],
+        self_mute: bool = False,
+        self_deaf: bool = False,
+        timeout: Optional[float] = 30.0,
+    ) -> None:
+        """
+        Joins a voice channel and waits until its connection is ready.
+
+        The ``VOICE_STATE`` packet waits for the rate limit of the shard first, the timeout only
+        starts once it is sent. A connection that is not ready in time is closed again.
+        :param guild_id: The id of the guild the channel belongs to
+        :type guild_id: Union[int, str]
+        :param channel_id: The id of the channel to join
+        :type channel_id: Union[int, str]
+        :param self_mute: Whether the bot is self-muted
+        :type self_mute: bool
+        :param self_deaf: Whether the bot is self-deafened
+        :type self_deaf: bool
+        :param timeout: The time to wait for the connection at most, in seconds, or ``None`` to wait indefinitely
+        :type timeout: Optional[float]
+        """
+        guild_id, channel_id = int(guild_id), str(channel_id)
+        self._connect_data[guild_id] = {}
+        self._connect_data[guild_id]["can_return"] = Event()
+        await self._send_voice_state(guild_id, channel_id, self_mute, self_deaf)
+        try:
+            await wait_for(self._wait(guild_id), timeout)
+        except TimeoutError:
+            log.warning(f"Voice connection of guild {guild_id} was not ready in {timeout}s.")
+            if guild_id in self._connections:
+                await self.disconnect(guild_id)
+            else:
+                del self._connect_data[guild_id]
+                await self._send_voice_state(guild_id, None)
+            raise
+
+    async def _wait(self, guild_id: int) -> None:
+        """Waits until the voice connection of a guild is ready, raising the error it failed with instead."""
+        await self._connect_data[guild_id]["can_return"].wait()
+
+        voice_client = self._connections.get(guild_id)
+        if voice_client is not None:
+            await self._supervisor.wait_ready(voice_client)
+
+    async def _send_voice_state(
+        self,
+        guild_id: int,
+        channel_id: Optional[str],
+        self_mute: bool = False,
+        self_deaf: bool = False,
+    ) -> None:
+        """
+        Sends a ``VOICE_STATE`` packet over the shard of the guild once its rate limit allows it.
+        :param guild_id: The id of the guild to update the voice state in
+        :type guild_id: int
+        :param channel_id: The id of the channel to join, ``None`` to leave
+        :type channel_id: Optional[str]
+        :param self_mute: Whether the bot is self-muted
+        :type self_mute: bool
+        :param self_deaf: Whether the bot is self-deafened
+        :type self_deaf: bool
+        """
+        payload: dict = {
+            "op": OpCodeType.VOICE_STATE,
+            "d": {
+                "channel_id": channel_id,
+                "guild_id": str(guild_id),
+                "self_deaf": self_deaf,
+                "self_mute": self_mute,
+            },
+        }
+        websocket = self.shard(guild_id)
+        await websocket._voice_state_bucket.acquire()
+        await websocket._send_packet(data=payload)
+
+    async def connect_many(
+        self,
+        channels: Dict[Union[int, str], Union[int, str]],
+        self_mute: bool = False,
+        self_deaf: bool = False,
+        timeout: Optional[float] = 30.0,
+    ) -> Dict[Union[int, str], Optional[BaseException]]:
+        """
+        Joins a voice channel in every guild at once.
+
+        The ``VOICE_STATE`` packets are paced by the rate limit of every shard, every guild gets its
+        own timeout once its packet is sent.
+        :param channels: The id of the channel to join for the id of every guild
+        :type channels: Dict[Union[int, str], Union[int, str]]
+        :param self_mute: Whether the bot is self-muted
+        :type self_mute: bool
+        :param self_deaf: Whether the bot is self-deafened
+        :type self_deaf: bool
+        :param timeout: The time to wait for every connection at most, in seconds, or ``None`` to wait indefinitely
+        :type timeout: Optional[float]
+        :return: The error joining failed with for every guild, ``None`` if it succeeded
+        :rtype: Dict[Union[int, str], Optional[BaseException]]
+        """
+        results = await gather(
+            *(
+                self.connect(guild_id, channel_id, self_mute, self_deaf, timeout)
+                for guild_id, channel_id in channels.items()
+            ),
+            return_exceptions=True,
+        )
+        return dict(zip(channels, results))
+
+    def _start(self, guild_id: int, websocket: "VoiceWebSocketClient") -> None:
+        """
+        Starts the voice connection of a guild in the background, replacing a running one.
+        :param guild_id: The id of the guild to connect in
+        :type guild_id: int
+        :param websocket: The gateway connection of the shard of the guild
+        :type websocket: VoiceWebSocketClient
+        """
+        if self._workers is not None:
+            voice_client = RemoteVoiceConnection(guild_id, self._connect_data[guild_id])
+        else:
+            if self._session is None or self._session.closed:
+                # every voice websocket holds a connection of the pool, whose default limit is 100
+                self._session = ClientSession(connector=TCPConnector(limit=0))
+
+            voice_client = VoiceConnectionWebSocketClient(
+                guild_id=guild_id,
+                data=self._connect_data[guild_id],
+                _http=websocket._http,
+                scheduler=self._scheduler,
+                heartbeat=self._heartbeat,
+                metrics=self._metrics.get(guild_id),
+                session=self._session,
+            )
+        self._connections[guild_id] = voice_client
+        self._supervisor.start(voice_client)
+
+    def _error(self, guild_id: int, error: BaseException) -> None:
+        """Dispatches the error a voice connection failed with for good."""
+        websocket = self._shards.get(self.shard_id(guild_id))
+        if websocket is not None:
+            websocket._dispatch.dispatch("on_voice_connection_error", guild_id, error)
+
+    async def disconnect(self, guild_id: Union[int, str]) -> None:
+        """
+        Closes an existing voice connection on a guild.
+        :param guild_id: The id of the guild to close the connection of
+        :type guild_id: Union[int, str]
+        """
+
+        guild_id = int(guild_id)
+        voice_client = self._connections.pop(guild_id)
+        voice_client._close = True
+        self._connect_data.pop(guild_id, None)
+        self._metrics.remove(guild_id)
+        try:
+            await self._send_voice_state(guild_id, None)
+        finally:
+            await self._supervisor.stop(voice_client)
+
+    async def disconnect_many(
+        self, guild_ids: Iterable[Union[int, str]]
+    ) -> Dict[Union[int, str], Optional[BaseException]]:
+        """
+        Closes the voice connections of several guilds at once.
+        :param guild_ids: The ids of the guilds to close the connections of
+        :type guild_ids: Iterable[Union[int, str]]
+        :return: The error closing failed with for every guild, ``None`` if it succeeded
+        :rtype: Dict[Union[int, str], Optional[BaseException]]
+        """
+        guild_ids = tuple(guild_ids)
+        results = await gather(
+            *(self.disconnect(guild_id) for guild_id in guild_ids), return_exceptions=True
+        )
+        return dict(zip(guild_ids, results))
+
+    async def disconnect_all(self) -> None:
+        """
+        Closes all existing voice connections, and stops the worker processes running them.
+        """
+
+        await self.disconnect_many(tuple(self._connections))
+        if self._workers is not None:
+            await self._workers.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,203 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+__all__ = ("Histogram", "VoiceMetrics", "MetricsRegistry")
+
+# The indices of VoiceMetrics.counters
+PACKETS_SENT = 0
+BYTES_SENT = 1
+PACKETS_RECEIVED = 2
+BYTES_RECEIVED = 3
+FRAMES_LATE = 4
+FRAMES_DROPPED = 5
+RECONNECTS = 6
+RESUMES = 7
+
+_COUNTERS: Tuple[Tuple[str, str], ...] = (
+    ("voice_packets_sent_total", "RTP packets sent to the voice server."),
+    ("voice_bytes_sent_total", "Bytes of RTP packets sent to the voice server."),
+    ("voice_packets_received_total", "UDP packets received from the voice server."),
+    ("voice_bytes_received_total", "Bytes of UDP packets received from the voice server."),
+    ("voice_frames_late_total", "Frames sent later than the late threshold of their player."),
+    ("voice_frames_dropped_total", "Overdue frames skipped by the DROP pacing policy."),
+    ("voice_reconnects_total", "Connections to the voice gateway after the first one."),
+    ("voice_resumes_total", "Voice gateway sessions resumed successfully."),
+)
+
+_LATENESS_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.04, 0.08, 0.16, 0.32)
+_RTT_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_OPCODES = 32
+
+
+class Histogram:
+    """
+    A histogram with fixed bucket bounds, in the layout of Prometheus.
+
+    :ivar Tuple[float, ...] bounds: The inclusive upper bounds of the buckets.
+    :ivar array buckets: The amount of values per bucket, the last one counting values above all
+        bounds. Unlike in the export, the counts are not cumulative.
+    :ivar float sum: The sum of all values.
+    """
+
+    __slots__ = ("bounds", "buckets", "sum")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.buckets = array("Q", bytes(8 * (len(self.bounds) + 1)))
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Records a value.
+        :param value: The value to record
+        :type value: float
+        """
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        """
+        The amount of recorded values.
+        :rtype: int
+        """
+        return sum(self.buckets)
+
+
+class VoiceMetrics:
+    """
+    The instrumentation of a voice connection.
+
+    Every value is stored in a preallocated array or a plain attribute, so recording on the hot path
+    is a single item update without any allocation or formatting.
+
+    :ivar array counters: The counters, indexed by the ``PACKETS_SENT``, ``BYTES_SENT``,
+        ``PACKETS_RECEIVED``, ``BYTES_RECEIVED``, ``FRAMES_LATE``, ``FRAMES_DROPPED``,
+        ``RECONNECTS`` and ``RESUMES`` constants of this module.
+    :ivar Histogram lateness: How late the frames were sent after their frame boundary, in seconds.
+    :ivar Histogram rtt: The round-trip times of the heartbeats, in seconds.
+    :ivar array handler_seconds: The time spent handling the events of the voice gateway, in
+        seconds, indexed by opcode.
+    :ivar array handler_calls: The amount of handled events of the voice gateway, indexed by opcode.
+    """
+
+    __slots__ = ("counters", "lateness", "rtt", "handler_seconds", "handler_calls")
+
+    def __init__(self) -> None:
+        self.counters = array("Q", bytes(8 * len(_COUNTERS)))
+        self.lateness = Histogram(_LATENESS_BOUNDS)
+        self.rtt = Histogram(_RTT_BOUNDS)
+        self.handler_seconds = array("d", bytes(8 * _OPCODES))
+        self.handler_calls = array("Q", bytes(8 * _OPCODES))
+
+    def handled(self, op: int, seconds: float) -> None:
+        """
+        Records the time spent handling an event of the voice gateway.
+        :param op: The opcode of the event
+        :type op: int
+        :param seconds: The time spent, in seconds
+        :type seconds: float
+        """
+        if 0 <= op < _OPCODES:
+            self.handler_seconds[op] += seconds
+            self.handler_calls[op] += 1
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of every voice connection of a client, by guild.
+
+    The metrics of a guild outlive reconnects of its connection, so its counters only ever grow
+    until the bot leaves the voice channel.
+    """
+
+    __slots__ = ("_connections",)
+
+    def __init__(self) -> None:
+        self._connections: Dict[int, VoiceMetrics] = {}
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def __iter__(self) -> Iterator[Tuple[int, VoiceMetrics]]:
+        return iter(tuple(self._connections.items()))
+
+    def get(self, guild_id: int) -> VoiceMetrics:
+        """
+        Gets the metrics of a guild, creating them on first use.
+        :param guild_id: The id of the guild
+        :type guild_id: int
+        :return: The metrics of the guild's connection
+        :rtype: VoiceMetrics
+        """
+        metrics = self._connections.get(guild_id)
+        if metrics is None:
+            metrics = self._connections[guild_id] = VoiceMetrics()
+        return metrics
+
+    def put(self, guild_id: int, metrics: VoiceMetrics) -> None:
+        """
+        Replaces the metrics of a guild, such as with a snapshot from another process.
+        :param guild_id: The id of the guild
+        :type guild_id: int
+        :param metrics: The metrics of the guild's connection
+        :type metrics: VoiceMetrics
+        """
+        self._connections[guild_id] = metrics
+
+    def remove(self, guild_id: int) -> None:
+        """
+        Forgets the metrics of a guild.
+        :param guild_id: The id of the guild
+        :type guild_id: int
+        """
+        self._connections.pop(guild_id, None)
+
+    def export(self) -> str:
+        """
+        Formats the metrics of every connection in the Prometheus text exposition format.
+        :return: The metrics, labelled with the id of their guild
+        :rtype: str
+        """
+        connections = [(f'guild_id="{guild_id}"', metrics) for guild_id, metrics in self]
+        lines: List[str] = []
+
+        for index, (name, description) in enumerate(_COUNTERS):
+            lines += (f"# HELP {name} {description}", f"# TYPE {name} counter")
+            lines += [
+                f"{name}{{{labels}}} {metrics.counters[index]}" for labels, metrics in connections
+            ]
+
+        for name, attribute, description in (
+            ("voice_frame_lateness_seconds", "lateness", "Lateness of sent frames."),
+            ("voice_heartbeat_rtt_seconds", "rtt", "Round-trip time of the gateway heartbeats."),
+        ):
+            lines += (f"# HELP {name} {description}", f"# TYPE {name} histogram")
+            for labels, metrics in connections:
+                histogram: Histogram = getattr(metrics, attribute)
+                total = 0
+                for bound, count in zip((*histogram.bounds, "+Inf"), histogram.buckets):
+                    total += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum!r}")
+                lines.append(f"{name}_count{{{labels}}} {total}")
+
+        for name, attribute, description in (
+            (
+                "voice_handler_seconds_total",
+                "handler_seconds",
+                "Time spent handling gateway events.",
+            ),
+            ("voice_handler_calls_total", "handler_calls", "Gateway events handled."),
+        ):
+            lines += (f"# HELP {name} {description}", f"# TYPE {name} counter")
+            for labels, metrics in connections:
+                values = getattr(metrics, attribute)
+                lines += [
+                    f'{name}{{{labels},op="{op}"}} {values[op]!r}'
+                    for op, calls in enumerate(metrics.handler_calls)
+                    if calls
+                ]
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional
+
+from .rtp import CHANNELS, PCM_FRAME_SIZE, SAMPLES_PER_FRAME
+from .sources import PCMSource
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ("PCMMixer",)
+
+_SILENCE = bytes(PCM_FRAME_SIZE)
+
+
+class PCMMixer(PCMSource):
+    """
+    Mixes several PCM sources into one, e.g. music, text-to-speech and sound effects.
+
+    Each frame, the inputs are read into the rows of a preallocated matrix, weighted by their gain
+    and summed in a single vectorized product, then saturated to the 16-bit range. Inputs can be
+    added, removed and re-weighted while the mixer is playing; changes apply from the next frame
+    on. Exhausted inputs are removed and cleaned up automatically.
+
+    This requires ``numpy``.
+
+    :param keep_alive: Whether the mixer keeps playing silence while it has no inputs, instead of
+        ending once the last input is exhausted
+    :type keep_alive: bool
+    :param silence_threshold: The RMS level below which a mixed frame counts as silent
+    :type silence_threshold: Optional[float]
+    """
+
+    __slots__ = ("_inputs", "_gains", "_stack", "_mix", "_out", "keep_alive")
+
+    def __init__(self, keep_alive: bool = False, silence_threshold: Optional[float] = None) -> None:
+        if np is None:
+            raise ImportError(
+                "PCMMixer requires numpy. Install it with `pip install interactions-voice[numpy]`."
+            )
+
+        super().__init__(silence_threshold)
+        self._inputs: Dict[PCMSource, float] = {}
+        self._gains: Optional["np.ndarray"] = None
+        self._stack = np.zeros((4, SAMPLES_PER_FRAME * CHANNELS), dtype=np.float32)
+        self._mix = np.zeros(SAMPLES_PER_FRAME * CHANNELS, dtype=np.float32)
+        self._out = np.zeros(SAMPLES_PER_FRAME * CHANNELS, dtype="<i2")
+        self.keep_alive = keep_alive
+
+    def __len__(self) -> int:
+        return len(self._inputs)
+
+    def __contains__(self, source: PCMSource) -> bool:
+        return source in self._inputs
+
+    def add(self, source: PCMSource, gain: float = 1.0) -> None:
+        """
+        Adds an input to the mix.
+        :param source: The source to mix in
+        :type source: PCMSource
+        :param gain: The factor the samples of the source are multiplied with
+        :type gain: float
+        """
+        self._inputs[source] = gain
+        self._gains = None
+
+    def remove(self, source: PCMSource) -> None:
+        """
+        Removes an input from the mix and cleans it up.
+        :param source: The source to remove
+        :type source: PCMSource
+        """
+        if self._inputs.pop(source, None) is not None:
+            self._gains = None
+            source.cleanup()
+
+    def set_gain(self, source: PCMSource, gain: float) -> None:
+        """
+        Changes the gain of an input.
+        :param source: The source to change the gain of
+        :type source: PCMSource
+        :param gain: The factor the samples of the source are multiplied with
+        :type gain: float
+        """
+        if source not in self._inputs:
+            raise KeyError("The source is not an input of the mixer.")
+        self._inputs[source] = gain
+        self._gains = None
+
+    def read_pcm(self) -> bytes:
+        inputs = tuple(self._inputs)
+        if not inputs:
+            return _SILENCE if self.keep_alive else b""
+
+        if self._gains is None:
+            self._gains = np.fromiter(self._inputs.values(), dtype=np.float32, count=len(inputs))
+        if len(self._stack) < len(inputs):
+            self._stack = np.zeros((len(inputs), self._stack.shape[1]), dtype=np.float32)
+
+        stack = self._stack[: len(inputs)]
+        exhausted: List[PCMSource] = []
+        for row, source in zip(stack, inputs):
+            samples = np.frombuffer(source.read_pcm(), dtype="<i2")
+            if not len(samples):
+                exhausted.append(source)
+            row[: len(samples)] = samples
+            row[len(samples) :] = 0
+
+        np.dot(self._gains, stack, out=self._mix)
+        np.clip(self._mix, -32768, 32767, out=self._mix)
+        self._out[:] = self._mix
+
+        for source in exhausted:
+            self.remove(source)
+        if len(exhausted) == len(inputs) and not self.keep_alive:
+            return b""
+        return self._out.tobytes()
+
+    def cleanup(self) -> None:
+        for source in tuple(self._inputs):
+            self.remove(source)
@@ -0,0 +1,129 @@
+import ctypes
+import ctypes.util
+from typing import Optional
+
+from .rtp import CHANNELS, SAMPLES_PER_FRAME, SAMPLING_RATE
+
+__all__ = ("OpusError", "Application", "Encoder", "load_opus", "is_loaded")
+
+_OK = 0
+_MAX_PACKET_SIZE = 4000
+_SET_BITRATE = 4002
+_SET_INBAND_FEC = 4012
+_SET_PACKET_LOSS_PERC = 4014
+
+
+class Application:
+    VOIP = 2048
+    AUDIO = 2049
+    LOWDELAY = 2051
+
+
+class OpusError(Exception):
+    """Raised when libopus cannot be loaded or reports an error."""
+
+
+_lib: Optional[ctypes.CDLL] = None
+
+
+def load_opus(name: Optional[str] = None) -> None:
+    """
+    Loads libopus, which is needed to encode PCM sources.
+
+    This is done automatically the first time an encoder is created, so it is only needed if
+    the library cannot be found under its usual name.
+    :param name: The name or path of the library. Defaults to searching for ``opus``.
+    :type name: Optional[str]
+    """
+    global _lib
+
+    name = name or ctypes.util.find_library("opus")
+    if name is None:
+        raise OpusError("libopus could not be found. Install it or pass its path to load_opus.")
+
+    lib = ctypes.CDLL(name)
+    lib.opus_strerror.argtypes = [ctypes.c_int]
+    lib.opus_strerror.restype = ctypes.c_char_p
+    lib.opus_encoder_create.argtypes = [
+        ctypes.c_int32,
+        ctypes.c_int,
+        ctypes.c_int,
+        ctypes.POINTER(ctypes.c_int),
+    ]
+    lib.opus_encoder_create.restype = ctypes.c_void_p
+    lib.opus_encode.argtypes = [
+        ctypes.c_void_p,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int32,
+    ]
+    lib.opus_encode.restype = ctypes.c_int32
+    lib.opus_encoder_ctl.restype = ctypes.c_int
+    lib.opus_encoder_destroy.argtypes = [ctypes.c_void_p]
+    lib.opus_encoder_destroy.restype = None
+    _lib = lib
+
+
+def is_loaded() -> bool:
+    """
+    Whether libopus is loaded.
+    :rtype: bool
+    """
+    return _lib is not None
+
+
+def _check(result: int) -> int:
+    if result < _OK:
+        raise OpusError(_lib.opus_strerror(result).decode("utf-8"))
+    return result
+
+
+class Encoder:
+    """
+    Encodes 20 ms frames of 48 kHz 16-bit stereo PCM to Opus.
+
+    :param application: The application the encoder is tuned for
+    :type application: int
+    :param bitrate: The bitrate in kbit/s
+    :type bitrate: int
+    :param packet_loss: The expected packet loss in percent, enabling in-band FEC if not ``0``
+    :type packet_loss: int
+    """
+
+    __slots__ = ("_state", "_out")
+
+    def __init__(
+        self, application: int = Application.AUDIO, bitrate: int = 128, packet_loss: int = 15
+    ) -> None:
+        if _lib is None:
+            load_opus()
+
+        error = ctypes.c_int()
+        self._state = _lib.opus_encoder_create(
+            SAMPLING_RATE, CHANNELS, application, ctypes.byref(error)
+        )
+        _check(error.value)
+        self._out = ctypes.create_string_buffer(_MAX_PACKET_SIZE)
+
+        _check(_lib.opus_encoder_ctl(self._state, _SET_BITRATE, ctypes.c_int(bitrate * 1000)))
+        _check(_lib.opus_encoder_ctl(self._state, _SET_INBAND_FEC, ctypes.c_int(bool(packet_loss))))
+        _check(_lib.opus_encoder_ctl(self._state, _SET_PACKET_LOSS_PERC, ctypes.c_int(packet_loss)))
+
+    def encode(self, pcm: bytes) -> bytes:
+        """
+        Encodes a single frame.
+        :param pcm: 20 ms of 48 kHz 16-bit stereo PCM
+        :type pcm: bytes
+        :return: The Opus frame
+        :rtype: bytes
+        """
+        size = _check(
+            _lib.opus_encode(self._state, pcm, SAMPLES_PER_FRAME, self._out, _MAX_PACKET_SIZE)
+        )
+        return ctypes.string_at(self._out, size)
+
+    def __del__(self) -> None:
+        if getattr(self, "_state", None):
+            _lib.opus_encoder_destroy(self._state)
+            self._state = None
@@ -0,0 +1,204 @@
+from mmap import ACCESS_READ, mmap
+from os import PathLike
+from struct import unpack_from
+from typing import BinaryIO, Optional, Tuple, Union
+
+from .rtp import CHANNELS, PCM_FRAME_SIZE, SAMPLING_RATE
+from .sources import PCMSource
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ("PCMFileSource",)
+
+_PCM = 0x0001
+_FLOAT = 0x0003
+_EXTENSIBLE = 0xFFFE
+
+# (format, bits) -> (dtype, factor scaling the samples to the 16-bit range)
+_FORMATS = {
+    (_PCM, 8): ("u1", 256.0),
+    (_PCM, 16): ("<i2", 1.0),
+    (_PCM, 24): ("u1", 1 / 256),
+    (_PCM, 32): ("<i4", 1 / 65536),
+    (_FLOAT, 32): ("<f4", 32768.0),
+}
+
+
+def _parse_wav(data: mmap) -> Tuple[int, int, int, int, int, int]:
+    """Returns the format, bits per sample, channels, sample rate, offset and size of the samples."""
+    fmt: Optional[Tuple[int, int, int, int]] = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk, size = data[offset : offset + 4], unpack_from("<I", data, offset + 4)[0]
+        offset += 8
+        if chunk == b"fmt ":
+            format, channels, rate = unpack_from("<HHI", data, offset)
+            (bits,) = unpack_from("<H", data, offset + 14)
+            if format == _EXTENSIBLE and size >= 26:
+                (format,) = unpack_from("<H", data, offset + 24)
+            fmt = format, bits, channels, rate
+        elif chunk == b"data":
+            if fmt is None:
+                break
+            return (*fmt, offset, min(size, len(data) - offset))
+        offset += size + (size & 1)
+
+    raise ValueError("Invalid WAV file, the fmt or data chunk is missing.")
+
+
+class PCMFileSource(PCMSource):
+    """
+    Plays a WAV or raw PCM file of any sample rate and channel count.
+
+    The file is mapped into memory and converted to 48 kHz 16-bit stereo in blocks of
+    ``block_length`` seconds: every block is down- or up-mixed to two channels and linearly
+    resampled with a few vectorized NumPy operations. A block is only converted once the frames
+    of the previous one were read.
+
+    WAV files may hold 8, 16, 24 or 32-bit integer or 32-bit float samples. Files without a WAV
+    header are read as raw 16-bit little-endian PCM of ``sample_rate`` and ``channels``.
+
+    This requires ``numpy``.
+
+    :param file: The path to the file, or an opened binary file object
+    :type file: Union[str, PathLike, BinaryIO]
+    :param sample_rate: The sample rate of a raw PCM file
+    :type sample_rate: int
+    :param channels: The channel count of a raw PCM file
+    :type channels: int
+    :param block_length: The length of the blocks converted at once, in seconds
+    :type block_length: float
+    :param silence_threshold: The RMS level below which a frame counts as silent
+    :type silence_threshold: Optional[float]
+    """
+
+    __slots__ = (
+        "_map",
+        "_samples",
+        "_factor",
+        "_packed",
+        "_block",
+        "_ratio",
+        "_read",
+        "_next",
+        "_tail",
+        "_pcm",
+        "_offset",
+        "sample_rate",
+        "channels",
+    )
+
+    def __init__(
+        self,
+        file: Union[str, PathLike, BinaryIO],
+        sample_rate: int = SAMPLING_RATE,
+        channels: int = CHANNELS,
+        block_length: float = 1.0,
+        silence_threshold: Optional[float] = None,
+    ) -> None:
+        if np is None:
+            raise ImportError(
+                "PCMFileSource requires numpy. Install it with `pip install interactions-voice[numpy]`."
+            )
+
+        super().__init__(silence_threshold)
+        if isinstance(file, (str, PathLike)):
+            with open(file, "rb") as _file:
+                self._map = mmap(_file.fileno(), 0, access=ACCESS_READ)
+        else:
+            self._map = mmap(file.fileno(), 0, access=ACCESS_READ)
+
+        format, bits, offset, size = _PCM, 16, 0, len(self._map)
+        if self._map[:4] == b"RIFF" and self._map[8:12] == b"WAVE":
+            format, bits, channels, sample_rate, offset, size = _parse_wav(self._map)
+        if (format, bits) not in _FORMATS:
+            self._map.close()
+            raise ValueError(f"Unsupported sample format {format} with {bits} bits per sample.")
+
+        dtype, self._factor = _FORMATS[format, bits]
+        self._packed = bits == 24
+        width = bits // 8 * channels
+        count = size // width * width // np.dtype(dtype).itemsize
+        samples = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+        self._samples: "np.ndarray" = samples.reshape(
+            -1, channels * 3 if self._packed else channels
+        )
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._block = max(int(sample_rate * block_length), 1)
+        self._ratio = sample_rate / SAMPLING_RATE
+        self._read: int = 0
+        self._next: int = 0
+        self._tail: Optional["np.ndarray"] = None
+        self._pcm = b""
+        self._offset: int = 0
+
+    @property
+    def duration(self) -> float:
+        """
+        The duration of the file in seconds.
+        :rtype: float
+        """
+        return len(self._samples) / self.sample_rate
+
+    def _stereo(self, block: "np.ndarray") -> "np.ndarray":
+        if self._packed:  # 24-bit samples, assembled from their three bytes
+            block = block.reshape(len(block), -1, 3)
+            block = (
+                block[..., 0].astype(np.int32)
+                | (block[..., 1].astype(np.int32) << 8)
+                | (block[..., 2].view(np.int8).astype(np.int32) << 16)
+            )
+        block = block.astype(np.float32)
+        if self._factor == 256.0:  # unsigned 8-bit samples
+            block -= 128
+        block *= self._factor
+
+        if self.channels == 1:
+            return np.repeat(block, 2, axis=1)
+        if self.channels == 2:
+            return block
+        return np.stack((block[:, 0::2].mean(axis=1), block[:, 1::2].mean(axis=1)), axis=1)
+
+    def _convert(self) -> bytes:
+        """Converts the next block to 48 kHz 16-bit stereo PCM."""
+        start = self._read
+        self._read = min(start + self._block, len(self._samples))
+        block = self._stereo(self._samples[start : self._read])
+
+        if self._ratio != 1:
+            base = start
+            if self._tail is not None:
+                block = np.concatenate((self._tail, block))
+                base -= 1
+            self._tail = block[-1:]
+
+            last = base + len(block) - 1  # the position of the last input sample
+            end = int(last / self._ratio) + 1
+            positions = np.arange(self._next, end, dtype=np.float64) * self._ratio - base
+            self._next = max(end, self._next)
+
+            index = positions.astype(np.intp)
+            upper = np.minimum(index + 1, len(block) - 1)
+            fraction = (positions - index).astype(np.float32)[:, None]
+            block = block[index] * (1 - fraction) + block[upper] * fraction
+
+        np.clip(block, -32768, 32767, out=block)
+        return block.astype("<i2").tobytes()
+
+    def read_pcm(self) -> bytes:
+        while len(self._pcm) - self._offset < PCM_FRAME_SIZE and self._read < len(self._samples):
+            self._pcm = self._pcm[self._offset :] + self._convert()
+            self._offset = 0
+
+        frame = self._pcm[self._offset : self._offset + PCM_FRAME_SIZE]
+        self._offset += len(frame)
+        return frame
+
+    def cleanup(self) -> None:
+        self._samples = self._tail = None
+        self._map.close()
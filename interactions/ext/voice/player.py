@@ -0,0 +1,348 @@
+from array import array
+from asyncio import FIRST_COMPLETED, Event, Task, ensure_future, get_running_loop, wait
+from enum import IntEnum
+from typing import TYPE_CHECKING, Coroutine, List, Optional
+
+from interactions.base import get_logger
+
+from .metrics import FRAMES_DROPPED, FRAMES_LATE
+from .rtp import FRAME_LENGTH, SAMPLES_PER_FRAME
+from .sources import OPUS_SILENCE, AudioSource, is_silence
+
+if TYPE_CHECKING:
+    from .voice import VoiceConnectionWebSocketClient
+
+__all__ = ("PacingPolicy", "PacerStats", "AudioPlayer")
+
+log = get_logger("voice")
+
+_TRAILING_SILENCE_FRAMES = 5
+
+
+class PacingPolicy(IntEnum):
+    """What the player does with frames whose send time already passed."""
+
+    CATCH_UP = 0  # send overdue frames back to back until the schedule is met again
+    DROP = 1  # skip overdue frames to stay aligned with the wall clock
+
+
+class PacerStats:
+    """
+    Late-frame accounting of a player.
+
+    :ivar int frames_sent: The amount of frames sent.
+    :ivar int frames_late: The amount of frames sent later than ``late_threshold``.
+    :ivar int frames_dropped: The amount of frames skipped by :attr:`PacingPolicy.DROP`.
+    :ivar int frames_suppressed: The amount of silent frames not sent because of DTX.
+    :ivar float max_lateness: The largest lateness seen, in seconds.
+    :ivar float total_lateness: The sum of all lateness, in seconds.
+    :ivar array lateness: The lateness of the most recent frames, in seconds, as a ring buffer.
+    """
+
+    __slots__ = (
+        "frames_sent",
+        "frames_late",
+        "frames_dropped",
+        "frames_suppressed",
+        "max_lateness",
+        "total_lateness",
+        "late_threshold",
+        "lateness",
+        "_cursor",
+    )
+
+    def __init__(self, history: int = 500, late_threshold: float = FRAME_LENGTH / 4) -> None:
+        self.frames_sent: int = 0
+        self.frames_late: int = 0
+        self.frames_dropped: int = 0
+        self.frames_suppressed: int = 0
+        self.max_lateness: float = 0.0
+        self.total_lateness: float = 0.0
+        self.late_threshold = late_threshold
+        self.lateness = array("d", bytes(8 * history))
+        self._cursor: int = 0
+
+    def record(self, lateness: float) -> None:
+        """
+        Records the lateness of a sent frame.
+        :param lateness: How late the frame was sent, in seconds
+        :type lateness: float
+        """
+        self.frames_sent += 1
+        self.total_lateness += lateness
+        if lateness > self.late_threshold:
+            self.frames_late += 1
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        self.lateness[self._cursor] = lateness
+        self._cursor = (self._cursor + 1) % len(self.lateness)
+
+    @property
+    def mean_lateness(self) -> float:
+        """
+        The average lateness of all sent frames, in seconds.
+        :rtype: float
+        """
+        return self.total_lateness / self.frames_sent if self.frames_sent else 0.0
+
+
+class AudioPlayer:
+    """
+    Sends the frames of a source over a voice connection, one every 20 ms.
+
+    The player does not run a task of its own: while playing, it is registered to the
+    :class:`MediaScheduler` of the connection, which ticks every player at the same absolute
+    ``loop.time()`` frame boundaries. While the connection is re-establishing its session, the
+    player is paused instead of consuming the source, so playback continues where it left off. If
+    the connection is closed or gives up instead, :meth:`play` raises the error it ended with.
+
+    With ``dtx``, silent stretches of the source are not sent: after the five silence frames that
+    have to end a transmission, the player stops speaking and only advances the RTP timestamp until
+    audio resumes, at which point it starts speaking again. The silence ending the playback is
+    paced by the scheduler as well, unless the player is stopped to hand the connection over to
+    another one, which keeps speaking instead.
+
+    :ivar AudioSource source: The source being played.
+    :ivar PacingPolicy policy: How overdue frames are handled.
+    :ivar bool dtx: Whether no packets are sent while the source is silent.
+    :ivar float max_lag: The lag in seconds after which :attr:`PacingPolicy.CATCH_UP` gives up
+        catching up and only sends the current frame.
+    :ivar PacerStats stats: The late-frame accounting of the player.
+    """
+
+    __slots__ = (
+        "_connection",
+        "source",
+        "policy",
+        "max_lag",
+        "dtx",
+        "stats",
+        "_done",
+        "_ended",
+        "_finished",
+        "_error",
+        "_silent",
+        "_talking",
+        "_handoff",
+        "_speaking",
+        "_held",
+    )
+
+    def __init__(
+        self,
+        connection: "VoiceConnectionWebSocketClient",
+        source: AudioSource,
+        policy: PacingPolicy = PacingPolicy.CATCH_UP,
+        max_lag: float = 0.2,
+        dtx: bool = True,
+    ) -> None:
+        self._connection = connection
+        self.source = source
+        self.policy = policy
+        self.max_lag = max_lag
+        self.dtx = dtx
+        self.stats = PacerStats()
+        self._done = Event()
+        self._ended = Event()  # the trailing silence is sent
+        self._finished = Event()  # play() returned
+        self._error: Optional[BaseException] = None
+        self._silent: int = 0  # the amount of consecutive silent frames
+        self._talking = False  # whether the last speaking update started speaking
+        self._handoff = False
+        self._speaking: Optional[Task] = None
+        self._held: List[bytes] = []  # frames waiting for the update to start speaking
+
+    def stop(self, handoff: bool = False) -> None:
+        """
+        Stops the playback after the current frame.
+        :param handoff: Whether another player takes over the connection right away, so neither the trailing silence nor the end of speaking is sent
+        :type handoff: bool
+        """
+        self._handoff = self._handoff or handoff
+        self._done.set()
+
+    @property
+    def playing(self) -> bool:
+        """
+        Whether the player is still playing.
+        :rtype: bool
+        """
+        return not self._done.is_set()
+
+    async def play(self) -> None:
+        """Plays the source until it is exhausted or the player is stopped."""
+        connection = self._connection
+        try:
+            if not connection.media_ready.is_set():
+                await self._wait_ready()
+            if not self._done.is_set():  # not stopped before the connection was ready
+                await connection._start_speaking()
+                self._talking = True
+                connection._scheduler.register(self)
+                await self._done.wait()
+                await self._ended.wait()
+        finally:
+            try:
+                self._done.set()
+                self._end()
+                self.source.cleanup()
+                if self._speaking is not None:
+                    await self._speaking
+                if self._talking and not self._handoff:
+                    await self._stop_speaking()
+            finally:
+                self._finished.set()
+
+        if self._error is not None:
+            raise self._error
+
+    async def wait(self) -> None:
+        """Waits until the player finished, including the end of its transmission."""
+        await self._finished.wait()
+
+    async def _wait_ready(self) -> None:
+        """Waits until the media session of the connection is ready, or the player is stopped."""
+        ready = ensure_future(self._connection.media_ready.wait())
+        stopped = ensure_future(self._done.wait())
+        try:
+            await wait((ready, stopped), return_when=FIRST_COMPLETED)
+        finally:
+            ready.cancel()
+            stopped.cancel()
+
+    async def _stop_speaking(self) -> None:
+        """Ends the speaking of the connection, unless its websocket is gone already."""
+        connection = self._connection
+        if connection._client is None or connection._client.closed:
+            return
+        try:
+            await connection._stop_speaking()
+        except Exception as exc:
+            log.error(f"Speaking update of guild {connection.guild_id} failed: {exc!r}")
+
+    def _end(self) -> None:
+        """Stops being ticked, ending the playback."""
+        self._connection._scheduler.unregister(self)
+        self._ended.set()
+
+    def _fail(self, error: BaseException) -> None:
+        """
+        Ends the playback right away, because its frames cannot be sent anymore.
+        :param error: The error the playback failed with, raised by :meth:`play`
+        :type error: BaseException
+        """
+        if self._error is None:
+            self._error = error
+        self._done.set()
+        self._end()
+
+    def _tick(self, missed: int, lateness: float) -> None:
+        """
+        Sends the frames due at a tick of the scheduler.
+        :param missed: The amount of ticks the scheduler missed before this one
+        :type missed: int
+        :param lateness: How late this tick is, in seconds
+        :type lateness: float
+        """
+        connection = self._connection
+        source = self.source
+        stats = self.stats
+        if not connection.media_ready.is_set():
+            if self._done.is_set():
+                self._end()  # the trailing silence cannot be sent anymore
+            return  # resuming, hold the source until the session is back or gone for good
+        if self._done.is_set():
+            return self._release(lateness) if self._held else self._trail()
+
+        try:
+            if missed:
+                if self.policy is PacingPolicy.DROP:
+                    for _ in range(missed):
+                        if not source.read():
+                            return self.stop()
+                    connection._packetizer.skip(missed * SAMPLES_PER_FRAME)
+                    stats.frames_dropped += missed
+                    connection.metrics.counters[FRAMES_DROPPED] += missed
+                elif missed * FRAME_LENGTH <= self.max_lag:
+                    for behind in range(missed, 0, -1):
+                        frame = source.read()
+                        if not frame:
+                            return self.stop()
+                        self._send(frame, lateness + behind * FRAME_LENGTH)
+
+            frame = source.read()
+            if not frame:
+                return self.stop()
+            self._send(frame, lateness)
+        except Exception as exc:
+            log.error(f"Player of guild {connection.guild_id} failed: {exc!r}")
+            self._error = exc
+            self.stop()
+
+    def _trail(self) -> None:
+        """Sends the next of the silence frames ending the transmission, one per tick."""
+        if self._handoff or not self._talking or self._silent >= _TRAILING_SILENCE_FRAMES:
+            return self._end()
+        self._silent += 1
+        self._connection._send_audio_frame(OPUS_SILENCE)
+        if self._silent == _TRAILING_SILENCE_FRAMES:
+            self._end()
+
+    def _send(self, frame: bytes, lateness: float) -> None:
+        connection = self._connection
+        if self._held:
+            self._held.append(frame)
+            if not self._speaking.done() and len(self._held) * FRAME_LENGTH <= self.max_lag:
+                return
+            return self._release(lateness)
+
+        if not (self.dtx and is_silence(frame)):
+            if self._silent >= _TRAILING_SILENCE_FRAMES:
+                self._talking = True
+                self._set_speaking(connection._start_speaking())
+                self._silent = 0
+                self._held.append(frame)
+                return  # the first frame must not arrive before the update to start speaking
+            self._silent = 0
+        elif self._silent < _TRAILING_SILENCE_FRAMES:
+            self._silent += 1
+            if self._silent == _TRAILING_SILENCE_FRAMES:
+                self._talking = False
+                self._set_speaking(connection._stop_speaking())
+            frame = OPUS_SILENCE
+        else:
+            connection._packetizer.skip(SAMPLES_PER_FRAME)
+            self.stats.frames_suppressed += 1
+            return
+
+        self._transmit(frame, lateness)
+
+    def _release(self, lateness: float) -> None:
+        """Sends the frames held back while the update to start speaking was pending."""
+        held, self._held = self._held, []
+        self._transmit(held[0], lateness)
+        for frame in held[1:]:
+            self._send(frame, lateness)
+
+    def _transmit(self, frame: bytes, lateness: float) -> None:
+        connection = self._connection
+        connection._send_audio_frame(frame)
+        self.stats.record(lateness)
+        metrics = connection.metrics
+        metrics.lateness.observe(lateness)
+        if lateness > self.stats.late_threshold:
+            metrics.counters[FRAMES_LATE] += 1
+
+    def _set_speaking(self, coro: Coroutine) -> None:
+        """Sends a speaking update after the previous one, without blocking the tick."""
+        previous = self._speaking
+
+        async def send() -> None:
+            if previous is not None:
+                await previous
+            try:
+                await coro
+            except Exception as exc:
+                log.error(f"Speaking update of guild {self._connection.guild_id} failed: {exc!r}")
+
+        self._speaking = get_running_loop().create_task(send())
@@ -0,0 +1,60 @@
+from asyncio import Lock, get_running_loop, sleep
+from typing import Optional
+
+__all__ = ("TokenBucket",)
+
+
+class TokenBucket:
+    """
+    Paces sends to a rate limit, allowing short bursts.
+
+    The bucket holds up to ``capacity`` tokens and refills at ``rate`` tokens per ``per`` seconds.
+    Every send takes one token, waiting for the refill if the bucket is empty. Within any window of
+    ``per`` seconds, at most ``capacity + rate`` sends pass. Waiters are served in order.
+
+    The main gateway allows 120 sends per 60 seconds, heartbeats and presence updates included. The
+    defaults leave a margin of 10 for those.
+
+    :param capacity: The amount of sends that may happen at once
+    :type capacity: int
+    :param rate: The amount of tokens refilled every ``per`` seconds
+    :type rate: int
+    :param per: The refill period, in seconds
+    :type per: float
+    """
+
+    __slots__ = ("capacity", "rate", "per", "_tokens", "_updated", "_lock")
+
+    def __init__(self, capacity: int = 10, rate: int = 100, per: float = 60.0) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.per = per
+        self._tokens = float(capacity)
+        self._updated: Optional[float] = None
+        self._lock = Lock()
+
+    @property
+    def tokens(self) -> float:
+        """
+        The amount of tokens currently available.
+        :rtype: float
+        """
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = get_running_loop().time()
+        if self._updated is not None:
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate / self.per
+            )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Takes a token, waiting until one is available."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await sleep((1 - self._tokens) * self.per / self.rate)
+                self._refill()
+            self._tokens -= 1
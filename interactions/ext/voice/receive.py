@@ -0,0 +1,294 @@
+from asyncio import Event
+from collections import deque
+from struct import unpack_from
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from nacl._sodium import ffi, lib
+from nacl.secret import SecretBox
+
+from interactions.base import get_logger
+
+from .rtp import EncryptionMode
+
+__all__ = ("JitterBuffer", "VoiceReceiver")
+
+log = get_logger("voice")
+
+_HEADER_SIZE = 12
+_MAX_PACKET_SIZE = 4096
+_OPUS_PAYLOAD_TYPE = 0x78
+
+Frame = Tuple[Optional[int], bytes, int]  # user_id, opus frame, timestamp
+
+
+class JitterBuffer:
+    """
+    A bounded buffer that puts the packets of one SSRC back into sequence order.
+
+    Packets are stored in a fixed ring of ``size`` slots indexed by their sequence number. A packet
+    that is missing is waited for until ``depth`` later packets arrived, then counted as lost.
+
+    :ivar int received: The amount of packets put into the buffer.
+    :ivar int lost: The amount of packets that never arrived in time.
+    :ivar int late: The amount of packets that arrived after they were given up on.
+    """
+
+    __slots__ = ("_slots", "_ready", "_expected", "_count", "depth", "received", "lost", "late")
+
+    def __init__(self, size: int = 16, depth: int = 3) -> None:
+        self._slots: List[Optional[Tuple[int, int, bytes]]] = [None] * size
+        self._ready: Deque[Tuple[int, bytes]] = deque()
+        self._expected: Optional[int] = None
+        self._count: int = 0
+        self.depth = depth
+        self.received: int = 0
+        self.lost: int = 0
+        self.late: int = 0
+
+    def __len__(self) -> int:
+        return self._count + len(self._ready)
+
+    def push(self, sequence: int, timestamp: int, frame: bytes) -> None:
+        """
+        Puts a packet into the buffer.
+        :param sequence: The RTP sequence number of the packet
+        :type sequence: int
+        :param timestamp: The RTP timestamp of the packet
+        :type timestamp: int
+        :param frame: The decrypted Opus frame
+        :type frame: bytes
+        """
+        if self._expected is None:
+            self._expected = sequence
+
+        distance = (sequence - self._expected) & 0xFFFF
+        if distance >= 0x8000:
+            self.late += 1
+            return
+        if distance >= len(self._slots):  # a jump larger than the buffer, e.g. after a pause
+            self._release()
+            self._expected = sequence
+
+        slot = sequence % len(self._slots)
+        if self._slots[slot] is None:
+            self._count += 1
+            self.received += 1
+        self._slots[slot] = (sequence, timestamp, frame)
+
+    def _release(self) -> None:
+        """Moves every buffered packet in order to the ready queue, counting the gaps as lost."""
+        slots = self._slots
+        while self._count:
+            entry = slots[self._expected % len(slots)]
+            if entry is not None and entry[0] == self._expected:
+                slots[self._expected % len(slots)] = None
+                self._count -= 1
+                self._ready.append((entry[1], entry[2]))
+            else:
+                self.lost += 1
+            self._expected = (self._expected + 1) & 0xFFFF
+
+    def pop(self) -> Optional[Tuple[int, bytes]]:
+        """
+        Takes the next packet in sequence order out of the buffer.
+        :return: The timestamp and frame of the packet, or ``None`` if it did not arrive yet
+        :rtype: Optional[Tuple[int, bytes]]
+        """
+        if self._ready:
+            return self._ready.popleft()
+
+        slots = self._slots
+        while self._count:
+            slot = self._expected % len(slots)
+            entry = slots[slot]
+            if entry is not None and entry[0] == self._expected:
+                slots[slot] = None
+                self._count -= 1
+                self._expected = (self._expected + 1) & 0xFFFF
+                return entry[1], entry[2]
+            if self._count < self.depth:
+                return None
+            self.lost += 1
+            self._expected = (self._expected + 1) & 0xFFFF
+
+        return None
+
+
+class VoiceReceiver:
+    """
+    Decrypts the RTP packets received by a voice connection and yields them per speaker.
+
+    Iterating the receiver asynchronously yields ``(user_id, opus_frame, timestamp)`` tuples in
+    sequence order per speaker. The SSRC of a speaker is mapped to their user id through the
+    ``SPEAKING`` events of the voice gateway; frames of SSRCs not mapped yet have ``None`` as
+    user id. Frames that are not consumed in time are dropped, oldest first, once ``backlog``
+    frames are queued.
+
+    :ivar int dropped: The amount of frames dropped because the consumer fell behind.
+    :ivar int invalid: The amount of packets that could not be decrypted.
+    """
+
+    __slots__ = (
+        "_key",
+        "_mode",
+        "_users",
+        "_buffers",
+        "_frames",
+        "_event",
+        "_closed",
+        "_nonce",
+        "_nonce_ptr",
+        "_plain",
+        "_plain_ptr",
+        "_plain_view",
+        "buffer_size",
+        "buffer_depth",
+        "dropped",
+        "invalid",
+    )
+
+    def __init__(
+        self,
+        backlog: int = 500,
+        buffer_size: int = 16,
+        buffer_depth: int = 3,
+        mode: EncryptionMode = EncryptionMode.NORMAL,
+    ) -> None:
+        self._key: Optional[bytes] = None
+        self._users: Dict[int, int] = {}
+        self._buffers: Dict[int, JitterBuffer] = {}
+        self._frames: Deque[Frame] = deque(maxlen=backlog)
+        self._event = Event()
+        self._closed: bool = False
+
+        self._nonce = bytearray(SecretBox.NONCE_SIZE)
+        self._nonce_ptr = ffi.from_buffer("unsigned char[]", self._nonce)
+        self._plain = bytearray(_MAX_PACKET_SIZE)
+        self._plain_ptr = ffi.from_buffer("unsigned char[]", self._plain)
+        self._plain_view = memoryview(self._plain)
+
+        self.buffer_size = buffer_size
+        self.buffer_depth = buffer_depth
+        self.dropped: int = 0
+        self.invalid: int = 0
+        self.mode = mode
+
+    @property
+    def mode(self) -> EncryptionMode:
+        """
+        The encryption mode of the received packets.
+        :rtype: EncryptionMode
+        """
+        return self._mode
+
+    @mode.setter
+    def mode(self, mode: EncryptionMode) -> None:
+        self._mode = EncryptionMode(mode)
+        self._nonce[:] = bytes(len(self._nonce))
+
+    def set_secret_key(self, secret_key: Union[bytes, list]) -> None:
+        """
+        Sets the secret key received in ``SESSION_DESCRIPTION``.
+        :param secret_key: The secret key to decrypt with
+        :type secret_key: Union[bytes, list]
+        """
+        self._key = bytes(SecretBox(bytes(secret_key)))
+
+    def map(self, ssrc: int, user_id: int) -> None:
+        """
+        Maps an SSRC to the user sending it, as announced by a ``SPEAKING`` event.
+        :param ssrc: The SSRC of the user
+        :type ssrc: int
+        :param user_id: The id of the user
+        :type user_id: int
+        """
+        self._users[ssrc] = user_id
+
+    def remove(self, user_id: int) -> None:
+        """
+        Forgets a user that left the channel, together with their buffered packets.
+        :param user_id: The id of the user
+        :type user_id: int
+        """
+        for ssrc in [ssrc for ssrc, _user_id in self._users.items() if _user_id == user_id]:
+            del self._users[ssrc]
+            self._buffers.pop(ssrc, None)
+
+    def buffer(self, user_id: int) -> Optional[JitterBuffer]:
+        """
+        Gets the jitter buffer of a user, holding their loss statistics.
+        :param user_id: The id of the user
+        :type user_id: int
+        :rtype: Optional[JitterBuffer]
+        """
+        for ssrc, _user_id in self._users.items():
+            if _user_id == user_id:
+                return self._buffers.get(ssrc)
+
+    def feed(self, data: bytes) -> None:
+        """
+        Handles a datagram received from the voice server.
+        :param data: The datagram
+        :type data: bytes
+        """
+        if (
+            self._key is None
+            or len(data) < _HEADER_SIZE
+            or data[0] >> 6 != 2
+            or data[1] & 0x7F != _OPUS_PAYLOAD_TYPE
+        ):
+            return  # not an opus RTP packet, e.g. RTCP
+
+        sequence, timestamp, ssrc = unpack_from(">HII", data, 2)
+        header_size = _HEADER_SIZE + 4 * (data[0] & 0x0F)
+        end = len(data) - self._mode.nonce_size
+        size = end - header_size - SecretBox.MACBYTES
+        if size <= 0 or size > _MAX_PACKET_SIZE:
+            return
+
+        if self._mode is EncryptionMode.NORMAL:
+            self._nonce[:_HEADER_SIZE] = data[:_HEADER_SIZE]
+        else:
+            self._nonce[: len(data) - end] = data[end:]
+        ciphertext = ffi.from_buffer("unsigned char[]", data) + header_size
+        if lib.crypto_secretbox_open_easy(
+            self._plain_ptr, ciphertext, size + SecretBox.MACBYTES, self._nonce_ptr, self._key
+        ):
+            self.invalid += 1
+            return
+
+        plain = self._plain
+        offset = 0
+        if data[0] & 0x10 and size > 4 and plain[0] == 0xBE and plain[1] == 0xDE:
+            offset = 4 + 4 * ((plain[2] << 8) | plain[3])  # skip the header extension
+
+        buffer = self._buffers.get(ssrc)
+        if buffer is None:
+            buffer = self._buffers[ssrc] = JitterBuffer(self.buffer_size, self.buffer_depth)
+        buffer.push(sequence, timestamp, bytes(self._plain_view[offset:size]))
+
+        user_id = self._users.get(ssrc)
+        frames = self._frames
+        packet = buffer.pop()
+        while packet is not None:
+            if len(frames) == frames.maxlen:
+                self.dropped += 1
+            frames.append((user_id, packet[1], packet[0]))
+            packet = buffer.pop()
+        self._event.set()
+
+    def close(self) -> None:
+        """Ends the iteration once the queued frames are consumed."""
+        self._closed = True
+        self._event.set()
+
+    def __aiter__(self) -> "VoiceReceiver":
+        return self
+
+    async def __anext__(self) -> Frame:
+        while not self._frames:
+            if self._closed:
+                raise StopAsyncIteration
+            self._event.clear()
+            await self._event.wait()
+        return self._frames.popleft()
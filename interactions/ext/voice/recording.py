@@ -0,0 +1,295 @@
+from asyncio import CancelledError, Future, Task, get_running_loop, shield, sleep
+from collections import deque
+from os import PathLike
+from pathlib import Path
+from shutil import copyfileobj
+from struct import Struct, pack
+from tempfile import TemporaryFile
+from typing import BinaryIO, Deque, Dict, List, Optional, Union
+from zlib import crc32
+
+from interactions.base import get_logger
+
+from .receive import Frame, VoiceReceiver
+from .rtp import CHANNELS, SAMPLES_PER_FRAME, SAMPLING_RATE
+
+__all__ = ("OggOpusWriter", "RecordingSink")
+
+log = get_logger("voice")
+
+_PAGE_HEADER = Struct("<4sBBqIIIB")
+_BOS = 0x02
+_EOS = 0x04
+_MAX_SEGMENTS = 255
+_REVERSED = bytes(int(f"{byte:08b}"[::-1], 2) for byte in range(256))  # bit-reversed bytes
+
+
+def _crc(data: bytearray) -> int:
+    """
+    The CRC-32 of an Ogg page, which unlike ``zlib.crc32`` is not bit-reflected.
+
+    Reflecting the input bytes and the result turns one into the other, so the page is checked by
+    ``zlib`` in one pass instead of byte by byte in Python.
+    """
+    crc = crc32(data.translate(_REVERSED), 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return int(f"{crc:032b}"[::-1], 2)
+
+
+class _LogicalStream:
+    __slots__ = ("serial", "sequence", "granule", "first_timestamp", "packets", "segments")
+
+    def __init__(self, serial: int) -> None:
+        self.serial = serial
+        self.sequence: int = 0
+        self.granule: int = 0
+        self.first_timestamp: Optional[int] = None
+        self.packets: List[bytes] = []
+        self.segments: int = 0
+
+
+class OggOpusWriter:
+    """
+    Muxes Opus frames into an Ogg file, one logical stream per speaker.
+
+    Frames are collected per stream and written as pages. Granule positions are derived from the
+    RTP timestamps, so silent stretches keep their length.
+
+    Ogg requires the first pages of all streams in front of any other page, while speakers only
+    become known once they talk. To write more than one stream, a ``spool`` is thus needed: the
+    header pages are kept in memory and the other pages are written to the spool, until
+    :meth:`close` writes the header pages followed by the spool to the file.
+
+    :param file: The file to write to, opened in binary mode
+    :type file: BinaryIO
+    :param spool: A temporary file, opened in binary mode, holding the pages until the file is closed
+    :type spool: Optional[BinaryIO]
+    """
+
+    __slots__ = ("_file", "_spool", "_streams", "_buffer", "_heads", "_tags")
+
+    def __init__(self, file: BinaryIO, spool: Optional[BinaryIO] = None) -> None:
+        self._file = file
+        self._spool = spool
+        self._streams: Dict[Optional[int], _LogicalStream] = {}
+        self._buffer = bytearray()
+        self._heads = bytearray()
+        self._tags = bytearray()
+
+    def _page(self, stream: _LogicalStream, packets: List[bytes], flags: int = 0) -> bytearray:
+        lacing = bytearray()
+        for packet in packets:
+            lacing += b"\xff" * (len(packet) // 255)
+            lacing.append(len(packet) % 255)
+
+        page = bytearray(
+            _PAGE_HEADER.pack(
+                b"OggS", 0, flags, stream.granule, stream.serial, stream.sequence, 0, len(lacing)
+            )
+        )
+        page += lacing
+        for packet in packets:
+            page += packet
+        page[22:26] = pack("<I", _crc(page))
+
+        stream.sequence += 1
+        return page
+
+    def _stream(self, key: Optional[int]) -> _LogicalStream:
+        stream = self._streams.get(key)
+        if stream is None:
+            if self._spool is None and self._streams:
+                raise ValueError("Writing more than one stream needs a spool.")
+
+            stream = self._streams[key] = _LogicalStream(len(self._streams) + 1)
+            head = b"OpusHead" + pack("<BBHIhB", 1, CHANNELS, 0, SAMPLING_RATE, 0, 0)
+            vendor = b"interactions-voice"
+            tags = b"OpusTags" + pack("<I", len(vendor)) + vendor + pack("<I", 0)
+            if self._spool is None:
+                self._buffer += self._page(stream, [head], _BOS)
+                self._buffer += self._page(stream, [tags])
+            else:
+                self._heads += self._page(stream, [head], _BOS)
+                self._tags += self._page(stream, [tags])
+        return stream
+
+    def _flush_stream(self, stream: _LogicalStream, flags: int = 0) -> None:
+        if stream.packets or flags:
+            self._buffer += self._page(stream, stream.packets, flags)
+            stream.packets = []
+            stream.segments = 0
+
+    def write(self, key: Optional[int], frame: bytes, timestamp: int) -> None:
+        """
+        Adds a frame to the stream of a speaker.
+        :param key: The key of the logical stream, e.g. the user id of the speaker
+        :type key: Optional[int]
+        :param frame: The Opus frame
+        :type frame: bytes
+        :param timestamp: The RTP timestamp of the frame
+        :type timestamp: int
+        """
+        stream = self._stream(key)
+        if stream.first_timestamp is None:
+            stream.first_timestamp = timestamp
+
+        segments = len(frame) // 255 + 1
+        if stream.segments + segments > _MAX_SEGMENTS:
+            self._flush_stream(stream)
+
+        stream.packets.append(frame)
+        stream.segments += segments
+        stream.granule = ((timestamp - stream.first_timestamp) & 0xFFFFFFFF) + SAMPLES_PER_FRAME
+
+    def flush(self) -> None:
+        """Writes the collected frames of every stream to the file, or the spool, as complete pages."""
+        for stream in self._streams.values():
+            self._flush_stream(stream)
+        if self._buffer:
+            (self._file if self._spool is None else self._spool).write(self._buffer)
+            self._buffer.clear()
+
+    def close(self) -> None:
+        """Ends every stream and closes the file."""
+        for stream in self._streams.values():
+            self._flush_stream(stream, _EOS)
+        self.flush()
+        if self._spool is not None:
+            self._file.write(self._heads)
+            self._file.write(self._tags)
+            self._spool.seek(0)
+            copyfileobj(self._spool, self._file)
+            self._spool.close()
+        self._file.close()
+
+
+class RecordingSink:
+    """
+    Records the frames of a :class:`VoiceReceiver` into Ogg Opus files.
+
+    Each speaker is written to its own ``<user_id>.ogg`` file in ``path``, or, with ``multiplex``,
+    as its own logical stream of the single file ``path``. Frames are collected in a ring buffer
+    on the event loop and written in large batches by a background writer running in the default
+    executor, so disk I/O never blocks the loop. If the disk falls behind by more than ``backlog``
+    frames, the oldest frames are dropped.
+
+    A multiplexed recording is collected in a temporary file next to ``path`` and only written to
+    ``path`` once the sink is stopped, see :class:`OggOpusWriter`.
+
+    :ivar int dropped: The amount of frames dropped because the disk fell behind.
+    :ivar int written: The amount of frames written.
+    """
+
+    __slots__ = (
+        "receiver",
+        "path",
+        "multiplex",
+        "interval",
+        "dropped",
+        "written",
+        "_frames",
+        "_writers",
+        "_reader",
+        "_writer",
+        "_pending",
+    )
+
+    def __init__(
+        self,
+        receiver: VoiceReceiver,
+        path: Union[str, PathLike],
+        multiplex: bool = False,
+        backlog: int = 50 * 60,
+        interval: float = 1.0,
+    ) -> None:
+        """
+        :param receiver: The receiver to record. The sink consumes its frames.
+        :type receiver: VoiceReceiver
+        :param path: The directory to write the files to, or the file to write with ``multiplex``
+        :type path: Union[str, PathLike]
+        :param multiplex: Whether all speakers are written into a single file
+        :type multiplex: bool
+        :param backlog: The maximum amount of frames held while the disk falls behind
+        :type backlog: int
+        :param interval: The time between two batches written to the disk, in seconds
+        :type interval: float
+        """
+        self.receiver = receiver
+        self.path = Path(path)
+        self.multiplex = multiplex
+        self.interval = interval
+        self.dropped: int = 0
+        self.written: int = 0
+        self._frames: Deque[Frame] = deque(maxlen=backlog)
+        self._writers: Dict[Optional[int], OggOpusWriter] = {}
+        self._reader: Optional[Task] = None
+        self._writer: Optional[Task] = None
+        self._pending: Optional[Future] = None
+
+    def start(self) -> None:
+        """Starts recording."""
+        if not self.multiplex:
+            self.path.mkdir(parents=True, exist_ok=True)
+        loop = get_running_loop()
+        self._reader = loop.create_task(self._read())
+        self._writer = loop.create_task(self._write())
+
+    async def stop(self) -> None:
+        """Stops recording, writes the remaining frames and closes the files."""
+        for task in (self._reader, self._writer):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except CancelledError:
+                    pass
+        if self._pending is not None:
+            await self._pending  # the batch being written when the writer was cancelled
+
+        batch = list(self._frames)
+        self._frames.clear()
+        await get_running_loop().run_in_executor(None, self._write_batch, batch, True)
+
+    async def _read(self) -> None:
+        frames = self._frames
+        async for frame in self.receiver:
+            if len(frames) == frames.maxlen:
+                self.dropped += 1
+            frames.append(frame)
+
+    async def _write(self) -> None:
+        loop = get_running_loop()
+        while True:
+            await sleep(self.interval)
+            if not self._frames:
+                continue
+
+            batch = list(self._frames)
+            self._frames.clear()
+            self._pending = loop.run_in_executor(None, self._write_batch, batch)
+            await shield(self._pending)
+            self._pending = None
+
+    def _open(self, user_id: Optional[int]) -> OggOpusWriter:
+        key = None if self.multiplex else user_id
+        writer = self._writers.get(key)
+        if writer is None:
+            if self.multiplex:
+                writer = OggOpusWriter(open(self.path, "wb"), TemporaryFile(dir=self.path.parent))
+            else:
+                writer = OggOpusWriter(open(self.path / f"{user_id or 'unknown'}.ogg", "wb"))
+            self._writers[key] = writer
+        return writer
+
+    def _write_batch(self, batch: List[Frame], close: bool = False) -> None:
+        for user_id, frame, timestamp in batch:
+            self._open(user_id).write(user_id, frame, timestamp)
+
+        for writer in self._writers.values():
+            if close:
+                writer.close()
+            else:
+                writer.flush()
+        if close:
+            self._writers.clear()
+
+        self.written += len(batch)
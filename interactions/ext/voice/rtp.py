@@ -0,0 +1,263 @@
+from enum import Enum
+from struct import pack_into
+from typing import Iterable, List, Optional, Tuple, Union
+
+from nacl._sodium import ffi, lib
+from nacl.bindings import crypto_secretbox
+from nacl.exceptions import CryptoError
+from nacl.secret import SecretBox
+
+__all__ = (
+    "SAMPLING_RATE",
+    "CHANNELS",
+    "FRAME_LENGTH",
+    "SAMPLES_PER_FRAME",
+    "PCM_FRAME_SIZE",
+    "EncryptionMode",
+    "EncryptionJob",
+    "RTPPacketizer",
+    "encrypt_batch",
+)
+
+SAMPLING_RATE = 48000
+CHANNELS = 2
+FRAME_LENGTH = 0.02  # seconds
+SAMPLES_PER_FRAME = int(SAMPLING_RATE * FRAME_LENGTH)
+PCM_FRAME_SIZE = SAMPLES_PER_FRAME * CHANNELS * 2  # bytes of 16-bit PCM
+
+_HEADER_SIZE = 12
+_MAC_SIZE = SecretBox.MACBYTES
+_MAX_PACKET_SIZE = 4096
+_NONCE_SIZE = SecretBox.NONCE_SIZE
+_LITE_NONCE_SIZE = 4
+
+
+class EncryptionMode(str, Enum):
+    """
+    The encryption modes of the voice server, in the order they are preferred in.
+
+    They only differ in the nonce: ``LITE`` appends a 4-byte counter and ``SUFFIX`` 24 random
+    bytes to the packet, while ``NORMAL`` derives it from the RTP header.
+    """
+
+    LITE = "xsalsa20_poly1305_lite"
+    SUFFIX = "xsalsa20_poly1305_suffix"
+    NORMAL = "xsalsa20_poly1305"
+
+    @classmethod
+    def select(cls, modes: Iterable[str]) -> "EncryptionMode":
+        """
+        Picks the preferred mode out of the modes offered by a voice server.
+        :param modes: The modes listed in ``READY``
+        :type modes: Iterable[str]
+        :return: The best supported mode
+        :rtype: EncryptionMode
+        """
+        modes = set(modes)
+        for mode in cls:
+            if mode.value in modes:
+                return mode
+        raise ValueError(f"None of the encryption modes {sorted(modes)} is supported.")
+
+    @property
+    def nonce_size(self) -> int:
+        """
+        The amount of nonce bytes appended to every packet.
+        :rtype: int
+        """
+        if self is EncryptionMode.LITE:
+            return _LITE_NONCE_SIZE
+        return _NONCE_SIZE if self is EncryptionMode.SUFFIX else 0
+
+
+EncryptionJob = Tuple[bytes, bytes, bytes, bytes, bytes]  # key, nonce, header, payload, trailer
+
+
+def encrypt_batch(jobs: List[EncryptionJob]) -> List[bytes]:
+    """
+    Encrypts a batch of packets prepared by :meth:`RTPPacketizer.prepare`.
+
+    This is a module level function, so that it can be sent to thread and process pools.
+    :param jobs: The prepared packets
+    :type jobs: List[EncryptionJob]
+    :return: The finished packets, in the order of ``jobs``
+    :rtype: List[bytes]
+    """
+    return [
+        b"".join((header, crypto_secretbox(payload, nonce, key), trailer))
+        for key, nonce, header, payload, trailer in jobs
+    ]
+
+
+class RTPPacketizer:
+    """
+    Builds encrypted RTP packets for a single voice connection.
+
+    The packet is assembled in one preallocated buffer: the header fields are updated in place and
+    the payload is encrypted by libsodium directly behind the header, so a frame costs a single
+    encrypt call and does not create any intermediate ``bytes`` objects.
+
+    :ivar int sequence: The sequence number of the next packet.
+    :ivar int timestamp: The RTP timestamp of the next packet.
+    :ivar int counter: The nonce of the next packet in :attr:`EncryptionMode.LITE`.
+    """
+
+    __slots__ = (
+        "sequence",
+        "timestamp",
+        "counter",
+        "_mode",
+        "_ssrc",
+        "_buffer",
+        "_view",
+        "_payload",
+        "_nonce",
+        "_nonce_ptr",
+        "_box",
+        "_key",
+    )
+
+    def __init__(self, ssrc: int, mode: EncryptionMode = EncryptionMode.NORMAL) -> None:
+        self.sequence: int = 0
+        self.timestamp: int = 0
+        self.counter: int = 0
+        self._buffer = bytearray(_MAX_PACKET_SIZE)
+        self._buffer[0] = 0x80  # version 2, no padding, extension or CSRCs
+        self._buffer[1] = 0x78  # payload type 120 (opus)
+        self._view = memoryview(self._buffer)
+        self._payload = ffi.from_buffer("unsigned char[]", self._buffer) + _HEADER_SIZE
+
+        self._nonce = bytearray(_NONCE_SIZE)
+        self._nonce_ptr = ffi.from_buffer("unsigned char[]", self._nonce)
+
+        self._box: Optional[SecretBox] = None
+        self._key: Optional[bytes] = None
+        self.mode = mode
+        self.ssrc = ssrc
+
+    @property
+    def mode(self) -> EncryptionMode:
+        """
+        The encryption mode of the packets.
+        :rtype: EncryptionMode
+        """
+        return self._mode
+
+    @mode.setter
+    def mode(self, mode: EncryptionMode) -> None:
+        self._mode = EncryptionMode(mode)
+        self._nonce[:] = bytes(_NONCE_SIZE)
+        if self._mode is EncryptionMode.NORMAL:  # the RTP header padded with zeroes
+            self._nonce[:_HEADER_SIZE] = self._buffer[:_HEADER_SIZE]
+
+    @property
+    def ssrc(self) -> int:
+        """
+        The SSRC written into every packet.
+        :rtype: int
+        """
+        return self._ssrc
+
+    @ssrc.setter
+    def ssrc(self, ssrc: int) -> None:
+        self._ssrc = ssrc
+        pack_into(">I", self._buffer, 8, ssrc)
+        if self._mode is EncryptionMode.NORMAL:
+            self._nonce[8:_HEADER_SIZE] = self._buffer[8:_HEADER_SIZE]
+
+    @property
+    def overhead(self) -> int:
+        """
+        The bytes a packet holds besides its Opus frame: the header, the MAC and the nonce.
+        :rtype: int
+        """
+        return _HEADER_SIZE + _MAC_SIZE + self._mode.nonce_size
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether a secret key is present and packets can be built.
+        :rtype: bool
+        """
+        return self._key is not None
+
+    def set_secret_key(self, secret_key: Union[bytes, list]) -> None:
+        """
+        Sets the secret key received in ``SESSION_DESCRIPTION``.
+        :param secret_key: The secret key to encrypt with
+        :type secret_key: Union[bytes, list]
+        """
+        self._box = SecretBox(bytes(secret_key))
+        self._key = bytes(self._box)
+
+    def skip(self, samples: int = SAMPLES_PER_FRAME) -> None:
+        """
+        Advances the timestamp without sending a packet, e.g. for dropped frames.
+        :param samples: The amount of samples per channel to skip
+        :type samples: int
+        """
+        self.timestamp = (self.timestamp + samples) & 0xFFFFFFFF
+
+    def packetize(self, frame: bytes, samples: int = SAMPLES_PER_FRAME) -> memoryview:
+        """
+        Builds the encrypted RTP packet of an Opus frame.
+
+        The returned view points into the internal buffer and is only valid until the next call.
+        :param frame: The Opus frame to send
+        :type frame: bytes
+        :param samples: The amount of samples per channel the frame holds
+        :type samples: int
+        :return: The packet, ready to be sent
+        :rtype: memoryview
+        """
+        size = len(frame)
+        nonce_size = self._mode.nonce_size
+        end = _HEADER_SIZE + _MAC_SIZE + size
+        if end + nonce_size > _MAX_PACKET_SIZE:
+            raise ValueError(f"Opus frame of {size} bytes is too large.")
+
+        self._write_header()
+        if type(frame) is not bytes:
+            frame = ffi.from_buffer("unsigned char[]", frame)
+        if lib.crypto_secretbox_easy(self._payload, frame, size, self._nonce_ptr, self._key):
+            raise CryptoError("Encryption failed")
+        if nonce_size:
+            self._buffer[end : end + nonce_size] = self._nonce[:nonce_size]
+
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.timestamp = (self.timestamp + samples) & 0xFFFFFFFF
+        return self._view[: end + nonce_size]
+
+    def prepare(self, frame: bytes, samples: int = SAMPLES_PER_FRAME) -> EncryptionJob:
+        """
+        Builds the header of an Opus frame's packet, leaving the encryption to :func:`encrypt_batch`.
+        :param frame: The Opus frame to send
+        :type frame: bytes
+        :param samples: The amount of samples per channel the frame holds
+        :type samples: int
+        :return: Everything needed to encrypt and assemble the packet elsewhere
+        :rtype: EncryptionJob
+        """
+        self._write_header()
+        nonce = bytes(self._nonce)
+        job = (
+            self._key,
+            nonce,
+            bytes(self._view[:_HEADER_SIZE]),
+            bytes(frame),
+            nonce[: self._mode.nonce_size],
+        )
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.timestamp = (self.timestamp + samples) & 0xFFFFFFFF
+        return job
+
+    def _write_header(self) -> None:
+        pack_into(">HI", self._buffer, 2, self.sequence, self.timestamp)
+        mode = self._mode
+        if mode is EncryptionMode.NORMAL:
+            pack_into(">HI", self._nonce, 2, self.sequence, self.timestamp)
+        elif mode is EncryptionMode.LITE:
+            pack_into(">I", self._nonce, 0, self.counter)
+            self.counter = (self.counter + 1) & 0xFFFFFFFF
+        else:
+            lib.randombytes(self._nonce_ptr, _NONCE_SIZE)
@@ -0,0 +1,181 @@
+from asyncio import Task, gather, get_running_loop, sleep
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from interactions.base import get_logger
+
+from .rtp import FRAME_LENGTH, EncryptionJob, encrypt_batch
+from .udp import UDPEgress, VoiceUDPProtocol
+
+if TYPE_CHECKING:
+    from .player import AudioPlayer
+
+__all__ = ("MediaScheduler",)
+
+log = get_logger("voice")
+
+
+class MediaScheduler:
+    """
+    Drives every active player of the process from a single task.
+
+    Instead of each player sleeping on its own, the scheduler wakes once per 20 ms frame boundary
+    and sends the next frame of every registered player in one pass. The boundaries are absolute
+    ``loop.time()`` deadlines, so the schedule does not drift, and ticks the loop could not serve
+    in time are handed to the players as ``missed`` to be handled by their pacing policy.
+
+    By default, packets are encrypted inline on the event loop. With an ``executor``, the packets
+    of a whole tick are collected instead and encrypted in the executor in one round-trip per
+    tick, split into ``parallelism`` chunks that are encrypted concurrently. Should the executor
+    fail, such as a broken process pool, the scheduler falls back to encrypting inline.
+
+    With an ``egress``, the UDP sockets of the connections are shared and the packets of a tick are
+    sent in batches instead of one system call per packet.
+
+    :ivar int ticks: The amount of ticks run so far.
+    :ivar int missed_ticks: The amount of frame boundaries that passed without a tick.
+    :ivar Optional[Executor] executor: The thread or process pool encrypting the packets.
+    :ivar int parallelism: The amount of chunks the packets of a tick are split into.
+    :ivar Optional[UDPEgress] egress: The batched egress the connections send through.
+    """
+
+    __slots__ = (
+        "_players",
+        "_task",
+        "_jobs",
+        "_targets",
+        "_flushing",
+        "ticks",
+        "missed_ticks",
+        "executor",
+        "parallelism",
+        "egress",
+    )
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        parallelism: int = 1,
+        egress: Optional[UDPEgress] = None,
+    ) -> None:
+        self._players: Dict["AudioPlayer", None] = {}
+        self._task: Optional[Task] = None
+        self._jobs: List[EncryptionJob] = []
+        self._targets: List[VoiceUDPProtocol] = []
+        self._flushing: Optional[Task] = None
+        self.ticks: int = 0
+        self.missed_ticks: int = 0
+        self.executor = executor
+        self.parallelism = parallelism
+        self.egress = egress
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def register(self, player: "AudioPlayer") -> None:
+        """
+        Starts ticking a player, beginning with the next frame boundary.
+        :param player: The player to tick
+        :type player: AudioPlayer
+        """
+        self._players[player] = None
+        if self._task is None or self._task.done():
+            self._task = get_running_loop().create_task(self._run())
+
+    def unregister(self, player: "AudioPlayer") -> None:
+        """
+        Stops ticking a player. The scheduler stops itself once no player is left.
+        :param player: The player to stop ticking
+        :type player: AudioPlayer
+        """
+        self._players.pop(player, None)
+
+    def submit(self, target: VoiceUDPProtocol, job: EncryptionJob) -> None:
+        """
+        Queues a packet to be encrypted in the executor and sent at the end of the current tick.
+        :param target: The socket to send the packet through
+        :type target: VoiceUDPProtocol
+        :param job: The prepared packet
+        :type job: EncryptionJob
+        """
+        self._jobs.append(job)
+        self._targets.append(target)
+
+        if (self._task is None or self._task.done()) and (
+            self._flushing is None or self._flushing.done()
+        ):  # outside of a tick
+            self._flushing = get_running_loop().create_task(self._flush())
+
+    async def _flush(self) -> None:
+        jobs, targets = self._jobs, self._targets
+        if not jobs:
+            return
+        self._jobs, self._targets = [], []
+
+        loop = get_running_loop()
+        size = -(-len(jobs) // self.parallelism)
+        chunks = await gather(
+            *(
+                loop.run_in_executor(self.executor, encrypt_batch, jobs[start : start + size])
+                for start in range(0, len(jobs), size)
+            ),
+            return_exceptions=True,
+        )
+
+        for start, packets in zip(range(0, len(jobs), size), chunks):
+            if isinstance(packets, BaseException):
+                if self.executor is not None:
+                    log.error(
+                        f"Encrypting in the media executor failed, encrypting on the event loop from now on: {packets!r}"
+                    )
+                    self.executor = None
+                packets = _encrypt_each(jobs[start : start + size])
+            for index, packet in enumerate(packets, start):
+                if packet is not None:
+                    targets[index].sendto(packet)
+
+    async def _run(self) -> None:
+        loop = get_running_loop()
+        start = loop.time()
+        tick = 0
+
+        while self._players:
+            tick += 1
+            deadline = start + tick * FRAME_LENGTH
+            delay = deadline - loop.time()
+            if delay > 0:
+                await sleep(delay)
+
+            lateness = loop.time() - deadline
+            missed = 0
+            if lateness >= FRAME_LENGTH:
+                missed = int(lateness / FRAME_LENGTH)
+                lateness -= missed * FRAME_LENGTH
+                tick += missed
+                self.missed_ticks += missed
+
+            self.ticks += 1
+            for player in tuple(self._players):
+                player._tick(missed, lateness)
+
+            try:
+                if self._jobs:
+                    await self._flush()
+                if self.egress is not None:
+                    self.egress.flush()
+            except Exception as exc:
+                log.error(f"Media scheduler failed, stopping {len(self._players)} players: {exc!r}")
+                for player in tuple(self._players):
+                    player._fail(exc)
+
+
+def _encrypt_each(jobs: List[EncryptionJob]) -> List[Optional[bytes]]:
+    """Encrypts packets one by one, leaving out the ones that cannot be encrypted."""
+    packets: List[Optional[bytes]] = []
+    for job in jobs:
+        try:
+            packets.extend(encrypt_batch([job]))
+        except Exception as exc:
+            log.error(f"Encrypting a packet failed, dropping it: {exc!r}")
+            packets.append(None)
+    return packets
@@ -1,19 +1,42 @@
+from concurrent.futures import Executor
 from inspect import iscoroutinefunction
-from typing import TypeVar, Union
+from typing import Optional, TypeVar, Union
 
 from interactions.client.bot import Client as _Client
 
 from ._dummy import _VoiceClient
+from .manager import VoiceManager
+from .scheduler import MediaScheduler
+from .udp import UDPEgress
 from .websocket import VoiceWebSocketClient
+from .worker import VoiceWorkerPool
 
 __all__ = "setup"
 
 Client = TypeVar("Client", bound=_Client)
 
 
-def setup(_client: Client) -> Union[Client, _VoiceClient]:
-    _websocket = VoiceWebSocketClient(token=_client._token, intents=_client._intents, me=_client.me)
+def setup(
+    _client: Client,
+    *,
+    media_executor: Optional[Executor] = None,
+    media_parallelism: int = 1,
+    media_batching: bool = False,
+    voice_workers: int = 0,
+) -> Union[Client, _VoiceClient]:
+    _websocket = VoiceWebSocketClient(
+        token=_client._token,
+        intents=_client._intents,
+        me=_client.me,
+        manager=VoiceManager(
+            MediaScheduler(
+                media_executor, media_parallelism, UDPEgress() if media_batching else None
+            ),
+            VoiceWorkerPool(voice_workers, media_batching) if voice_workers else None,
+        ),
+    )
     _voice_client = _VoiceClient()
+    _voice_client._voice = _websocket._voice
 
     for attrib in _client._websocket.__slots__:
         if attrib != "_http":
@@ -40,5 +63,6 @@ def setup(_client: Client) -> Union[Client, _VoiceClient]:
             setattr(_client, attrib, getattr(_voice_client, attrib))
 
     setattr(_client, "_websocket", _websocket)
+    setattr(_client, "_voice", _websocket._voice)
 
     return _client
@@ -0,0 +1,312 @@
+from io import UnsupportedOperation
+from mmap import ACCESS_READ, mmap
+from os import PathLike
+from struct import unpack_from
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from .opus import Encoder
+from .rtp import FRAME_LENGTH, PCM_FRAME_SIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = (
+    "OPUS_SILENCE",
+    "is_silence",
+    "AudioSource",
+    "PCMSource",
+    "OggOpusSource",
+    "BroadcastSource",
+    "BroadcastSubscriber",
+)
+
+OPUS_SILENCE = b"\xf8\xff\xfe"
+
+_OGG_HEADER_SIZE = 27
+
+
+def is_silence(frame: bytes) -> bool:
+    """
+    Whether an Opus frame is silent, i.e. :data:`OPUS_SILENCE` or a frame without audio data as
+    produced by an encoder with DTX.
+    :param frame: The Opus frame
+    :type frame: bytes
+    :rtype: bool
+    """
+    return len(frame) <= 2 or frame == OPUS_SILENCE
+
+
+class AudioSource:
+    """
+    The base class of every audio source that can be played.
+
+    A source yields one 20 ms Opus frame per call of :meth:`read` and an empty ``bytes`` object
+    once it is exhausted.
+    """
+
+    __slots__ = ()
+
+    def read(self) -> bytes:
+        """
+        Reads the next 20 ms Opus frame.
+        :return: The next frame, or ``b""`` when the source is exhausted
+        :rtype: bytes
+        """
+        raise NotImplementedError
+
+    def cleanup(self) -> None:
+        """Releases the resources of the source once playback ended."""
+
+
+class PCMSource(AudioSource):
+    """
+    The base class of sources producing raw PCM, which is encoded to Opus while playing.
+
+    Subclasses implement :meth:`read_pcm`, returning 20 ms of 48 kHz 16-bit stereo PCM per call.
+    The encoder is created on the first read, so encoding requires libopus.
+
+    Frames whose RMS level is below ``silence_threshold`` are not encoded but read as
+    :data:`OPUS_SILENCE`, so that players can suppress them. Computing the level requires
+    ``numpy``.
+
+    :ivar Optional[float] silence_threshold: The RMS level in 16-bit sample units below which a
+        frame counts as silent, or ``None`` to encode every frame.
+    """
+
+    __slots__ = ("_encoder", "silence_threshold")
+
+    def __init__(self, silence_threshold: Optional[float] = None) -> None:
+        if silence_threshold is not None and np is None:
+            raise ImportError(
+                "Silence detection requires numpy. Install it with `pip install interactions-voice[numpy]`."
+            )
+        self._encoder: Optional[Encoder] = None
+        self.silence_threshold = silence_threshold
+
+    def read_pcm(self) -> bytes:
+        """
+        Reads the next 20 ms of 48 kHz 16-bit stereo PCM.
+        :return: The next frame, or ``b""`` when the source is exhausted
+        :rtype: bytes
+        """
+        raise NotImplementedError
+
+    def read(self) -> bytes:
+        pcm = self.read_pcm()
+        if not pcm:
+            return b""
+        if len(pcm) < PCM_FRAME_SIZE:
+            pcm = bytes(pcm) + bytes(PCM_FRAME_SIZE - len(pcm))
+        if self.silence_threshold is not None:
+            samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+            if np.dot(samples, samples) < self.silence_threshold**2 * len(samples):
+                return OPUS_SILENCE
+        if self._encoder is None:
+            self._encoder = Encoder()
+        return self._encoder.encode(pcm)
+
+
+class OggOpusSource(AudioSource):
+    """
+    Plays the Opus packets of an Ogg Opus (``.opus``/``.ogg``) file without transcoding them.
+
+    The file is demuxed page by page straight from an ``mmap`` of it, or, for files that cannot be
+    mapped (e.g. pipes), from large buffered reads. Only the current page is held in memory, no
+    matter how long the file is. The file has to be encoded with 20 ms frames.
+
+    :param file: The path to the file, or an opened binary file object
+    :type file: Union[str, PathLike, BinaryIO]
+    :param buffer_size: The size of the read buffer if the file cannot be mapped
+    :type buffer_size: int
+    """
+
+    __slots__ = ("_file", "_owned", "_map", "_packets")
+
+    def __init__(self, file: Union[str, PathLike, BinaryIO], buffer_size: int = 1 << 16) -> None:
+        self._owned = isinstance(file, (str, PathLike))
+        self._file: BinaryIO = open(file, "rb", buffering=buffer_size) if self._owned else file
+        try:
+            self._map: Optional[mmap] = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+        except (AttributeError, OSError, UnsupportedOperation, ValueError):
+            self._map = None
+        self._packets: Iterator[bytes] = self._iter_packets()
+
+    def read(self) -> bytes:
+        return next(self._packets, b"")
+
+    def cleanup(self) -> None:
+        self._packets.close()
+        if self._map is not None:
+            self._map.close()
+        if self._owned:
+            self._file.close()
+
+    def _iter_pages(self) -> Iterator[Tuple[int, bytes, bytes]]:
+        read = (self._file if self._map is None else self._map).read
+        while True:
+            header = read(_OGG_HEADER_SIZE)
+            if len(header) < _OGG_HEADER_SIZE:
+                return
+            if header[:4] != b"OggS":
+                raise ValueError("Invalid Ogg page, the file is not an Ogg file or is corrupted.")
+
+            (serial,) = unpack_from("<I", header, 14)
+            table = read(header[26])
+            yield serial, table, read(sum(table))
+
+    def _iter_packets(self) -> Iterator[bytes]:
+        stream: Optional[int] = None
+        headers = 0
+        partial = bytearray()
+
+        for serial, table, body in self._iter_pages():
+            if stream is None:
+                stream = serial
+            elif serial != stream:
+                continue  # only the first logical stream is played
+
+            start = end = 0
+            for lacing in table:
+                end += lacing
+                if lacing == 255:
+                    continue  # the packet continues in the next segment
+
+                if partial:
+                    partial += body[start:end]
+                    packet = bytes(partial)
+                    partial.clear()
+                else:
+                    packet = body[start:end]
+                start = end
+
+                if headers < 2:  # OpusHead and OpusTags
+                    if headers == 0 and packet[:8] != b"OpusHead":
+                        raise ValueError("The Ogg file does not contain an Opus stream.")
+                    headers += 1
+                    continue
+                if headers == 2:
+                    if _opus_packet_duration(packet) != FRAME_LENGTH:
+                        raise ValueError("The Opus stream has to be encoded with 20 ms frames.")
+                    headers += 1
+
+                if packet:
+                    yield packet
+
+            partial += body[start:end]
+
+
+def _opus_packet_duration(packet: bytes) -> float:
+    """Returns the duration of an Opus packet in seconds, as encoded in its TOC byte."""
+    if not packet:
+        return 0.0
+
+    config = packet[0] >> 3
+    if config < 12:
+        frame = (0.01, 0.02, 0.04, 0.06)[config % 4]
+    elif config < 16:
+        frame = (0.01, 0.02)[config % 2]
+    else:
+        frame = (0.0025, 0.005, 0.01, 0.02)[config % 4]
+
+    code = packet[0] & 0b11
+    if code == 0:
+        frames = 1
+    elif code < 3:
+        frames = 2
+    else:
+        frames = packet[1] & 0b111111 if len(packet) > 1 else 0
+    return round(frame * frames, 4)
+
+
+class BroadcastSource:
+    """
+    Reads every frame of a source once and shares it with any number of connections.
+
+    Each connection plays its own :class:`BroadcastSubscriber`, so only the RTP header and the
+    encryption are done per connection. Recent frames are kept in a ring buffer: subscribers that
+    fall behind read from it without holding up the others, and a subscriber that falls behind
+    further than the buffer skips ahead to the oldest frame still in it.
+
+    :param source: The source to broadcast
+    :type source: AudioSource
+    :param buffer: The amount of recent frames kept for subscribers that fall behind
+    :type buffer: int
+    """
+
+    __slots__ = ("source", "_frames", "_head", "_exhausted", "subscribers")
+
+    def __init__(self, source: AudioSource, buffer: int = 50) -> None:
+        self.source = source
+        self._frames: List[bytes] = [b""] * buffer
+        self._head: int = 0  # the position of the next frame read from the source
+        self._exhausted: bool = False
+        self.subscribers: int = 0
+
+    @property
+    def position(self) -> int:
+        """
+        The amount of frames read from the source so far.
+        :rtype: int
+        """
+        return self._head
+
+    def subscribe(self) -> "BroadcastSubscriber":
+        """
+        Creates a new subscriber, starting at the current frame of the broadcast.
+        :return: The source to play on a connection
+        :rtype: BroadcastSubscriber
+        """
+        self.subscribers += 1
+        return BroadcastSubscriber(self, self._head)
+
+    def _frame(self, position: int) -> bytes:
+        frames = self._frames
+        while self._head <= position:
+            frame = b"" if self._exhausted else self.source.read()
+            if not frame:
+                self._exhausted = True
+                return b""
+            frames[self._head % len(frames)] = frame
+            self._head += 1
+        return frames[position % len(frames)]
+
+    def cleanup(self) -> None:
+        """Cleans the broadcasted source up."""
+        self._exhausted = True
+        self.source.cleanup()
+
+
+class BroadcastSubscriber(AudioSource):
+    """
+    The source playing a :class:`BroadcastSource` on a single connection.
+
+    :ivar int position: The position of the next frame in the broadcast.
+    :ivar int skipped: The amount of frames skipped because the subscriber fell too far behind.
+    """
+
+    __slots__ = ("_broadcast", "position", "skipped", "_subscribed")
+
+    def __init__(self, broadcast: BroadcastSource, position: int) -> None:
+        self._broadcast = broadcast
+        self.position = position
+        self.skipped: int = 0
+        self._subscribed: bool = True
+
+    def read(self) -> bytes:
+        broadcast = self._broadcast
+        oldest = broadcast._head - len(broadcast._frames)
+        if self.position < oldest:
+            self.skipped += oldest - self.position
+            self.position = oldest
+
+        frame = broadcast._frame(self.position)
+        if frame:
+            self.position += 1
+        return frame
+
+    def cleanup(self) -> None:
+        if self._subscribed:
+            self._subscribed = False
+            self._broadcast.subscribers -= 1
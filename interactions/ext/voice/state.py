@@ -15,8 +15,8 @@ class VoiceState(ClientSerializerMixin):
     """
     A class object representing the gateway event ``VOICE_STATE_UPDATE``.
     This class creates an object every time the event ``VOICE_STATE_UPDATE`` is received from the discord API.
-    It contains information about the user's update voice information. Additionally, the last voice state is cached,
-    allowing you to see, what attributes of the user's voice information change.
+    It contains information about the user's update voice information. Additionally, the last voice state of the user
+    in the guild is kept, allowing you to see, what attributes of the user's voice information change.
 
     Attributes:
     -----------
@@ -58,6 +58,7 @@ class VoiceState(ClientSerializerMixin):
     request_to_speak_timestamp: Optional[datetime] = field(
         converter=datetime.fromisoformat, default=None
     )
+    _before: Optional["VoiceState"] = field(default=None, init=False)
 
     @property
     def joined(self) -> bool:
@@ -68,13 +69,14 @@ class VoiceState(ClientSerializerMixin):
         return self.channel_id is not None
 
     @property
-    def before(self) -> "VoiceState":
+    def before(self) -> Optional["VoiceState"]:
         """
-        Returns the last voice state of the member, allowing to check what changed.
-        :return: VoiceState object of the last update of that user
-        :rtype: VoiceState
+        Returns the last voice state of the member in the guild, allowing to check what changed.
+        Only the state directly before is kept, it is forgotten once the next update arrives.
+        :return: VoiceState object of the last update of that user, or ``None`` if there was none
+        :rtype: Optional[VoiceState]
         """
-        return self._client.cache[VoiceState].get(self.user_id)[0]
+        return self._before
 
     async def mute_member(self, reason: Optional[str]) -> Member:
         """
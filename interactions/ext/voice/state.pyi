@@ -19,7 +19,7 @@ class VoiceState(ClientSerializerMixin):
     @property
     def joined(self) -> bool: ...
     @property
-    def before(self) -> "VoiceState": ...
+    def before(self) -> Optional["VoiceState"]: ...
     async def mute_member(self, reason: Optional[str]) -> Member: ...
     async def deafen_member(self, reason: Optional[str]) -> Member: ...
     async def move_member(self, channel_id: int, *, reason: Optional[str]) -> Member: ...
@@ -0,0 +1,144 @@
+from asyncio import CancelledError, Task, get_running_loop, sleep, wait, wait_for
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from interactions.base import get_logger
+
+from .voice import VoiceException
+
+if TYPE_CHECKING:
+    from .voice import VoiceConnectionWebSocketClient
+
+__all__ = ("VoiceSupervisor",)
+
+log = get_logger("voice")
+
+_MAX_BACKOFF = 30.0  # seconds
+
+
+class VoiceSupervisor:
+    """
+    Runs every voice connection of a client as a background task.
+
+    A voice connection lives as long as its websocket, so awaiting it inside the event dispatch of
+    the main gateway would stall the gateway for that long. The supervisor owns the tasks instead:
+    the dispatch only starts a connection and returns.
+
+    The connections resume and reconnect by themselves. Only if one gives up, it is restarted with a
+    new session after a backoff, up to ``max_restarts`` times in a row; restarts that reach
+    ``READY`` again reset the count. Fatal close codes, such as being removed from the channel, are
+    never retried. The error that ends a connection for good is logged and passed to ``on_error``,
+    and fails the playback of the connection.
+
+    :ivar int max_restarts: How often a failed connection is restarted in a row.
+    :ivar Optional[Callable[[int, BaseException], None]] on_error: Called with the guild id and the
+        error of a connection that failed for good.
+    """
+
+    __slots__ = ("_tasks", "max_restarts", "on_error")
+
+    def __init__(
+        self,
+        max_restarts: int = 3,
+        on_error: Optional[Callable[[int, BaseException], None]] = None,
+    ) -> None:
+        self._tasks: Dict[int, Task] = {}
+        self.max_restarts = max_restarts
+        self.on_error = on_error
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._tasks
+
+    def start(self, connection: "VoiceConnectionWebSocketClient") -> Task:
+        """
+        Starts running a connection in the background.
+        :param connection: The connection to run. A running connection of the same guild is closed.
+        :type connection: VoiceConnectionWebSocketClient
+        :return: The task running the connection
+        :rtype: Task
+        """
+        previous = self._tasks.get(connection.guild_id)
+        if previous is not None:
+            previous.cancel()
+
+        task = get_running_loop().create_task(self._supervise(connection))
+        task.add_done_callback(lambda task: self._done(connection, task))
+        self._tasks[connection.guild_id] = task
+        return task
+
+    async def wait_ready(
+        self, connection: "VoiceConnectionWebSocketClient", timeout: Optional[float] = None
+    ) -> None:
+        """
+        Waits until a connection received ``READY``, raising the error it failed with instead.
+        :param connection: The connection to wait for
+        :type connection: VoiceConnectionWebSocketClient
+        :param timeout: The time to wait at most, in seconds, or ``None`` to wait indefinitely
+        :type timeout: Optional[float]
+        """
+        task = self._tasks.get(connection.guild_id)
+        if task is None:
+            return
+        ready = get_running_loop().create_task(connection.ready.wait())
+        try:
+            await wait_for(wait((ready, task), return_when="FIRST_COMPLETED"), timeout)
+        finally:
+            ready.cancel()
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+    async def stop(self, connection: "VoiceConnectionWebSocketClient") -> None:
+        """
+        Closes a connection and waits for its task to end, cancelling it if it does not in time.
+        :param connection: The connection to close
+        :type connection: VoiceConnectionWebSocketClient
+        """
+        connection._close = True
+        task = self._tasks.pop(connection.guild_id, None)
+        if connection._client is not None and not connection._client.closed:
+            await connection._client.close()
+        if task is not None and not task.done():
+            await wait((task,), timeout=5.0)
+            task.cancel()
+
+    async def _supervise(self, connection: "VoiceConnectionWebSocketClient") -> None:
+        restarts = 0
+        while True:
+            connection.ready.clear()
+            try:
+                return await connection._connect()
+            except CancelledError:
+                raise
+            except Exception as exc:
+                if connection._close:
+                    return
+                if isinstance(exc, VoiceException) and exc.fatal:
+                    raise
+                restarts = 0 if connection.ready.is_set() else restarts + 1
+                if restarts > self.max_restarts:
+                    raise
+
+                delay = min(_MAX_BACKOFF, 2.0**restarts)
+                log.warning(
+                    "Voice connection of guild %s failed (%r), restarting in %.0fs.",
+                    connection.guild_id,
+                    exc,
+                    delay,
+                )
+                await sleep(delay)
+
+    def _done(self, connection: "VoiceConnectionWebSocketClient", task: Task) -> None:
+        guild_id = connection.guild_id
+        if self._tasks.get(guild_id) is task:
+            del self._tasks[guild_id]
+        if task.cancelled() or task.exception() is None:
+            connection._fail_playback(ConnectionError("The voice connection was closed."))
+            return
+
+        exc = task.exception()
+        connection._fail_playback(exc)
+        log.error("Voice connection of guild %s failed: %r", guild_id, exc)
+        if self.on_error is not None:
+            self.on_error(guild_id, exc)
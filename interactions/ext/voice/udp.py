@@ -0,0 +1,408 @@
+import ctypes
+import ctypes.util
+import sys
+from asyncio import (
+    DatagramProtocol,
+    DatagramTransport,
+    Future,
+    Handle,
+    TimeoutError,
+    get_running_loop,
+    wait_for,
+)
+from errno import EINTR
+from socket import AF_INET, AF_INET6, SOCK_DGRAM, inet_pton
+from struct import pack, pack_into, unpack_from
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from interactions.base import get_logger
+
+__all__ = ("VoiceUDPProtocol", "UDPEgress")
+
+log = get_logger("voice")
+
+_DISCOVERY_REQUEST = 0x1
+_DISCOVERY_RESPONSE = 0x2
+_DISCOVERY_LENGTH = 74
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.c_void_p),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_sendmmsg() -> Optional[Callable[[int, int, int, int], int]]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        sendmmsg = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True).sendmmsg
+    except (AttributeError, OSError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+
+_sendmmsg = _load_sendmmsg()
+_BATCH_SIZE = 256
+_SLOT_SIZE = 2048  # larger than any RTP packet of an Opus frame
+_IOV_SIZE = ctypes.sizeof(_IOVec)
+_MSG_SIZE = ctypes.sizeof(_MMsgHdr)
+_IOV_LENGTH = _IOVec.iov_len.offset
+
+
+def _sockaddr(family: int, address: Tuple[Any, ...]) -> bytes:
+    """Builds the ``sockaddr_in``/``sockaddr_in6`` structure of an address."""
+    if family == AF_INET:
+        return (
+            pack("=H", AF_INET) + pack(">H", address[1]) + inet_pton(AF_INET, address[0]) + bytes(8)
+        )
+    return (
+        pack("=H", AF_INET6)
+        + pack(">HI", address[1], 0)
+        + inet_pton(AF_INET6, address[0])
+        + pack("=I", address[3] if len(address) > 3 else 0)
+    )
+
+
+class VoiceUDPProtocol(DatagramProtocol):
+    """
+    The datagram protocol owning the UDP socket of a single voice connection.
+
+    The socket is connected to the voice server when the endpoint is created, so sending media
+    does not need any address resolution and costs exactly one ``send`` per packet.
+
+    Connections created by a :class:`UDPEgress` share its sockets instead of owning one.
+
+    :ivar Optional[DatagramTransport] transport: The transport of the connected socket.
+    :ivar Optional[Callable[[bytes], None]] on_packet: Called with every received media datagram.
+    """
+
+    __slots__ = (
+        "transport",
+        "on_packet",
+        "_discovery",
+        "_shared",
+        "_address",
+        "_sockaddr",
+        "_name",
+    )
+
+    def __init__(self) -> None:
+        self.transport: Optional[DatagramTransport] = None
+        self.on_packet: Optional[Callable[[bytes], None]] = None
+        self._discovery: Optional[Future] = None
+        self._shared: Optional[_SharedSocket] = None
+        self._address: Optional[Tuple[Any, ...]] = None
+        self._sockaddr: Optional[ctypes.Array] = None
+        self._name: bytes = b""
+
+    @classmethod
+    async def connect(cls, ip: str, port: int) -> "VoiceUDPProtocol":
+        """
+        Opens a non-blocking UDP socket connected to the voice server.
+        :param ip: The ip of the voice server, as received in ``READY``
+        :type ip: str
+        :param port: The port of the voice server, as received in ``READY``
+        :type port: int
+        :return: The connected protocol
+        :rtype: VoiceUDPProtocol
+        """
+        _, protocol = await get_running_loop().create_datagram_endpoint(cls, remote_addr=(ip, port))
+        return protocol
+
+    def connection_made(self, transport: DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if self.on_packet is not None:
+            self.on_packet(data)
+        elif (
+            self._discovery is not None
+            and not self._discovery.done()
+            and len(data) == _DISCOVERY_LENGTH
+            and unpack_from(">H", data)[0] == _DISCOVERY_RESPONSE
+        ):
+            self._discovery.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        log.debug(f"Voice UDP error: {exc!r}")
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        if self._discovery is not None and not self._discovery.done():
+            self._discovery.cancel()
+
+    def sendto(self, data: bytes) -> None:
+        """
+        Sends a single datagram to the voice server.
+        :param data: The datagram to send
+        :type data: bytes
+        """
+        if self._shared is not None:
+            self._shared.send(self, data)
+        elif self.transport is not None:
+            self.transport.sendto(data)
+
+    async def discover_ip(
+        self, ssrc: int, timeout: float = 2.0, attempts: int = 3
+    ) -> Tuple[str, int]:
+        """
+        Performs the IP discovery exchange to find the external address of the socket.
+        :param ssrc: The SSRC received in ``READY``
+        :type ssrc: int
+        :param timeout: The time to wait for a response per attempt, in seconds
+        :type timeout: float
+        :param attempts: How often the request is re-sent, since UDP may drop it
+        :type attempts: int
+        :return: The external ip and port
+        :rtype: Tuple[str, int]
+        """
+        packet = bytearray(_DISCOVERY_LENGTH)
+        pack_into(">HHI", packet, 0, _DISCOVERY_REQUEST, _DISCOVERY_LENGTH - 4, ssrc)
+        loop = get_running_loop()
+
+        for attempt in range(1, attempts + 1):
+            self._discovery = loop.create_future()
+            self.sendto(packet)
+            try:
+                data: bytes = await wait_for(self._discovery, timeout)
+            except TimeoutError:
+                log.debug(f"IP discovery timed out (attempt {attempt}/{attempts})")
+                continue
+            finally:
+                self._discovery = None
+
+            ip = data[8 : _DISCOVERY_LENGTH - 2].split(b"\x00", 1)[0].decode("ascii")
+            (port,) = unpack_from(">H", data, _DISCOVERY_LENGTH - 2)
+            return ip, port
+
+        raise TimeoutError("IP discovery did not receive a response.")
+
+    def close(self) -> None:
+        """Closes the underlying socket."""
+        if self._shared is not None:
+            self._shared.release(self)
+        elif self.transport is not None:
+            self.transport.close()
+
+
+class _SharedSocket(DatagramProtocol):
+    """
+    An unconnected UDP socket shared by the connections of a :class:`UDPEgress`.
+
+    Received datagrams are routed to the connection of the voice server they came from, so every
+    connection of the socket has to talk to a different server address. Queued packets are copied
+    into preallocated slots that the ``mmsghdr`` array of the batch points to, so a flush is a
+    single ``sendmmsg`` call without building any structures.
+    """
+
+    __slots__ = (
+        "transport",
+        "family",
+        "endpoints",
+        "_egress",
+        "_fd",
+        "count",
+        "_data",
+        "_iovecs",
+        "_messages",
+        "_views",
+        "_arrays",
+        "_pointer",
+        "_targets",
+    )
+
+    def __init__(self, egress: "UDPEgress", family: int) -> None:
+        self.transport: Optional[DatagramTransport] = None
+        self.family = family
+        self.endpoints: Dict[Tuple[Any, ...], VoiceUDPProtocol] = {}
+        self._egress = egress
+        self._fd: int = -1
+        self.count: int = 0
+        self._targets: List[Optional[VoiceUDPProtocol]] = [None] * _BATCH_SIZE
+
+        self._data = bytearray(_BATCH_SIZE * _SLOT_SIZE)
+        self._iovecs = bytearray(_BATCH_SIZE * _IOV_SIZE)
+        self._messages = bytearray(_BATCH_SIZE * _MSG_SIZE)
+        self._arrays = [
+            (ctypes.c_char * len(buffer)).from_buffer(buffer)
+            for buffer in (self._data, self._iovecs, self._messages)
+        ]
+        data, iovecs, self._pointer = (ctypes.addressof(array) for array in self._arrays)
+        self._views = tuple(memoryview(array).cast("B") for array in self._arrays)
+        for index in range(_BATCH_SIZE):
+            pack_into("PN", self._iovecs, index * _IOV_SIZE, data + index * _SLOT_SIZE, 0)
+            message = _MMsgHdr.from_buffer(self._messages, index * _MSG_SIZE)
+            message.msg_hdr.msg_iov = iovecs + index * _IOV_SIZE
+            message.msg_hdr.msg_iovlen = 1
+
+    def connection_made(self, transport: DatagramTransport) -> None:
+        self.transport = transport
+        self._fd = transport.get_extra_info("socket").fileno()
+
+    def datagram_received(self, data: bytes, addr: Tuple[Any, ...]) -> None:
+        endpoint = self.endpoints.get(addr[:2])
+        if endpoint is not None:
+            endpoint.datagram_received(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        log.debug(f"Voice UDP error: {exc!r}")
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        for endpoint in tuple(self.endpoints.values()):
+            endpoint.connection_lost(exc)
+
+    def send(self, endpoint: VoiceUDPProtocol, data: bytes) -> None:
+        """Queues a datagram of a connection, to be sent with the next flush of the egress."""
+        size = len(data)
+        if self.transport is None:
+            return
+        if _sendmmsg is None or size > _SLOT_SIZE:
+            self.transport.sendto(data, endpoint._address)
+            return
+
+        index = self.count
+        data_view, iovecs, messages = self._views
+        offset = index * _SLOT_SIZE
+        data_view[offset : offset + size] = data
+        pack_into("N", iovecs, index * _IOV_SIZE + _IOV_LENGTH, size)
+        offset = index * _MSG_SIZE
+        messages[offset : offset + len(endpoint._name)] = endpoint._name
+        self._targets[index] = endpoint
+        self.count = index + 1
+
+        if index == 0:
+            self._egress._schedule(self)
+        elif index + 1 == _BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Sends every queued datagram."""
+        count, self.count = self.count, 0
+        if not count or self.transport is None:
+            return
+
+        sent = 0
+        if not self.transport.get_write_buffer_size():  # keep the order of buffered datagrams
+            while sent < count:
+                result = _sendmmsg(self._fd, self._pointer + sent * _MSG_SIZE, count - sent, 0)
+                self._egress.syscalls += 1
+                if result < 0:
+                    if ctypes.get_errno() == EINTR:
+                        continue
+                    break  # e.g. a full send buffer, the transport buffers the rest
+                sent += result
+
+        for index in range(sent, count):  # fall back to the transport, which retries later
+            offset = index * _SLOT_SIZE
+            (size,) = unpack_from("N", self._iovecs, index * _IOV_SIZE + _IOV_LENGTH)
+            self.transport.sendto(
+                bytes(self._data[offset : offset + size]), self._targets[index]._address
+            )
+        self._egress.packets += count
+
+    def release(self, endpoint: VoiceUDPProtocol) -> None:
+        """Removes a connection, closing the socket once no connection is left."""
+        self.flush()
+        if self.endpoints.get(endpoint._address[:2]) is endpoint:
+            del self.endpoints[endpoint._address[:2]]
+        endpoint._shared = endpoint.transport = None
+        if not self.endpoints:
+            self._egress._sockets.remove(self)
+            if self.transport is not None:
+                self.transport.close()
+
+
+class UDPEgress:
+    """
+    Sends the packets of every voice connection of the process through a few shared sockets.
+
+    Instead of one socket per connection, connections to different voice servers share a socket.
+    Every packet queued within one iteration of the event loop - e.g. all packets of a
+    :class:`MediaScheduler` tick - is sent in a single ``sendmmsg`` call per socket at the end of
+    it, instead of one ``send`` call per packet. Where ``sendmmsg`` is not available, the packets
+    are sent one by one through the transport of the shared socket.
+
+    :ivar int packets: The amount of packets sent.
+    :ivar int syscalls: The amount of ``sendmmsg`` calls made.
+    """
+
+    __slots__ = ("_sockets", "_dirty", "_handle", "packets", "syscalls")
+
+    def __init__(self) -> None:
+        self._sockets: List[_SharedSocket] = []
+        self._dirty: Dict[_SharedSocket, None] = {}
+        self._handle: Optional[Handle] = None
+        self.packets: int = 0
+        self.syscalls: int = 0
+
+    @property
+    def batching(self) -> bool:
+        """
+        Whether packets are sent in batches, i.e. ``sendmmsg`` is available.
+        :rtype: bool
+        """
+        return _sendmmsg is not None
+
+    async def connect(self, ip: str, port: int) -> VoiceUDPProtocol:
+        """
+        Opens a connection to a voice server on one of the shared sockets.
+        :param ip: The ip of the voice server, as received in ``READY``
+        :type ip: str
+        :param port: The port of the voice server, as received in ``READY``
+        :type port: int
+        :return: The connection, used like a :class:`VoiceUDPProtocol` of its own
+        :rtype: VoiceUDPProtocol
+        """
+        loop = get_running_loop()
+        family, _, _, _, address = (await loop.getaddrinfo(ip, port, type=SOCK_DGRAM))[0]
+
+        for shared in self._sockets:
+            if shared.family == family and address[:2] not in shared.endpoints:
+                break
+        else:
+            _, shared = await loop.create_datagram_endpoint(
+                lambda: _SharedSocket(self, family), family=family
+            )
+            self._sockets.append(shared)
+
+        protocol = VoiceUDPProtocol()
+        protocol.transport = shared.transport
+        protocol._shared = shared
+        protocol._address = address
+        sockaddr = _sockaddr(family, address)
+        protocol._sockaddr = ctypes.create_string_buffer(sockaddr, len(sockaddr))
+        protocol._name = pack("P", ctypes.addressof(protocol._sockaddr)) + pack(
+            "I", len(sockaddr)
+        )  # msg_name and msg_namelen of the messages to the server
+        shared.endpoints[address[:2]] = protocol
+        return protocol
+
+    def _schedule(self, shared: _SharedSocket) -> None:
+        self._dirty[shared] = None
+        if self._handle is None:
+            self._handle = get_running_loop().call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Sends every queued packet."""
+        self._handle = None
+        dirty, self._dirty = self._dirty, {}
+        for shared in dirty:
+            shared.flush()
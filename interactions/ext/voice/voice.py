@@ -1,25 +1,44 @@
-try:
-    from orjson import dumps, loads
-except ImportError:
-    from json import dumps, loads
-
-from asyncio import Event, Task, ensure_future, sleep
+from asyncio import Event, TimeoutError, ensure_future, get_running_loop, sleep
 from enum import IntEnum
-from typing import Any, Dict, List, Optional, Tuple
+from logging import DEBUG
+from random import uniform
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
-from aiohttp import WSMessage, WSMsgType
+from aiohttp import ClientError, ClientSession, WSMessage, WSMsgType
 from aiohttp.http import WS_CLOSED_MESSAGE, WS_CLOSING_MESSAGE
-from nacl.secret import SecretBox  # noqa, for now
 
-from interactions.api.gateway.heartbeat import _Heartbeat
 from interactions.api.http.client import HTTPClient
 from interactions.api.models.misc import MISSING
 from interactions.base import get_logger
 
+from .codec import decode, encode, heartbeat, send_text, speaking
+from .heartbeat import HeartbeatScheduler
+from .metrics import (
+    BYTES_RECEIVED,
+    BYTES_SENT,
+    PACKETS_RECEIVED,
+    PACKETS_SENT,
+    RECONNECTS,
+    RESUMES,
+    VoiceMetrics,
+)
+from .player import AudioPlayer, PacingPolicy
+from .receive import VoiceReceiver
+from .rtp import EncryptionMode, RTPPacketizer
+from .scheduler import MediaScheduler
+from .sources import AudioSource
+from .udp import VoiceUDPProtocol
+
 __all__ = ("VoiceException", "VoiceOpCodeType", "SpeakingType", "VoiceConnectionWebSocketClient")
 
 log = get_logger("voice")
 
+_FATAL_CLOSE_CODES = (4001, 4002, 4003, 4004, 4005, 4011, 4012, 4014, 4016)
+_INVALID_SESSION_CODES = (4006, 4009)  # the session cannot be resumed, but identified anew
+_MAX_RECONNECT_ATTEMPTS = 8
+_MAX_BACKOFF = 30.0  # seconds
+
 
 # TODO: REWRITE TO LIBRARYEXCEPTION
 
@@ -36,6 +55,22 @@ class VoiceException(Exception):
     def __init__(self, __type, **kwargs):
         super().__init__(__type)
 
+    @property
+    def code(self) -> int:
+        """
+        The close code of the voice gateway.
+        :rtype: int
+        """
+        return self.args[0]
+
+    @property
+    def fatal(self) -> bool:
+        """
+        Whether the voice gateway must not be connected to again with the same session.
+        :rtype: bool
+        """
+        return self.code in _FATAL_CLOSE_CODES
+
     @staticmethod
     def lookup() -> dict:
         return {
@@ -74,54 +109,102 @@ class SpeakingType(IntEnum):
 
 
 class VoiceConnectionWebSocketClient:
-    def __init__(self, guild_id: int, data: dict, _http: HTTPClient):
+    def __init__(
+        self,
+        guild_id: int,
+        data: dict,
+        _http: HTTPClient,
+        scheduler: Optional[MediaScheduler] = None,
+        heartbeat: Optional[HeartbeatScheduler] = None,
+        metrics: Optional[VoiceMetrics] = None,
+        session: Optional[ClientSession] = None,
+    ):
         self.guild_id = guild_id
         self.session_id = data.get("session_id")
-        self.endpoint = f"wss://{data.get('endpoint')}?v=4"
+        endpoint = data.get("endpoint")
+        self.endpoint = f"{endpoint if '://' in str(endpoint) else f'wss://{endpoint}'}?v=4"
         self.token = data.get("token")
         self.user_id = data.get("user_id")
         self._http = _http
-        self.__task = None
+        self._session = session
         self._secret_key: bytes = None
         self._port = None
         self._ip = None
-        self._mode = None
+        self._mode: Optional[EncryptionMode] = None
+        self._udp: Optional[VoiceUDPProtocol] = None
+        self._packetizer: Optional[RTPPacketizer] = None
+        self._player: Optional[AudioPlayer] = None
+        self._receiver: Optional[VoiceReceiver] = None
+        self._users: Dict[int, int] = {}  # ssrc -> user_id, from SPEAKING events
+        self._scheduler = scheduler if scheduler is not None else MediaScheduler()
+        self._heartbeat = heartbeat if heartbeat is not None else HeartbeatScheduler()
+        self.metrics = metrics if metrics is not None else VoiceMetrics()
         self._closed = False
         self._close = (
             False  # determines whether closing of the connection is wanted or not -> disconnect
         )
+        self._resuming = False
+        self._established = False
         self._media_session_id = None
-        self.__heartbeater: _Heartbeat = _Heartbeat(loop=None)
         self._heartbeats = 0
+        self._heartbeat_nonce: Optional[int] = None
+        self._heartbeat_sent = 0.0
+        self._latency = float("inf")
+        self._speaking: Tuple[bytes, bytes] = (b"", b"")  # the SPEAKING packets to stop and start
         self.ready = Event()
+        self.media_ready = Event()
 
-    async def _send_packet(self, data: Dict[str, Any]) -> None:
+    async def _send_packet(self, data: Union[Dict[str, Any], bytes]) -> None:
         """
         Sends a packet to the Gateway.
-        :param data: The data to send to the Gateway.
-        :type data: Dict[str, Any]
+        :param data: The data to send to the Gateway, or its serialized JSON.
+        :type data: Union[Dict[str, Any], bytes]
         """
-        _data = dumps(data) if isinstance(data, dict) else data
-        packet: str = _data.decode("utf-8") if isinstance(_data, bytes) else _data
-        await self._client.send_str(packet)
-        log.debug(packet)
+        packet = data if isinstance(data, bytes) else encode(data)
+        await send_text(self._client, packet)
+        if log.isEnabledFor(DEBUG):
+            log.debug("Voice Gateway packet sent: %s", packet.decode("utf-8"))
 
-    def _reset(self):
+    def _reset(self, resume: bool = False) -> None:
+        """
+        Prepares the state for a new connection to the Gateway.
+        :param resume: Whether the session is resumed, keeping the UDP socket and the secret key
+        :type resume: bool
+        """
         self._client = None
+        self._heartbeats = 0
+        self._heartbeat_nonce = None
+
+        if resume:
+            return
+
+        self._close_udp()
 
         self._secret_key = None
+        self._packetizer = None
+        self.media_ready.clear()
 
         self._port: str = None
         self._ip: int = None
-        self._mode: str = None
-
-        self._closed = False
-        self._close = False
+        self._mode: Optional[EncryptionMode] = None
 
         self._media_session_id = None
 
-        self._heartbeats = 0
-        self.__heartbeater.delay = 0.0
+    @property
+    def mode(self) -> Optional[EncryptionMode]:
+        """
+        The encryption mode negotiated with the voice server.
+        :rtype: Optional[EncryptionMode]
+        """
+        return self._mode
+
+    @property
+    def latency(self) -> float:
+        """
+        The round-trip time of the last acknowledged heartbeat, in seconds.
+        :rtype: float
+        """
+        return self._latency
 
     @property
     async def __receive_packet_stream(self) -> Optional[Dict[str, Any]]:
@@ -144,79 +227,190 @@ class VoiceConnectionWebSocketClient:
             await self._client.close()
             return WS_CLOSED_MESSAGE
 
-        return loads(str(packet.data)) if packet and isinstance(packet.data, (str, int)) else None
+        if packet and isinstance(packet.data, str):
+            return decode(packet.data)
+        return packet.data if packet and isinstance(packet.data, int) else None
 
     async def _connect(
         self,
         shard: Optional[List[Tuple[int]]] = MISSING,
     ) -> None:
         """
-        Establishes a client connection with the Gateway.
+        Establishes a client connection with the Gateway and keeps it alive until it is closed.
+
+        When the connection drops, the session is resumed, keeping the UDP socket and the secret
+        key so that audio keeps flowing. Only if the session cannot be resumed, a new one is
+        identified. Failed attempts are retried with a bounded exponential backoff.
         :param shard?: The shards to establish a connection with. Defaults to ``None``.
         :type shard: Optional[List[Tuple[int]]]
         """
-        self._reset()
+        self._closed = False
+        resume = False
+        failures = 0
+
+        try:
+            while True:
+                self._reset(resume)
+                self._resuming = resume
+                self._established = False
+                try:
+                    code = await self._run(shard)
+                except (ClientError, OSError, TimeoutError) as exc:
+                    log.debug("Voice Gateway connection failed: %r", exc)
+                    code = None
+
+                if self._close:
+                    log.debug("Closing Voice Connection.")
+                    break
+                if code in _FATAL_CLOSE_CODES:
+                    raise VoiceException(code)
+
+                resume = code not in _INVALID_SESSION_CODES and self._secret_key is not None
+                failures = 0 if self._established else failures + 1
+                if failures > _MAX_RECONNECT_ATTEMPTS:
+                    raise VoiceException(code or 4009)
+                self.metrics.counters[RECONNECTS] += 1
+                if failures:
+                    delay = min(_MAX_BACKOFF, 2 ** (failures - 1)) * uniform(0.5, 1.0)
+                    log.debug("Reconnecting to the Voice Gateway in %.2fs (code %s).", delay, code)
+                    await sleep(delay)
+                else:
+                    log.debug("Voice Gateway closed with code %s, reconnecting.", code)
+        finally:
+            self._closed = True
+            self._heartbeat.remove(self)
+            self._close_udp()
+            self.media_ready.clear()
+            if self._receiver is not None:
+                self._receiver.close()
+            if self._close:
+                self._fail_playback(ConnectionError("The voice connection was closed."))
+
+    def _fail_playback(self, error: BaseException) -> None:
+        """
+        Ends the playback of the connection, whose session is gone for good.
+        :param error: The error the playback fails with
+        :type error: BaseException
+        """
+        if self._player is not None:
+            self._player._fail(error)
 
-        async with self._http._req._session.ws_connect(self.endpoint) as self._client:
-            self._closed = self._client.closed
+    async def _run(self, shard: Optional[List[Tuple[int]]] = MISSING) -> Optional[int]:
+        """
+        Runs a single connection to the Gateway until it closes.
+        :param shard?: The shards to establish a connection with. Defaults to ``None``.
+        :type shard: Optional[List[Tuple[int]]]
+        :return: The close code of the connection
+        :rtype: Optional[int]
+        """
+        try:
+            session = self._session if self._session is not None else self._http._req._session
+            async with session.ws_connect(self.endpoint) as self._client:
+                while not self._client.closed:
+                    stream = await self.__receive_packet_stream
+
+                    if stream is None:
+                        continue
+
+                    if isinstance(stream, int):
+                        return stream
+                    if stream == WS_CLOSED_MESSAGE or stream == WSMsgType.CLOSE:
+                        break
 
-            if self._closed:
-                await self._connect()
+                    start = perf_counter()
+                    await self._handle_connection(stream, shard)
+                    self.metrics.handled(stream.get("op", -1), perf_counter() - start)
 
-            while not self._closed:
-                stream = await self.__receive_packet_stream
+                return self._client.close_code
+        finally:
+            self._heartbeat.remove(self)
 
-                if stream is None:
-                    continue
+    async def __heartbeat(self) -> None:
+        """Sends a ``HEARTBEAT`` packet to the gateway, with the time it is sent at as the nonce."""
+        self._heartbeat_sent = get_running_loop().time()
+        self._heartbeat_nonce = int(self._heartbeat_sent * 1000)
+        try:
+            await self._send_packet(heartbeat(self._heartbeat_nonce))
+        except ConnectionResetError:
+            pass  # the websocket is closing, which its receive loop handles
 
-                if self._client is None or stream == WS_CLOSED_MESSAGE or stream == WSMsgType.CLOSE:
-                    await self._connect()
-                    break
+    def _beat(self, now: float) -> bool:
+        """
+        Called by the heartbeat scheduler whenever a heartbeat of this connection is due.
+        :param now: The time of the event loop
+        :type now: float
+        :return: Whether the heartbeats go on, ``False`` if the last one was not acknowledged
+        :rtype: bool
+        """
+        if self._client is None or self._client.closed:
+            return False
+        if self._heartbeat_nonce is not None:
+            log.debug("HEARTBEAT_ACK missing, reconnecting...")
+            ensure_future(self.__restart())
+            return False
+
+        ensure_future(self.__heartbeat())
+        return True
+
+    def _close_udp(self) -> None:
+        if self._udp is not None:
+            self._udp.close()
+            self._udp = None
+
+    async def _connect_udp(self, ip: str, port: int) -> None:
+        """
+        Opens the UDP socket to the voice server and discovers our external address.
+        :param ip: The ip of the voice server
+        :type ip: str
+        :param port: The port of the voice server
+        :type port: int
+        """
+        self._close_udp()
+        egress = self._scheduler.egress
+        self._udp = await (VoiceUDPProtocol.connect if egress is None else egress.connect)(ip, port)
+        self._ip, self._port = await self._udp.discover_ip(self.ssrc)
+        log.debug("IP DISCOVERY: %s:%s", self._ip, self._port)
+        self._udp.on_packet = self._receive
+
+    def _receive(self, data: bytes) -> None:
+        """Counts a packet received from the voice server and passes it to the receiver."""
+        counters = self.metrics.counters
+        counters[PACKETS_RECEIVED] += 1
+        counters[BYTES_RECEIVED] += len(data)
+        if self._receiver is not None:
+            self._receiver.feed(data)
+
+    def _listen(self) -> VoiceReceiver:
+        """
+        Starts receiving the audio of the other users in the channel.
+        :return: The receiver yielding the frames of every speaker
+        :rtype: VoiceReceiver
+        """
+        if self._receiver is None:
+            self._receiver = VoiceReceiver(mode=self._mode or EncryptionMode.NORMAL)
+            for ssrc, user_id in self._users.items():
+                self._receiver.map(ssrc, user_id)
+            if self._secret_key is not None:
+                self._receiver.set_secret_key(self._secret_key)
 
-                if (
-                    self._client.close_code in range(4001, 4006)
-                    or self._client.close_code
-                    in (
-                        4009,
-                        4011,
-                        4012,
-                        4014,
-                        4016,
-                    )
-                ) or isinstance(stream, int):
-                    if self.__task:
-                        self.__task.cancel()  # to be sure it stops
-                    self._closed = True
-                    if self._close and self._client.close_code == 4014:
-                        log.debug("Closing Voice Connection.")
-                        break
-                    else:
-                        code = self._client.close_code or stream
-                        raise VoiceException(code)
+        return self._receiver
 
-                await self._handle_connection(stream, shard)
+    def _send_audio_frame(self, frame: bytes) -> None:
+        """
+        Packetizes, encrypts and sends an Opus frame through the UDP socket.
+        :param frame: The Opus frame to send
+        :type frame: bytes
+        """
+        if self._udp is None or not self.media_ready.is_set():
+            return
 
-    async def __heartbeat(self):
-        payload: dict = {
-            "op": VoiceOpCodeType.HEARTBEAT,
-            "d": self._heartbeats,
-        }
-        await self._send_packet(payload)
-        log.debug("HEARTBEAT")
-
-    async def _manage_heartbeat(self) -> None:
-        """Manages the heartbeat loop."""
-        while True:
-            if self._closed:
-                await self.__restart()
-            if self.__heartbeater.event.is_set():
-                await self.__heartbeat()
-                self.__heartbeater.event.clear()
-                await sleep(self.__heartbeater.delay / 1000)
-            else:
-                log.debug("HEARTBEAT_ACK missing, reconnecting...")
-                await self.__restart()
-                break
+        counters = self.metrics.counters
+        counters[PACKETS_SENT] += 1
+        counters[BYTES_SENT] += len(frame) + self._packetizer.overhead
+        if self._scheduler.executor is None:
+            self._udp.sendto(self._packetizer.packetize(frame))
+        else:
+            self._scheduler.submit(self._udp, self._packetizer.prepare(frame))
 
     async def _select_protocol(self):
 
@@ -227,11 +421,10 @@ class VoiceConnectionWebSocketClient:
                 "data": {
                     "address": self._ip,
                     "port": self._port,
-                    "mode": "xsalsa20_poly1305",
+                    "mode": self._mode.value,
                 },
             },
         }
-        log.debug(f"CONNECTING TO UDP: {payload}")
         await self._send_packet(payload)
 
     async def _handle_connection(
@@ -247,76 +440,135 @@ class VoiceConnectionWebSocketClient:
         :type shard: Optional[List[Tuple[int]]]
         """
         op: Optional[int] = stream.get("op")
-        data: Optional[Dict[str, Any]] = stream.get("d")
 
-        log.debug(f"Voice Gateway Event: {stream}")
+        if log.isEnabledFor(DEBUG):
+            log.debug("Voice Gateway Event: %s", stream)
 
-        if op == VoiceOpCodeType.HELLO:
-            self.__heartbeater.delay = data["heartbeat_interval"]
-            self.__heartbeater.event.set()
+        handler = self._HANDLERS.get(op)
+        if handler is not None:
+            await handler(self, stream.get("d"), shard)
 
-            if self.__task:
-                self.__task.cancel()  # so we can reduce redundant heartbeat bg tasks.
+    async def _on_hello(self, data: Dict[str, Any], shard: Optional[List[Tuple[int]]]) -> None:
+        self._heartbeat.add(self, data["heartbeat_interval"] / 1000)
 
-            self.__task = ensure_future(self._manage_heartbeat())
-
-            await self.__identify(shard)
-
-        if op == VoiceOpCodeType.READY:
-            self._ip = data.get("ip")
-            self._port = data.get("port")
-            self.ssrc = data.get("ssrc")
-            await self._select_protocol()
-            self._ready = data
-            log.debug(f"READY (session_id: {self.session_id})")
-            self.ready.set()
-
-        if op == VoiceOpCodeType.HEARTBEAT:
-            await self.__heartbeat()
-
-        if op == VoiceOpCodeType.HEARTBEAT_ACK:
-            log.debug("HEARTBEAT_ACK")
-            self._heartbeats += 1
-            self.__heartbeater.event.set()
-
-        if op == VoiceOpCodeType.SESSION_DESCRIPTION:
-            self._secret_key = bytes(data["secret_key"])
-            self._media_session_id = data["media_session_id"]
-            self._mode = data["mode"]
-
-        if op == VoiceOpCodeType.RESUME:
+        if self._resuming:
             await self.__resume()
+        else:
+            await self.__identify(shard)
 
-        if op == VoiceOpCodeType.RESUMED:
-            log.debug(f"RESUMED (session_id: {self.session_id})")
-
-        # TODO: other opcodes
+    async def _on_ready(self, data: Dict[str, Any], shard: Optional[List[Tuple[int]]]) -> None:
+        self.ssrc = data.get("ssrc")
+        self._speaking = (speaking(0, self.ssrc), speaking(SpeakingType.MICROPHONE, self.ssrc))
+        self._mode = EncryptionMode.select(data.get("modes") or (EncryptionMode.NORMAL,))
+        self._packetizer = RTPPacketizer(self.ssrc, self._mode)
+        await self._connect_udp(data.get("ip"), data.get("port"))
+        await self._select_protocol()
+        self._ready = data
+        self._established = True
+        log.debug("READY (session_id: %s)", self.session_id)
+        self.ready.set()
+
+    async def _on_heartbeat(self, data: Any, shard: Optional[List[Tuple[int]]]) -> None:
+        await self.__heartbeat()
+
+    async def _on_heartbeat_ack(self, data: Any, shard: Optional[List[Tuple[int]]]) -> None:
+        self._heartbeats += 1
+        if self._heartbeat_nonce is not None and data == self._heartbeat_nonce:
+            self._latency = get_running_loop().time() - self._heartbeat_sent
+            self.metrics.rtt.observe(self._latency)
+            self._heartbeat_nonce = None
+
+    async def _on_session_description(
+        self, data: Dict[str, Any], shard: Optional[List[Tuple[int]]]
+    ) -> None:
+        self._mode = EncryptionMode(data["mode"])
+        self._secret_key = bytes(data["secret_key"])
+        self._packetizer.mode = self._mode
+        self._packetizer.set_secret_key(self._secret_key)
+        if self._receiver is not None:
+            self._receiver.mode = self._mode
+            self._receiver.set_secret_key(self._secret_key)
+        self.media_ready.set()
+        self._media_session_id = data["media_session_id"]
+
+    async def _on_resume(self, data: Any, shard: Optional[List[Tuple[int]]]) -> None:
+        await self.__resume()
+
+    async def _on_resumed(self, data: Any, shard: Optional[List[Tuple[int]]]) -> None:
+        self._established = True
+        self.metrics.counters[RESUMES] += 1
+        log.debug("RESUMED (session_id: %s)", self.session_id)
+
+    async def _on_speaking(self, data: Dict[str, Any], shard: Optional[List[Tuple[int]]]) -> None:
+        self._users[data["ssrc"]] = int(data["user_id"])
+        if self._receiver is not None:
+            self._receiver.map(data["ssrc"], int(data["user_id"]))
+
+    async def _on_client_disconnect(
+        self, data: Dict[str, Any], shard: Optional[List[Tuple[int]]]
+    ) -> None:
+        user_id = int(data["user_id"])
+        for ssrc in [ssrc for ssrc, _user_id in self._users.items() if _user_id == user_id]:
+            del self._users[ssrc]
+        if self._receiver is not None:
+            self._receiver.remove(user_id)
+
+    # TODO: other opcodes
+    _HANDLERS: Dict[int, Callable[..., Awaitable[None]]] = {
+        VoiceOpCodeType.HELLO: _on_hello,
+        VoiceOpCodeType.READY: _on_ready,
+        VoiceOpCodeType.HEARTBEAT: _on_heartbeat,
+        VoiceOpCodeType.HEARTBEAT_ACK: _on_heartbeat_ack,
+        VoiceOpCodeType.SESSION_DESCRIPTION: _on_session_description,
+        VoiceOpCodeType.RESUME: _on_resume,
+        VoiceOpCodeType.RESUMED: _on_resumed,
+        VoiceOpCodeType.SPEAKING: _on_speaking,
+        VoiceOpCodeType.CLIENT_DISCONNECT: _on_client_disconnect,
+    }
 
     async def _start_speaking(self) -> None:
-        payload = {
-            "op": VoiceOpCodeType.SPEAKING,
-            "d": {"speaking": 1 << 0, "delay": 0, "ssrc": self.ssrc},
-        }
-        log.debug(f"SPEAKING: {payload}")
-        await self._send_packet(payload)
+        await self._send_packet(self._speaking[1])
 
     async def _stop_speaking(self) -> None:
-        payload = {
-            "op": VoiceOpCodeType.SPEAKING,
-            "d": {"speaking": 0, "delay": 0, "ssrc": self.ssrc},
-        }
-        log.debug(f"SPEAKING: {payload}")
-        await self._send_packet(payload)
+        await self._send_packet(self._speaking[0])
+
+    async def _play(
+        self, source: AudioSource, policy: PacingPolicy = PacingPolicy.CATCH_UP, dtx: bool = True
+    ) -> AudioPlayer:
+        """
+        Plays a source over the connection until it is exhausted or stopped.
+
+        A source that is still playing is stopped first and hands the connection over without
+        ending its transmission.
+        :param source: The source to play
+        :type source: AudioSource
+        :param policy: How frames that are overdue are handled
+        :type policy: PacingPolicy
+        :param dtx: Whether no packets are sent while the source is silent
+        :type dtx: bool
+        :return: The player, holding the late-frame accounting of the playback
+        :rtype: AudioPlayer
+        """
+        while self._player is not None:  # the previous player ends before this one speaks
+            previous = self._player
+            previous.stop(handoff=True)
+            await previous.wait()
+            if self._player is previous:
+                self._player = None
+
+        self._player = player = AudioPlayer(self, source, policy, dtx=dtx)
+        try:
+            await player.play()
+        finally:
+            if self._player is player:
+                self._player = None
+
+        return player
 
     async def __restart(self):
-        """Restart the client's connection and heartbeat with the Gateway."""
-        if self.__task:
-            self.__task: Task
-            self.__task.cancel()
-        self._closed = True
-        self._client = None  # clear pending waits
-        self.__heartbeater.event.clear()
-        await self._connect()
+        """Closes the client's connection with the Gateway, so that it is resumed."""
+        if self._client is not None and not self._client.closed:
+            await self._client.close(code=4000)  # any code but 1000 and 1001 keeps the session
 
     async def __resume(self) -> None:
         """Sends a ``RESUME`` packet to the gateway."""
@@ -328,7 +580,6 @@ class VoiceConnectionWebSocketClient:
                 "server_id": self.guild_id,
             },
         }
-        log.debug(f"RESUMING: {payload}")
         await self._send_packet(payload)
         log.debug("RESUME")
 
@@ -353,6 +604,5 @@ class VoiceConnectionWebSocketClient:
         if isinstance(shard, List) and len(shard) >= 1:
             payload["d"]["shard"] = shard
 
-        log.debug(f"IDENTIFYING: {payload}")
         await self._send_packet(payload)
         log.debug("IDENTIFY")
@@ -1,5 +1,4 @@
-from asyncio import Event
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple
 
 from aiohttp import WSMessage, WSMsgType
 from aiohttp.http import WS_CLOSED_MESSAGE, WS_CLOSING_MESSAGE
@@ -7,12 +6,12 @@ from aiohttp.http import WS_CLOSED_MESSAGE, WS_CLOSING_MESSAGE
 from interactions.api.enums import OpCodeType
 from interactions.api.gateway.client import WebSocketClient
 from interactions.api.models.attrs_utils import MISSING
-from interactions.api.models.misc import Snowflake
 from interactions.api.models.presence import ClientPresence
 from interactions.base import get_logger
 
-from .state import VoiceState
-from .voice import VoiceConnectionWebSocketClient
+from .manager import VoiceManager
+from .ratelimit import TokenBucket
+from .scheduler import MediaScheduler
 
 __all__ = ("VoiceWebSocketClient",)
 
@@ -22,7 +21,11 @@ log = get_logger("gateway")
 class VoiceWebSocketClient(WebSocketClient):
     """
     A modified WebSocketClient for Voice Events.
-    todo: doc
+
+    The voice events are handed to a :class:`VoiceManager`, which may be shared by the gateway
+    connections of several shards. Each connection registers itself under its shard while it is
+    connected and paces its own ``VOICE_STATE`` packets. Guilds the bot leaves, and the voice
+    states of a shard whose connection closed, are removed from the manager.
     """
 
     def __init__(
@@ -32,10 +35,12 @@ class VoiceWebSocketClient(WebSocketClient):
         session_id=MISSING,
         sequence=MISSING,
         me=MISSING,
+        scheduler: Optional[MediaScheduler] = None,
+        manager: Optional[VoiceManager] = None,
     ) -> None:
         super().__init__(token, intents, session_id, sequence)
-        self._voice_connect_data: Dict[str, dict] = {}
-        self._voice_connections: Dict[str, VoiceConnectionWebSocketClient] = {}
+        self._voice = manager if manager is not None else VoiceManager(scheduler)
+        self._voice_state_bucket = TokenBucket()
         self.user = me
 
     @property
@@ -61,6 +66,22 @@ class VoiceWebSocketClient(WebSocketClient):
             await self._client.close()
             return WS_CLOSED_MESSAGE
 
+    async def _establish_connection(
+        self,
+        shard: Optional[List[Tuple[int]]] = MISSING,
+        presence: Optional[ClientPresence] = MISSING,
+    ) -> None:
+        """Registers the shard with the voice manager while it is connected to the Gateway."""
+        if isinstance(shard, (list, tuple)) and len(shard) == 2:
+            self._voice.add_shard(self, *shard)
+        else:
+            self._voice.add_shard(self)
+        try:
+            await super()._establish_connection(shard, presence)
+        finally:
+            # reconnects are nested calls, so returning here means the connection closed for good
+            self._voice.remove_shard(self)
+
     async def _handle_connection(
         self,
         stream: Dict[str, Any],
@@ -71,6 +92,9 @@ class VoiceWebSocketClient(WebSocketClient):
         event: Optional[str] = stream.get("t")
         data: Optional[Dict[str, Any]] = stream.get("d")
 
+        if op == OpCodeType.DISPATCH and event == "GUILD_DELETE" and not data.get("unavailable"):
+            await self._voice._remove_guild(data["id"])  # the bot left the guild
+
         if op != OpCodeType.DISPATCH or event not in {
             "VOICE_STATE_UPDATE",
             "VOICE_SERVER_UPDATE",
@@ -78,111 +102,4 @@ class VoiceWebSocketClient(WebSocketClient):
             return await super()._handle_connection(stream, shard, presence)
 
         log.debug(f"{event}: {data}")
-        await self._dispatch_voice_event(event, data, stream)
-
-    async def _dispatch_voice_event(self, event: str, data: dict, stream) -> None:
-        if event == "VOICE_STATE_UPDATE":
-            if data["user_id"] == self.user.id:  # TODO: check if user joined.
-                if data["guild_id"] not in self._voice_connect_data:
-                    self._voice_connect_data[data["guild_id"]] = {}
-
-                self._voice_connect_data[data["guild_id"]].update(
-                    session_id=data["session_id"],
-                    user_id=int(data["user_id"]),
-                )
-
-            _id = Snowflake(data["user_id"])
-            _value = [VoiceState(**data)]
-
-            # Fix this :P
-            # this isn't a problem, actually. It actually makes the list per user.
-            # Also, a user can only have one voice state
-
-            if _id in self._http.cache[VoiceState].values.keys():
-                if len(self._http.cache[VoiceState].get(_id, [])) >= 2:
-                    self._http.cache[VoiceState].values[_id].pop(0)
-                self._http.cache[VoiceState].values[_id].extend(_value)
-                # doing it manually since the update meth is broken.
-            else:
-                self._http.cache[VoiceState].add(_value, _id)
-
-            data["_client"] = self._http
-
-            name: str = event.lower()
-            self._dispatch.dispatch(f"on_{name}", VoiceState(**data))  # noqa
-        else:
-            if data["guild_id"] not in self._voice_connect_data:
-                self._voice_connect_data[data["guild_id"]] = {}
-
-            self._voice_connect_data[data["guild_id"]].update(
-                token=data["token"], endpoint=data["endpoint"]
-            )
-            self._voice_connect_data[data["guild_id"]]["can_return"].set()
-            await self._voice_connect(data["guild_id"])
-
-        self._dispatch.dispatch("raw_socket_create", data)
-
-    async def _connect_vc(
-        self,
-        guild_id: Union[int, str],
-        channel_id: Union[int, str],
-        self_mute: bool = False,
-        self_deaf: bool = False,
-    ) -> None:
-        """
-        :param guild_id:
-        :param channel_id:
-        :param self_mute:
-        :param self_deaf:
-        :return:
-        """
-        guild_id, channel_id = str(guild_id), str(channel_id)
-        payload: dict = {
-            "op": OpCodeType.VOICE_STATE,
-            "d": {
-                "channel_id": channel_id,
-                "guild_id": guild_id,
-                "self_deaf": self_deaf,
-                "self_mute": self_mute,
-            },
-        }
-        self._voice_connect_data[guild_id] = {}
-        self._voice_connect_data[guild_id]["can_return"] = Event()
-        await self._send_packet(data=payload)
-        await self._voice_connect_data[guild_id]["can_return"].wait()
-
-    async def _voice_connect(self, guild_id: str) -> None:
-        voice_client = VoiceConnectionWebSocketClient(
-            guild_id=int(guild_id),
-            data=self._voice_connect_data[guild_id],
-            _http=self._http,
-        )
-        self._voice_connections[guild_id] = voice_client
-        return await voice_client._connect()
-
-    async def _disconnect_vc(self, guild_id: str) -> None:
-        """
-        Closes an existing voice connection on a guild.
-        :param guild_id: The id of the guild to close the connection of
-        :type guild_id: int
-        """
-
-        self._voice_connections[guild_id]._close = True
-        payload = {
-            "op": OpCodeType.VOICE_STATE,
-            "d": {
-                "guild_id": guild_id,
-                "channel_id": None,
-            },
-        }
-
-        await self._send_packet(data=payload)
-        del self._voice_connections[guild_id]
-
-    async def _disconnect_all_vc(self) -> None:
-        """
-        Closes all existing voice connections.
-        """
-
-        for guild_id in self._voice_connections:
-            await self._disconnect_vc(guild_id)
+        await self._voice._dispatch_voice_event(event, data, self)
@@ -0,0 +1,473 @@
+from asyncio import (
+    CancelledError,
+    Future,
+    TimeoutError,
+    get_running_loop,
+    run,
+    shield,
+    wait,
+    wait_for,
+)
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import count
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import ForkingPickler
+from os import cpu_count
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from aiohttp import ClientSession, TCPConnector
+
+from interactions.base import get_logger
+
+from .heartbeat import HeartbeatScheduler
+from .metrics import MetricsRegistry
+from .player import PacerStats, PacingPolicy
+from .scheduler import MediaScheduler
+from .sources import AudioSource
+from .supervisor import VoiceSupervisor
+from .udp import UDPEgress
+from .voice import VoiceConnectionWebSocketClient
+
+__all__ = ("VoiceWorkerPool", "RemoteVoiceConnection")
+
+log = get_logger("voice")
+
+_CONNECT_KEYS = ("session_id", "token", "endpoint", "user_id")
+_INLINE_SEND = 1 << 14  # larger requests are written to the pipe off the event loop
+
+
+class _Worker:
+    """The bot side of a worker process."""
+
+    __slots__ = (
+        "index",
+        "process",
+        "pipe",
+        "pending",
+        "connections",
+        "_requests",
+        "_sender",
+        "_sending",
+    )
+
+    def __init__(self, index: int, process: Any, pipe: Connection) -> None:
+        self.index = index
+        self.process = process
+        self.pipe = pipe
+        self.pending: Dict[int, Future] = {}
+        self.connections: Dict[int, "RemoteVoiceConnection"] = {}
+        self._requests = count()
+        self._sender: Optional[ThreadPoolExecutor] = None
+        self._sending: int = 0  # the amount of requests queued in the sender
+
+    def request(self, method: str, *args: Any) -> Future:
+        """
+        Sends a request to the worker.
+
+        Writing to the pipe blocks until the worker read what does not fit its buffer, so large
+        requests, such as a source holding its audio, are written by a thread instead. Requests
+        queued behind one are written by it as well, keeping their order.
+        :param method: The name of the request
+        :type method: str
+        :return: The future of the worker's answer
+        :rtype: Future
+        """
+        loop = get_running_loop()
+        future = loop.create_future()
+        request_id = next(self._requests)
+        try:
+            message = ForkingPickler.dumps((request_id, method, args))
+        except Exception as exc:  # the arguments cannot be pickled
+            future.set_exception(exc)
+            return future
+
+        self.pending[request_id] = future
+        if len(message) <= _INLINE_SEND and not self._sending:
+            try:
+                self.pipe.send_bytes(message)
+            except Exception as exc:  # the worker is gone
+                self._failed(request_id, exc)
+        else:
+            if self._sender is None:
+                self._sender = ThreadPoolExecutor(1, f"voice-worker-{self.index}-sender")
+            self._sending += 1
+            sending = loop.run_in_executor(self._sender, self.pipe.send_bytes, message)
+            sending.add_done_callback(partial(self._sent, request_id))
+        return future
+
+    def _sent(self, request_id: int, sending: Future) -> None:
+        self._sending -= 1
+        if not sending.cancelled() and sending.exception() is not None:
+            self._failed(request_id, sending.exception())
+
+    def _failed(self, request_id: int, error: BaseException) -> None:
+        future = self.pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def close(self) -> None:
+        """Closes the pipe to the worker, which makes it close its connections and exit."""
+        get_running_loop().remove_reader(self.pipe.fileno())
+        self.pipe.close()
+        if self._sender is not None:
+            self._sender.shutdown(wait=False)
+
+
+class RemoteVoiceConnection:
+    """
+    Stands in for the voice connection of a guild that runs in a worker process.
+
+    :ivar int guild_id: The id of the guild of the connection.
+    """
+
+    __slots__ = ("guild_id", "_data", "_worker", "_started", "_closed", "_close")
+
+    def __init__(self, guild_id: int, data: dict) -> None:
+        self.guild_id = guild_id
+        self._data = {key: data.get(key) for key in _CONNECT_KEYS}
+        self._worker: Optional[_Worker] = None
+        self._started: Optional[Future] = None
+        self._closed = False
+        self._close = False
+
+    async def _play(
+        self,
+        source: Union[AudioSource, Callable[[], AudioSource]],
+        policy: PacingPolicy = PacingPolicy.CATCH_UP,
+        dtx: bool = True,
+    ) -> PacerStats:
+        """
+        Plays a source over the connection until it is exhausted or stopped.
+        :param source: The source to play, or a callable creating it in the worker. Either has to be picklable.
+        :type source: Union[AudioSource, Callable[[], AudioSource]]
+        :param policy: How frames that are overdue are handled
+        :type policy: PacingPolicy
+        :param dtx: Whether no packets are sent while the source is silent
+        :type dtx: bool
+        :return: The late-frame accounting of the playback
+        :rtype: PacerStats
+        """
+        if self._worker is None or self._closed:
+            raise ConnectionError(f"The voice connection of guild {self.guild_id} is not running.")
+
+        try:
+            return await self._worker.request("play", self.guild_id, source, policy, dtx)
+        except CancelledError:
+            self._worker.request("halt", self.guild_id).add_done_callback(_retrieve)
+            raise
+
+    def _listen(self) -> None:
+        """Receiving audio is not available for connections in worker processes."""
+        log.warning(
+            f"Cannot receive the audio of guild {self.guild_id}, its connection runs in a worker."
+        )
+
+
+def _retrieve(future: Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+class VoiceWorkerPool:
+    """
+    Runs the voice connections of a client in worker processes.
+
+    The bot process only keeps the main gateway. The voice gateway, UDP, pacing, encryption and
+    sources of every connection run in one of ``processes`` worker processes, picked by
+    ``(guild_id >> 22) % processes``, each with an event loop of its own. Media thus uses every
+    core instead of competing with command handling, and a crashing worker only takes its own
+    guilds down; it is started again on the next join.
+
+    The workers are controlled over ``multiprocessing`` pipes. Connecting, playing and
+    disconnecting are requests answered by the worker, while connections that fail for good and,
+    every ``metrics_interval`` seconds, the metrics of all connections are pushed back.
+
+    Played sources are sent to the worker, so they have to be picklable, or be given as a picklable
+    callable creating them in the worker, such as ``functools.partial(OggOpusSource, path)``.
+    Receiving audio is not available for these connections, as the received packets would have to
+    be sent back to the bot process: :meth:`VoiceClient.listen` logs a warning and returns ``None``
+    for them.
+
+    :ivar int processes: The amount of worker processes.
+    :ivar bool media_batching: Whether the workers send the packets of a frame in batches.
+    :ivar float metrics_interval: The time between two pushes of the metrics, in seconds.
+    :ivar MetricsRegistry metrics: The metrics last pushed by the workers.
+    :ivar Optional[Callable[[int, BaseException], None]] on_error: Called with the guild id and the
+        error of a connection that failed for good.
+    """
+
+    __slots__ = (
+        "processes",
+        "media_batching",
+        "metrics_interval",
+        "metrics",
+        "on_error",
+        "_workers",
+    )
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        media_batching: bool = False,
+        metrics_interval: float = 5.0,
+    ) -> None:
+        self.processes = processes if processes is not None else cpu_count() or 1
+        self.media_batching = media_batching
+        self.metrics_interval = metrics_interval
+        self.metrics = MetricsRegistry()
+        self.on_error: Optional[Callable[[int, BaseException], None]] = None
+        self._workers: List[Optional[_Worker]] = [None] * self.processes
+
+    def __len__(self) -> int:
+        return sum(len(worker.connections) for worker in self._workers if worker is not None)
+
+    def _worker(self, guild_id: int) -> _Worker:
+        index = (guild_id >> 22) % self.processes
+        worker = self._workers[index]
+        if worker is None:
+            context = get_context("spawn")
+            pipe, child = context.Pipe()
+            process = context.Process(
+                target=_serve,
+                args=(child, self.media_batching, self.metrics_interval),
+                name=f"voice-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            worker = self._workers[index] = _Worker(index, process, pipe)
+            get_running_loop().add_reader(pipe.fileno(), self._receive, worker)
+        return worker
+
+    def _receive(self, worker: _Worker) -> None:
+        try:
+            while worker.pipe.poll():
+                message: Tuple[Any, ...] = worker.pipe.recv()
+                if message[0] == "reply":
+                    _, request_id, error, result = message
+                    future = worker.pending.pop(request_id, None)
+                    if future is None or future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+                elif message[0] == "error":
+                    _, guild_id, error = message
+                    self._failed(worker, guild_id, error)
+                else:
+                    for guild_id, metrics in message[1].items():
+                        if guild_id in worker.connections:
+                            self.metrics.put(guild_id, metrics)
+        except (EOFError, OSError):
+            self._lost(worker)
+
+    def _failed(self, worker: _Worker, guild_id: int, error: BaseException) -> None:
+        connection = worker.connections.pop(guild_id, None)
+        if connection is None:
+            return
+        connection._closed = True
+        if self.on_error is not None:
+            self.on_error(guild_id, error)
+
+    def _lost(self, worker: _Worker) -> None:
+        worker.close()
+        if self._workers[worker.index] is worker:
+            self._workers[worker.index] = None
+
+        error = ConnectionError(f"Voice worker {worker.index} exited.")
+        log.error(
+            "Voice worker %s exited with %s connections.", worker.index, len(worker.connections)
+        )
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        worker.pending.clear()
+        for guild_id in tuple(worker.connections):
+            self._failed(worker, guild_id, error)
+
+    def start(self, connection: RemoteVoiceConnection) -> None:
+        """
+        Starts running a connection in the worker of its guild.
+        :param connection: The connection to run. A running connection of the same guild is closed.
+        :type connection: RemoteVoiceConnection
+        """
+        worker = self._worker(connection.guild_id)
+        connection._worker = worker
+        worker.connections[connection.guild_id] = connection
+        connection._started = worker.request("start", connection.guild_id, connection._data)
+        connection._started.add_done_callback(_retrieve)
+
+    async def wait_ready(
+        self, connection: RemoteVoiceConnection, timeout: Optional[float] = None
+    ) -> None:
+        """
+        Waits until a connection received ``READY``, raising the error it failed with instead.
+        :param connection: The connection to wait for
+        :type connection: RemoteVoiceConnection
+        :param timeout: The time to wait at most, in seconds, or ``None`` to wait indefinitely
+        :type timeout: Optional[float]
+        """
+        if connection._started is not None:
+            await wait_for(shield(connection._started), timeout)
+
+    async def stop(self, connection: RemoteVoiceConnection) -> None:
+        """
+        Closes a connection in its worker.
+        :param connection: The connection to close
+        :type connection: RemoteVoiceConnection
+        """
+        connection._close = True
+        worker = connection._worker
+        if worker is None:
+            return
+        if worker.connections.get(connection.guild_id) is connection:
+            del worker.connections[connection.guild_id]
+        try:
+            await wait_for(worker.request("stop", connection.guild_id), 10.0)
+        except (OSError, TimeoutError) as exc:
+            log.warning(
+                "Could not close the voice connection of guild %s: %r", connection.guild_id, exc
+            )
+
+    async def close(self) -> None:
+        """
+        Stops every worker process, closing their connections.
+
+        This is done by :meth:`VoiceManager.disconnect_all`. The workers are started again on the
+        next join.
+        """
+        loop = get_running_loop()
+        for index, worker in enumerate(self._workers):
+            if worker is None:
+                continue
+            self._workers[index] = None
+            worker.close()
+            await loop.run_in_executor(None, worker.process.join, 10.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+
+class _WorkerProcess:
+    """The worker side, running the connections of its guilds on its own event loop."""
+
+    __slots__ = (
+        "pipe",
+        "media_batching",
+        "metrics_interval",
+        "scheduler",
+        "heartbeat",
+        "metrics",
+        "supervisor",
+        "session",
+        "connections",
+        "_closed",
+    )
+
+    def __init__(self, pipe: Connection, media_batching: bool, metrics_interval: float) -> None:
+        self.pipe = pipe
+        self.media_batching = media_batching
+        self.metrics_interval = metrics_interval
+        self.connections: Dict[int, VoiceConnectionWebSocketClient] = {}
+
+    async def run(self) -> None:
+        loop = get_running_loop()
+        self.scheduler = MediaScheduler(egress=UDPEgress() if self.media_batching else None)
+        self.heartbeat = HeartbeatScheduler()
+        self.metrics = MetricsRegistry()
+        self.supervisor = VoiceSupervisor(on_error=self._error)
+        self.session = ClientSession(connector=TCPConnector(limit=0))
+        self._closed = loop.create_future()
+        loop.add_reader(self.pipe.fileno(), self._receive)
+        try:
+            while not self._closed.done():
+                await wait((self._closed,), timeout=self.metrics_interval)
+                self._send(("metrics", dict(self.metrics)))
+        finally:
+            loop.remove_reader(self.pipe.fileno())
+            for connection in tuple(self.connections.values()):
+                await self.supervisor.stop(connection)
+            await self.session.close()
+
+    def _receive(self) -> None:
+        try:
+            while self.pipe.poll():
+                request_id, method, args = self.pipe.recv()
+                get_running_loop().create_task(self._call(request_id, method, args))
+        except (EOFError, OSError):  # the bot process closed the pipe or is gone
+            if not self._closed.done():
+                self._closed.set_result(None)
+
+    def _send(self, message: Tuple[Any, ...], fallback: Optional[Tuple[Any, ...]] = None) -> None:
+        try:
+            self.pipe.send(message)
+        except OSError:
+            pass  # the bot process is gone
+        except Exception:  # the message cannot be pickled
+            if fallback is not None:
+                self._send(fallback)
+
+    async def _call(self, request_id: int, method: str, args: Tuple[Any, ...]) -> None:
+        try:
+            result = await self._REQUESTS[method](self, *args)
+        except Exception as exc:
+            message = ("reply", request_id, exc, None)
+        else:
+            message = ("reply", request_id, None, result)
+        self._send(message, ("reply", request_id, RuntimeError(repr(message[2:])), None))
+
+    def _error(self, guild_id: int, error: BaseException) -> None:
+        self.connections.pop(guild_id, None)
+        self._send(("error", guild_id, error), ("error", guild_id, RuntimeError(repr(error))))
+
+    async def _start(self, guild_id: int, data: dict) -> None:
+        connection = VoiceConnectionWebSocketClient(
+            guild_id,
+            data,
+            None,
+            scheduler=self.scheduler,
+            heartbeat=self.heartbeat,
+            metrics=self.metrics.get(guild_id),
+            session=self.session,
+        )
+        self.connections[guild_id] = connection
+        self.supervisor.start(connection)
+        await self.supervisor.wait_ready(connection)
+
+    async def _play(
+        self,
+        guild_id: int,
+        source: Union[AudioSource, Callable[[], AudioSource]],
+        policy: PacingPolicy,
+        dtx: bool,
+    ) -> PacerStats:
+        connection = self.connections[guild_id]
+        if not isinstance(source, AudioSource):
+            source = source()
+        player = await connection._play(source, policy, dtx)
+        return player.stats
+
+    async def _halt(self, guild_id: int) -> None:
+        connection = self.connections.get(guild_id)
+        if connection is not None and connection._player is not None:
+            connection._player.stop()
+
+    async def _stop(self, guild_id: int) -> None:
+        connection = self.connections.pop(guild_id, None)
+        self.metrics.remove(guild_id)
+        if connection is not None:
+            await self.supervisor.stop(connection)
+
+    _REQUESTS: Dict[str, Callable[..., Awaitable[Any]]] = {
+        "start": _start,
+        "play": _play,
+        "halt": _halt,
+        "stop": _stop,
+    }
+
+
+def _serve(pipe: Connection, media_batching: bool, metrics_interval: float) -> None:
+    """The entry point of a worker process."""
+    run(_WorkerProcess(pipe, media_batching, metrics_interval).run())
@@ -6,6 +6,7 @@ packages = ["interactions.ext.voice"]
 package_data = {"": ["*"]}
 
 install_requires = ["PyNaCl>=1.5.0,<2.0.0", "discord-py-interactions>=4.3.1"]
+extras_require = {"numpy": ["numpy>=1.21.0"]}
 
 setup_kwargs = {
     "name": "interactions-voice",
@@ -26,12 +27,14 @@ setup_kwargs = {
         "extension for `interactions.py`, what gives it the ability to connect to voice and send data "
         "and to \nlisten to the ``voice_state_update`` event.\n\n## Example "
         "usage:\n__________________\n\n```python\nfrom interactions import CommandContext, "
-        "Channel\nfrom interactions.ext.voice import VoiceState, VoiceClient\n\nbot: VoiceClient = "
+        "Channel\nfrom interactions.ext.voice import OggOpusSource, VoiceState, VoiceClient\n\nbot: "
+        "VoiceClient = "
         'VoiceClient(token="...")\n\n@bot.event\nasync def on_voice_state_update(vs: VoiceState):\n   '
         ' print(vs.self_mute)\n    ...\n\n@bot.command(name="connect", description="...", '
         "options=[...])\nasync def connect(ctx: CommandContext, channel: Channel):\n    await "
         "bot.connect_vc(channel_id=int(channel.id), guild_id=int(ctx.guild_id), self_deaf=True, "
-        'self_mute=False)\n    await bot.play(file="C:/...")\n```\n',
+        "self_mute=False)\n    await bot.play(int(ctx.guild_id), "
+        'OggOpusSource("C:/.../song.opus"))\n```\n',
     # fmt: on
     "author": "EdVraz",
     "author_email": "edvraz12@gmail.com",
@@ -41,6 +44,7 @@ setup_kwargs = {
     "packages": packages,
     "package_data": package_data,
     "install_requires": install_requires,
+    "extras_require": extras_require,
     "python_requires": ">=3.8.6,<4.0.0",
 }
 
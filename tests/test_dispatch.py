@@ -0,0 +1,142 @@
+"""
+Checks that the main gateway keeps dispatching events on time while 100 voice connections play.
+
+The voice connections run against the stand-in gateway of ``benchmarks/fake_gateway.py`` in a
+child process. A main gateway event is due every 10 ms, and the time from when it is due until it
+was handled is compared with the same measurement without any voice connection. Disconnecting
+while playing has to end the playback as well.
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from fake_gateway import serve  # noqa: E402
+
+CONNECTIONS = 100
+EVENTS = 500
+FRAME = os.urandom(120)
+MAX_GROWTH = 0.15e-3  # the p95 dispatch latency may grow by this much per playing connection
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    server = context.Process(target=serve, args=(sender,), daemon=True)
+    server.start()
+    port, _ = receiver.recv()
+    yield f"ws://127.0.0.1:{port}/"  # the stand-in has no TLS
+    server.terminate()
+
+
+def _p95(seconds: List[float]) -> float:
+    return sorted(seconds)[int(len(seconds) * 0.95)]
+
+
+def _manager(endpoint: str):
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.api.models.flags import Intents
+    from interactions.ext.voice.manager import VoiceManager
+    from interactions.ext.voice.ratelimit import TokenBucket
+    from interactions.ext.voice.websocket import VoiceWebSocketClient
+
+    voice = VoiceManager()
+    shard = VoiceWebSocketClient(
+        "token", Intents.DEFAULT, me=SimpleNamespace(id="1"), manager=voice
+    )
+    shard._dispatch = SimpleNamespace(dispatch=lambda *_: None)
+    shard._voice_state_bucket = TokenBucket(capacity=2 * CONNECTIONS)
+
+    async def send_packet(data: dict) -> None:  # answers a join like the main gateway
+        guild = data["d"]["guild_id"]
+        if data["d"]["channel_id"] is not None:
+            state = {"guild_id": guild, "user_id": "1", "session_id": f"session-{guild}"}
+            await shard._handle_connection({"op": 0, "t": "VOICE_STATE_UPDATE", "d": state})
+            server = {"guild_id": guild, "token": "token", "endpoint": endpoint}
+            await shard._handle_connection({"op": 0, "t": "VOICE_SERVER_UPDATE", "d": server})
+
+    shard._send_packet = send_packet
+    voice.add_shard(shard)
+    return voice, shard
+
+
+def _endless_source():
+    from interactions.ext.voice.sources import AudioSource
+
+    class EndlessSource(AudioSource):
+        def read(self) -> bytes:
+            return FRAME
+
+    return EndlessSource()
+
+
+async def _dispatch_latencies(endpoint: str) -> List[List[float]]:
+    from interactions.ext.voice.player import PacingPolicy
+
+    voice, shard = _manager(endpoint)
+    loop = asyncio.get_running_loop()
+
+    async def dispatch() -> List[float]:
+        latencies = []
+        due = loop.time()
+        for _ in range(EVENTS):
+            due += 0.01
+            await asyncio.sleep(due - loop.time())
+            await shard._handle_connection({"op": 0, "t": "RESUMED", "s": 1, "d": {}})
+            latencies.append(loop.time() - due)
+        return latencies
+
+    idle = await dispatch()
+
+    results = await voice.connect_many({guild_id: 1 for guild_id in range(1, CONNECTIONS + 1)})
+    assert all(error is None for error in results.values()), results
+    players = [
+        asyncio.ensure_future(connection._play(_endless_source(), PacingPolicy.CATCH_UP, dtx=False))
+        for connection in voice._connections.values()
+    ]
+    try:
+        await asyncio.sleep(0.5)  # let every stream start before measuring
+        playing = await dispatch()
+    finally:
+        for connection in voice._connections.values():
+            if connection._player is not None:
+                connection._player.stop()
+        await asyncio.gather(*players, return_exceptions=True)
+        await voice.disconnect_all()
+    return [idle, playing]
+
+
+def test_dispatch_latency_stays_flat(endpoint):
+    idle, playing = asyncio.run(_dispatch_latencies(endpoint))
+    growth = (_p95(playing) - _p95(idle)) / CONNECTIONS
+    assert growth < MAX_GROWTH, (
+        f"p95 dispatch latency grew from {_p95(idle) * 1e3:.2f} ms to {_p95(playing) * 1e3:.2f} ms"
+        f" with {CONNECTIONS} playing connections"
+    )
+
+
+async def _disconnect_while_playing(endpoint: str) -> None:
+    voice, _ = _manager(endpoint)
+    results = await voice.connect_many({1: 1})
+    assert results[1] is None, results
+    playing = asyncio.ensure_future(voice.connection(1)._play(_endless_source()))
+    try:
+        await asyncio.sleep(0.2)
+        assert not playing.done()
+        await voice.disconnect(1)
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(playing, 5.0)
+    finally:
+        await voice.disconnect_all()
+
+
+def test_disconnect_ends_playback(endpoint):
+    asyncio.run(_disconnect_while_playing(endpoint))
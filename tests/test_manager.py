@@ -0,0 +1,133 @@
+"""
+Checks that voice connections are found by the id of their guild, whether given as ``int`` or
+``str``, through the methods of the client.
+"""
+import asyncio
+from types import SimpleNamespace
+from typing import Tuple
+
+
+class _Supervisor:
+    """Keeps the connections from connecting to a voice gateway."""
+
+    def start(self, connection) -> None:
+        pass
+
+    async def wait_ready(self, connection) -> None:
+        pass
+
+    async def stop(self, connection) -> None:
+        connection._closed = True
+
+
+async def _connected(*guild_ids: int) -> Tuple:
+    # interactions creates its HTTP session on import, which needs a running loop.
+    from interactions.api.models.flags import Intents
+    from interactions.ext.voice._dummy import _VoiceClient
+    from interactions.ext.voice.manager import VoiceManager
+    from interactions.ext.voice.websocket import VoiceWebSocketClient
+
+    voice = VoiceManager()
+    voice._supervisor = _Supervisor()
+    shard = VoiceWebSocketClient(
+        "token", Intents.DEFAULT, me=SimpleNamespace(id="1"), manager=voice
+    )
+    shard._dispatch = SimpleNamespace(dispatch=lambda *_: None)
+    sent = []
+
+    async def send_packet(data: dict) -> None:  # answers a join like the main gateway
+        sent.append(data["d"])
+        guild = data["d"]["guild_id"]
+        if data["d"]["channel_id"] is not None:
+            state = {"guild_id": guild, "user_id": "1", "session_id": "session"}
+            await shard._handle_connection({"op": 0, "t": "VOICE_STATE_UPDATE", "d": state})
+            server = {"guild_id": guild, "token": "token", "endpoint": "voice.test"}
+            await shard._handle_connection({"op": 0, "t": "VOICE_SERVER_UPDATE", "d": server})
+
+    shard._send_packet = send_packet
+    voice.add_shard(shard)
+    client = _VoiceClient()
+    client._voice = voice
+    await client.connect_many({guild_id: 1 for guild_id in guild_ids})
+    return client, voice, sent
+
+
+def test_disconnect_by_int_id_removes_the_connection():
+    async def run() -> None:
+        client, voice, sent = await _connected(123, 456)
+        connection = voice.connection(123)
+        assert connection is not None and connection.guild_id == 123
+
+        assert await client.disconnect_many([123]) == {123: None}
+        assert voice.connection(123) is None
+        assert connection._closed is True
+        assert sent[-1]["guild_id"] == "123" and sent[-1]["channel_id"] is None
+
+        await client.disconnect_vc(456)
+        assert voice.connection("456") is None and not voice._connections
+
+    asyncio.run(run())
+
+
+def test_connected_guilds_are_found_by_int_and_str_id():
+    async def run() -> None:
+        client, voice, sent = await _connected(123)
+        joins = len(sent)
+        assert await client.connect_many({123: 1}) == {123: None}
+        assert len(sent) == joins  # already connected, not joined again
+
+        connection = voice.connection(123)
+
+        async def play(source, policy, dtx):
+            return source
+
+        connection._play = play
+        assert await client.play(123, "source") == "source"
+        assert await client.play("123", "source") == "source"
+
+    asyncio.run(run())
+
+
+def test_leaving_a_guild_forgets_its_voice_states():
+    async def run() -> None:
+        client, voice, sent = await _connected(123, 456)
+        shard = voice.shard(123)
+        for guild in ("123", "456"):
+            state = {"guild_id": guild, "channel_id": "7", "user_id": "2", "session_id": "other"}
+            await shard._handle_connection({"op": 0, "t": "VOICE_STATE_UPDATE", "d": state})
+        assert voice._states.occupancy(123, 7) == voice._states.occupancy(456, 7) == 1
+
+        outage = {"id": "456", "unavailable": True}
+        await shard._handle_connection({"op": 0, "t": "GUILD_DELETE", "s": 1, "d": outage})
+        assert voice._states.occupancy(456, 7) == 1 and voice.connection(456) is not None
+
+        await shard._handle_connection({"op": 0, "t": "GUILD_DELETE", "s": 1, "d": {"id": "123"}})
+        assert voice._states.get(123, 2) is None and voice._states.occupancy(123, 7) == 0
+        assert voice.connection(123) is None
+        assert voice._states.occupancy(456, 7) == 1
+
+    asyncio.run(run())
+
+
+def test_closed_shard_forgets_its_voice_states(monkeypatch):
+    async def run() -> None:
+        from interactions.api.error import LibraryException
+        from interactions.api.gateway.client import WebSocketClient
+
+        client, voice, sent = await _connected(123)
+        shard = voice.shard(123)
+        state = {"guild_id": "123", "channel_id": "7", "user_id": "2", "session_id": "other"}
+        await shard._handle_connection({"op": 0, "t": "VOICE_STATE_UPDATE", "d": state})
+
+        async def establish_connection(self, shard, presence) -> None:
+            assert voice.shard(123) is self
+            raise LibraryException(4004)  # the gateway closes with an authentication failure
+
+        monkeypatch.setattr(WebSocketClient, "_establish_connection", establish_connection)
+        try:
+            await shard._establish_connection()
+        except LibraryException:
+            pass
+        assert not voice._shards and voice._states.occupancy(123, 7) == 0
+
+    asyncio.run(run())